@@ -0,0 +1,44 @@
+"""Gunicorn settings, read from the environment like pomodorocore.settings.
+
+Picked up automatically when gunicorn is started from the project root.
+The defaults suit a small instance: threaded workers, so a request waiting
+on the database doesn't block the process, and workers recycled after
+GUNICORN_MAX_REQUESTS requests (with jitter, so they don't all restart at
+once) to bound memory growth. To serve pomodorocore.asgi instead, set
+GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker; those workers run an
+event loop and ignore GUNICORN_THREADS.
+"""
+import multiprocessing
+import os
+
+# Not imported as ``config``: gunicorn would take that for its own setting.
+from decouple import config as env
+
+
+bind = env('GUNICORN_BIND', default=f"0.0.0.0:{env('PORT', default=8000, cast=int)}")
+# One worker unless the cache is shared: timers and OTP codes live there.
+shared_cache = not env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache').endswith('.LocMemCache')
+workers = env('WEB_CONCURRENCY', default=multiprocessing.cpu_count() + 1 if shared_cache else 1, cast=int)
+# The Django settings check the worker count against the cache backend.
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = env('GUNICORN_WORKER_CLASS', default='gthread')
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+# Load the app before forking so workers share its memory and start faster.
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+accesslog = env('GUNICORN_ACCESS_LOG', default=None)
+
+
+def post_fork(server, worker):
+    # Anything connected while preloading belongs to the master process;
+    # a socket shared between processes corrupts both ends.
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
@@ -1,8 +1,18 @@
+from collections import defaultdict
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.db import transaction
-from .models import User, Project, Tag, Task, Session
+from django.utils import timezone
+from .models import User, Project, Tag, Task, Session, Job, Goal, LeaderboardEntry
+from .caching import bump_versions
+from .pagination import EstimatedCountPaginator
+from .purge import purge_users
+from .stats import apply_focus_changes, focus_entry, move_task_focus
+from .sync import delete_tracked
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -21,14 +31,11 @@ class CustomUserChangeForm(UserChangeForm):
 
 @admin.action(description='Force delete selected users')
 def force_delete_users(modeladmin, request, queryset):
-    with transaction.atomic():
-        for user in queryset:
-            # Delete related objects first to avoid foreign key constraint issues
-            user.session_set.all().delete()
-            user.task_set.all().delete()
-            user.project_set.all().delete()
-            user.tag_set.all().delete()
-            user.delete()
+    counts = purge_users(queryset)
+    modeladmin.message_user(request, (
+        f"Deleted {counts['users']} users with {counts['sessions']} sessions, {counts['tasks']} tasks, "
+        f"{counts['projects']} projects and {counts['tags']} tags."
+    ))
 
 
 class CustomUserAdmin(BaseUserAdmin):
@@ -42,7 +49,7 @@ class CustomUserAdmin(BaseUserAdmin):
     
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
-        ('Personal info', {'fields': ('phone_number', 'gender', 'date_of_birth', 'country')}),
+        ('Personal info', {'fields': ('phone_number', 'gender', 'date_of_birth', 'country', 'timezone')}),
         ('Statistics', {'fields': ('total_focus_time', 'average_focus_time', 'total_sessions')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
@@ -63,32 +70,191 @@ class CustomUserAdmin(BaseUserAdmin):
 # Register the User model with the custom admin
 admin.site.register(User, CustomUserAdmin)
 
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    """Filter by owner, picked with the admin's user autocomplete.
+
+    The stock ``'user'`` filter renders a link for every account, which
+    doesn't scale; this one searches users as you type and only loads the
+    selected one. Admins using it need UserFilterMediaMixin for the widget's
+    scripts.
+    """
+    title = 'user'
+    parameter_name = 'user'
+    template = 'admin/pomodoro/autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        self.field = forms.ModelChoiceField(
+            User.objects.all(), required=False, widget=self.widget(model_admin, {'onchange': 'this.form.submit()'}),
+        )
+
+    @staticmethod
+    def widget(model_admin, attrs=None):
+        return AutocompleteSelect(model_admin.model._meta.get_field('user'), model_admin.admin_site, attrs)
+
+    def lookups(self, request, model_admin):
+        # A single placeholder choice so the filter is rendered at all.
+        return [('', '')]
+
+    def choices(self, changelist):
+        yield {
+            'widget': self.field.widget.render(self.parameter_name, self.value()),
+            'hidden_params': [
+                (name, value) for name, values in changelist.filter_params.items()
+                if name not in (self.parameter_name, 'p') for value in values
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
+class UserFilterMediaMixin:
+    # The changelist only loads the admin's own media, not the filters'.
+    @property
+    def media(self):
+        return super().media + UserAutocompleteFilter.widget(self).media
+
+
+class TrackedDeleteMixin:
+    # Deletions leave tombstones so delta sync clients drop the rows too.
+    def delete_model(self, request, obj):
+        delete_tracked(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_tracked(queryset)
+
+
+class CacheVersionMixin:
+    # Admin edits invalidate the owners' cached API responses.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_versions([obj.user_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_versions([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        bump_versions(set(queryset.values_list('user_id', flat=True)))
+        super().delete_queryset(request, queryset)
+
+
 # Register other models
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(UserFilterMediaMixin, CacheVersionMixin, TrackedDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'user', 'color')
-    list_filter = ('user',)
+    list_filter = (UserAutocompleteFilter,)
+    list_select_related = ('user',)
     search_fields = ('name', 'user__email')
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(UserFilterMediaMixin, CacheVersionMixin, TrackedDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'user', 'color')
-    list_filter = ('user',)
+    list_filter = (UserAutocompleteFilter,)
+    list_select_related = ('user',)
     search_fields = ('name', 'user__email')
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'project', 'status', 'estimated_pomodoros')
-    list_filter = ('status', 'user', 'project')
+class TaskAdmin(UserFilterMediaMixin, CacheVersionMixin, TrackedDeleteMixin, admin.ModelAdmin):
+    list_display = ('name', 'user', 'project', 'status', 'estimated_pomodoros', 'completed_pomodoros')
+    list_filter = ('status', UserAutocompleteFilter)
+    list_select_related = ('user', 'project')
     search_fields = ('name', 'user__email')
-    filter_horizontal = ('tags',)
+    autocomplete_fields = ('user', 'project', 'tags')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        old_project_id = form.initial.get('project') if change else None
+        super().save_model(request, obj, form, change)
+        if change:
+            move_task_focus({obj.pk: (obj.user_id, old_project_id, obj.project_id)})
 
 
 @admin.register(Session)
-class SessionAdmin(admin.ModelAdmin):
+class SessionAdmin(UserFilterMediaMixin, CacheVersionMixin, TrackedDeleteMixin, admin.ModelAdmin):
     list_display = ('user', 'task', 'start_time', 'end_time', 'duration')
-    list_filter = ('start_time', 'user', 'task')
+    list_filter = (UserAutocompleteFilter,)
+    list_select_related = ('user', 'task')
     search_fields = ('user__email', 'task__name')
-    readonly_fields = ('start_time',)
\ No newline at end of file
+    readonly_fields = ('start_time',)
+    autocomplete_fields = ('user', 'task')
+    date_hierarchy = 'start_time'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Sessions feed the rollups, streaks, scores, pomodoro counts and user
+    # counters, so admin edits go through the same updates as the API.
+    def _entries(self, sessions):
+        return [focus_entry(session, session.user.zone) for session in sessions]
+
+    def _add_focus(self, added=(), removed=()):
+        totals = defaultdict(lambda: [0, 0])
+        for entries, sign in ((added, 1), (removed, -1)):
+            for entry in entries:
+                totals[entry.user_id][0] += entry.duration * sign
+                totals[entry.user_id][1] += sign
+        for user in User.objects.filter(pk__in=totals).order_by('pk'):
+            user.add_focus(*totals[user.pk])
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            removed = self._entries(Session.objects.select_related('user', 'task').filter(pk=obj.pk)) if change else []
+            super().save_model(request, obj, form, change)
+            added = self._entries([obj])
+            apply_focus_changes(added=added, removed=removed)
+            self._add_focus(added, removed)
+            # The session may have moved to another user.
+            bump_versions(entry.user_id for entry in removed)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            removed = self._entries([obj])
+            apply_focus_changes(removed=removed)
+            self._add_focus(removed=removed)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            removed = self._entries(queryset.select_related('user', 'task'))
+            apply_focus_changes(removed=removed)
+            self._add_focus(removed=removed)
+            super().delete_queryset(request, queryset)
+
+
+@admin.action(description='Retry selected jobs now')
+def retry_jobs(modeladmin, request, queryset):
+    queryset.update(status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_at=None)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    # Payloads can carry personal data and aren't meant to be edited.
+    exclude = ('payload',)
+    readonly_fields = ('last_error', 'locked_at', 'created_at')
+    actions = [retry_jobs]
+
+
+@admin.register(Goal)
+class GoalAdmin(UserFilterMediaMixin, admin.ModelAdmin):
+    list_display = ('user', 'task', 'project', 'daily_minutes')
+    list_filter = (UserAutocompleteFilter,)
+    list_select_related = ('user', 'task', 'project')
+    autocomplete_fields = ('user', 'task', 'project')
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(UserFilterMediaMixin, admin.ModelAdmin):
+    list_display = ('user', 'metric', 'period', 'period_start', 'country', 'score', 'global_rank', 'country_rank')
+    list_filter = ('metric', 'period', UserAutocompleteFilter)
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
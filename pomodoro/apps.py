@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PomodoroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pomodoro'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .performance import instrument_connection
+
+        connection_created.connect(instrument_connection, dispatch_uid='pomodoro.performance')
@@ -0,0 +1,154 @@
+"""Async-native versions of the hottest read endpoints.
+
+Under an ASGI server these run on the event loop and use Django's async
+ORM, so a slow query doesn't tie up a worker. They return the same
+representations as the DRF viewsets, but page with a plain keyset cursor.
+"""
+import base64
+import binascii
+import functools
+import json
+import zoneinfo
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import Session, Task
+from .serializers import SessionSerializer, StatsQuerySerializer, TaskSerializer, UserSerializer
+from .stats import afocus_series, summarize
+
+
+User = get_user_model()
+
+
+def authenticate(request):
+    """The user id from a valid access token, or None.
+
+    Like the sync endpoints that only filter by id, this doesn't load the
+    user; views that need the row load it themselves.
+    """
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return User._meta.pk.to_python(AccessToken(parts[1])[jwt_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError, ValidationError):
+        return None
+
+
+def authenticated(view):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user_id = authenticate(request)
+        if user_id is None:
+            return _unauthorized()
+        request.user_id = user_id
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('page_size', settings.REST_FRAMEWORK['PAGE_SIZE']))
+    except ValueError:
+        size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(request):
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor.")
+
+
+def _next_link(request, values):
+    query = request.GET.copy()
+    query['cursor'] = _encode_cursor(values)
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+async def _page(request, queryset, serializer_class, cursor_values):
+    size = _page_size(request)
+    rows = [row async for row in queryset[:size + 1]]
+    next_link = _next_link(request, cursor_values(rows[size - 1])) if len(rows) > size else None
+    return {'next': next_link, 'results': serializer_class(rows[:size], many=True).data}
+
+
+@authenticated
+async def session_list(request):
+    queryset = Session.objects.filter(user_id=request.user_id).order_by('-start_time', '-id')
+    try:
+        cursor = _decode_cursor(request)
+        if cursor:
+            start_time, pk = datetime.fromisoformat(cursor[0]), int(cursor[1])
+            queryset = queryset.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=pk))
+    except (ValueError, TypeError, IndexError):
+        return _json({'detail': 'Invalid cursor.'}, status=404)
+    # isoformat() keeps the microseconds that DjangoJSONEncoder would cut,
+    # without which the seek skips rows tied on the truncated time.
+    page = await _page(request, queryset, SessionSerializer, lambda session: [session.start_time.isoformat(), session.pk])
+    return _json(page)
+
+
+@authenticated
+async def task_list(request):
+    queryset = Task.objects.filter(user_id=request.user_id).prefetch_related('tags').order_by('id')
+    status = request.GET.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+    try:
+        cursor = _decode_cursor(request)
+        if cursor:
+            queryset = queryset.filter(id__gt=int(cursor[0]))
+    except (ValueError, TypeError, IndexError):
+        return _json({'detail': 'Invalid cursor.'}, status=404)
+    page = await _page(request, queryset, TaskSerializer, lambda task: [task.pk])
+    return _json(page)
+
+
+@authenticated
+async def profile(request):
+    lookup = {jwt_settings.USER_ID_FIELD: request.user_id, 'is_active': True}
+    try:
+        user = await User.objects.prefetch_related('groups', 'user_permissions').aget(**lookup)
+    except User.DoesNotExist:
+        return _unauthorized()
+    return _json(UserSerializer(user).data)
+
+
+@authenticated
+async def stats(request):
+    # Only the time zone is needed, for the default date range.
+    zone = await User.objects.filter(pk=request.user_id).values_list('timezone', flat=True).afirst()
+    query = StatsQuerySerializer(data=request.GET, context={'zone': zoneinfo.ZoneInfo(zone or 'UTC')})
+    if not query.is_valid():
+        return _json(query.errors, status=400)
+    params = query.validated_data
+    series = await afocus_series(request.user_id, params['period'], params['start'], params['end'])
+    return _json(summarize(params['period'], params['start'], params['end'], series))
@@ -0,0 +1,103 @@
+"""JWT authentication that doesn't load the user row on every request.
+
+``request.user`` is a lazy proxy carrying the id from the token; the user is
+only fetched when a view reads something other than ``id``/``pk`` or the
+authentication flags, and then from a short-lived per-process cache. A
+deactivated user is rejected once that cache entry expires
+(``AUTH_USER_CACHE_TTL`` seconds); endpoints that only filter by id behave
+like ``JWTStatelessUserAuthentication`` until the access token expires.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+User = get_user_model()
+
+MAX_CACHED_USERS = 10000
+
+_users = {}
+_lock = threading.Lock()
+
+
+def get_cached_user(user_id):
+    """Return a private copy of the user, loading it if the cached one is stale."""
+    key = str(user_id)
+    now = time.monotonic()
+    with _lock:
+        entry = _users.get(key)
+    if entry is None or entry[0] <= now:
+        user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        with _lock:
+            if len(_users) >= MAX_CACHED_USERS:
+                _users.clear()
+            _users[key] = (now + settings.AUTH_USER_CACHE_TTL, user)
+    else:
+        user = entry[1]
+    # Views mutate request.user (e.g. add_focus), so never hand out the shared instance.
+    return copy.copy(user)
+
+
+def forget_user(user_id):
+    with _lock:
+        _users.pop(str(user_id), None)
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
+
+
+class LazyUser(SimpleLazyObject):
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, validated_token):
+        self.__dict__['_user_id'] = User._meta.pk.to_python(user_id)
+        super().__init__(lambda: _load_user(user_id, validated_token))
+
+    @property
+    def id(self):
+        return self._user_id
+
+    pk = id
+
+    def __bool__(self):
+        # IsAuthenticated checks truthiness first; don't load for that.
+        return True
+
+
+def _load_user(user_id, validated_token):
+    try:
+        user = get_cached_user(user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        return LazyUser(user_id, validated_token)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = 'pomodoro.authentication.CachedJWTAuthentication'
@@ -0,0 +1,291 @@
+"""Load-generation helpers and the synthetic dataset used by the benchmark commands."""
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .goals import rebuild_goals
+from .leaderboard import rebuild_scores
+from .models import Project, Session, Tag, Task
+from .stats import rebuild_rollups
+
+
+User = get_user_model()
+
+BENCH_DOMAIN = 'bench.invalid'
+BENCH_PASSWORD = 'bench-password'
+COUNTRIES = ['NL', 'DE', 'US', 'IN', 'BR', 'JP', 'NG', 'GB', 'FR', 'ID']
+DURATIONS = [25] * 6 + [15, 45, 50, 90]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize_latencies(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    completed = len(latencies)
+    return {
+        'requests': completed + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(completed / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': _ms(percentile(latencies, 50)),
+            'p90': _ms(percentile(latencies, 90)),
+            'p99': _ms(percentile(latencies, 99)),
+            'max': _ms(max(latencies) if latencies else None),
+        },
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def run_load(send, requests, concurrency=1):
+    """Call ``send(index)`` for each of ``requests`` request indexes from ``concurrency`` threads.
+
+    ``send`` returns the response status and the number of queries it ran,
+    or None when it can't tell; statuses of 400 and up count as errors.
+    Returns summarize_latencies() plus per-request query counts when
+    ``send`` reported them.
+    """
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        local_latencies, local_queries, local_errors = [], [], 0
+        while True:
+            with lock:
+                index = next(remaining, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            status, count = send(index)
+            if status < 400:
+                local_latencies.append(time.perf_counter() - started)
+            else:
+                local_errors += 1
+            if count is not None:
+                local_queries.append(count)
+        with lock:
+            latencies.extend(local_latencies)
+            queries.extend(local_queries)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result = summarize_latencies(latencies, time.perf_counter() - started, sum(errors))
+    if queries:
+        result['queries_per_request'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        }
+    return result
+
+
+def run_http_load(url, requests, concurrency, headers=None, method='GET', body=None):
+    """Hit ``url`` ``requests`` times from ``concurrency`` keep-alive connections."""
+    target = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+    path = target.path + (f'?{target.query}' if target.query else '')
+    local = threading.local()
+    opened = []
+
+    def send(index):
+        if getattr(local, 'connection', None) is None:
+            local.connection = connection_class(target.netloc, timeout=30)
+            opened.append(local.connection)
+        try:
+            local.connection.request(method, path, body=body, headers=headers or {})
+            response = local.connection.getresponse()
+            response.read()
+            return response.status, None
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            local.connection = None
+            return 599, None
+
+    try:
+        return run_load(send, requests, concurrency)
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+def seed_users(count, projects=3, tags=5, tasks=20, sessions=200, days=90, seed=0, batch=100):
+    """Create ``count`` users with projects, tags, tasks and session history via bulk_create.
+
+    Users get the address ``userN@bench.invalid`` and BENCH_PASSWORD. Focus
+    counters, rollups, streaks and leaderboard entries are rebuilt at the
+    end so the data looks like it came through the API. Returns the user ids.
+    """
+    rng = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)  # Hashed once; it's deliberately slow.
+    now = timezone.now()
+    first = User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').count()
+    user_ids = []
+    for start in range(first, first + count, batch):
+        users = User.objects.bulk_create(
+            User(email=f'user{i}@{BENCH_DOMAIN}', password=password, is_active=True, country=rng.choice(COUNTRIES))
+            for i in range(start, min(start + batch, first + count))
+        )
+        user_ids += [user.pk for user in users]
+        owned_projects = Project.objects.bulk_create(
+            Project(user=user, name=f'Project {i}') for user in users for i in range(projects)
+        )
+        owned_tags = Tag.objects.bulk_create(Tag(user=user, name=f'Tag {i}') for user in users for i in range(tags))
+        by_user = {user.pk: ([], []) for user in users}
+        for project in owned_projects:
+            by_user[project.user_id][0].append(project)
+        for tag in owned_tags:
+            by_user[tag.user_id][1].append(tag)
+
+        owned_tasks = Task.objects.bulk_create(
+            Task(
+                user_id=user_id, name=f'Task {i}', estimated_pomodoros=rng.randint(1, 8),
+                project=rng.choice(user_projects) if user_projects and rng.random() < 0.8 else None,
+                status='active' if rng.random() < 0.8 else 'disabled',
+            )
+            for user_id, (user_projects, _) in by_user.items() for i in range(tasks)
+        )
+        Task.tags.through.objects.bulk_create(
+            Task.tags.through(task_id=task.pk, tag_id=tag.pk)
+            for task in owned_tasks
+            for tag in rng.sample(by_user[task.user_id][1], min(len(by_user[task.user_id][1]), rng.randint(0, 2)))
+        )
+        tasks_by_user = {}
+        for task in owned_tasks:
+            tasks_by_user.setdefault(task.user_id, []).append(task)
+
+        rows = []
+        for user_id in by_user:
+            for _ in range(sessions):
+                # Mostly working hours, a few tasks getting most of the time.
+                started = now - timedelta(days=rng.randrange(days), hours=rng.triangular(0, 14, 6))
+                duration = rng.choice(DURATIONS)
+                task = rng.choice(tasks_by_user.get(user_id, [None])[:5]) if rng.random() < 0.85 else None
+                rows.append(Session(
+                    user_id=user_id, task=task, start_time=started,
+                    end_time=started + timedelta(minutes=duration), duration=duration,
+                ))
+        Session.objects.bulk_create(rows, batch_size=2000)
+
+        totals = {user_id: [0, 0] for user_id in by_user}
+        for row in rows:
+            totals[row.user_id][0] += row.duration
+            totals[row.user_id][1] += 1
+        User.objects.bulk_update(
+            [
+                User(pk=user_id, total_focus_time=minutes, total_sessions=number,
+                     average_focus_time=minutes / number if number else 0.0)
+                for user_id, (minutes, number) in totals.items()
+            ],
+            ['total_focus_time', 'total_sessions', 'average_focus_time'],
+        )
+
+    rebuild_rollups(user_ids)
+    rebuild_goals(user_ids)
+    rebuild_scores(user_ids)
+    return user_ids
+
+
+class ClientTransport:
+    """Sends scenario requests through Django's test client, counting queries."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def send(self, method, path, body=None, headers=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                method, path, json.dumps(body) if body is not None else '',
+                content_type='application/json', headers=headers,
+            )
+        return response.status_code, len(queries)
+
+
+class HTTPTransport:
+    """Sends scenario requests to a running server over one keep-alive connection per thread."""
+
+    def __init__(self, base_url):
+        target = urlsplit(base_url)
+        self.netloc = target.netloc
+        self.prefix = target.path.rstrip('/')
+        self.connection_class = (
+            http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.local = threading.local()
+
+    def send(self, method, path, body=None, headers=None):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = self.connection_class(self.netloc, timeout=30)
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        try:
+            self.local.connection.request(
+                method.upper(), self.prefix + path, body=json.dumps(body) if body is not None else None, headers=headers,
+            )
+            response = self.local.connection.getresponse()
+            response.read()
+            return response.status, None
+        except (OSError, http.client.HTTPException):
+            self.local.connection.close()
+            self.local.connection = None
+            return 599, None
+
+
+def _session_body(rng):
+    started = timezone.now() - timedelta(minutes=rng.randrange(60 * 24 * 30))
+    return {'start_time': started.isoformat(), 'duration': rng.choice(DURATIONS)}
+
+
+# name -> (method, path, body factory or None, authenticated)
+SCENARIOS = {
+    'login': ('post', '/api/token/', lambda rng, user: {'email': user.email, 'password': BENCH_PASSWORD}, False),
+    'list_sessions': ('get', '/api/sessions/', None, True),
+    'create_session': ('post', '/api/sessions/', lambda rng, user: _session_body(rng), True),
+    'list_tasks': ('get', '/api/tasks/', None, True),
+    'profile': ('get', '/api/me/', None, True),
+}
+
+
+def run_scenario(transport, name, users, tokens, requests, concurrency=1, seed=0):
+    """Send ``requests`` requests of scenario ``name``, rotating through ``users``.
+
+    Returns summarize_latencies() plus per-request query counts when the
+    transport reports them.
+    """
+    method, path, make_body, authenticated = SCENARIOS[name]
+    rng = random.Random(seed)
+    plan = [users[i % len(users)] for i in range(requests)]
+    bodies = [make_body(rng, user) if make_body else None for user in plan]
+
+    def send(index):
+        headers = {'Authorization': f'Bearer {tokens[plan[index].pk]}'} if authenticated else {}
+        return transport.send(method, path, bodies[index], headers)
+
+    return run_load(send, requests, concurrency)
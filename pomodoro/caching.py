@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .replicas import pin_to_primary
+
+
+def _version_key(user_id):
+    return f'pomodoro:cache-version:{user_id}'
+
+
+def get_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Seeded from the clock so an evicted counter never comes back at a
+        # value whose cached responses could still be around.
+        cache.add(_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _bump(user_ids):
+    # Responses cached from here on must not come from a lagging replica.
+    pin_to_primary(user_ids)
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def bump_versions(user_ids):
+    """Invalidate every cached response of these users once the transaction commits."""
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+class CachedResponseMixin:
+    """Caches list and detail responses per user, with ETag revalidation.
+
+    Cache keys include a per-user version that any successful write through
+    the viewset bumps, so nothing is ever served stale after a write.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        version = get_version(request.user.id)
+        fingerprint = hashlib.md5(
+            f'{request.get_full_path()}|{request.accepted_media_type}'.encode()
+        ).hexdigest()
+        etag = f'"{version}-{fingerprint}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'pomodoro:response:{request.user.id}:{version}:{fingerprint}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            bump_versions([request.user.id])
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import job
+from .otp import new_otp
+
+
+OTP_SUBJECTS = {
+    'verify': "Verify your Pomodoro account",
+    'reset': "Reset your Pomodoro password",
+}
+
+
+def _lifetime(seconds):
+    if seconds % 60:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    minutes = seconds // 60
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+# The code is made here rather than passed in, so it is never stored in
+# the job's payload.
+@job
+def send_otp_email(email, purpose):
+    otp = new_otp(email, purpose)
+    send_mail(
+        OTP_SUBJECTS[purpose],
+        f"Your one-time code is {otp}. It expires in {_lifetime(settings.OTP_TTL)}.",
+        None,
+        [email],
+    )
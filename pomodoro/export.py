@@ -0,0 +1,95 @@
+"""Streaming session exports.
+
+Rows are read with ``values_list().iterator()`` and written out chunk by
+chunk, so memory stays flat however long a user's history is.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Session
+
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Column name -> lookup.
+COLUMNS = {
+    'id': 'id',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'duration': 'duration',
+    'task_id': 'task_id',
+    'task': 'task__name',
+    'project_id': 'task__project_id',
+    'project': 'task__project__name',
+    'client_id': 'client_id',
+}
+USER_COLUMNS = {
+    'user_id': 'user_id',
+    'user_email': 'user__email',
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def session_export_queryset(user_ids=None, start=None, end=None, task=None, project=None, using=None):
+    """Sessions in chronological order; ``start`` and ``end`` are inclusive dates."""
+    queryset = Session.objects.using(using).order_by('user_id', 'start_time', 'id')
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    if start:
+        queryset = queryset.filter(start_time__gte=_day_start(start))
+    if end:
+        queryset = queryset.filter(start_time__lt=_day_start(end + timedelta(days=1)))
+    if task:
+        queryset = queryset.filter(task_id=task)
+    if project:
+        queryset = queryset.filter(task__project_id=project)
+    return queryset
+
+
+def export_rows(queryset, columns):
+    lookups = [COLUMNS.get(column) or USER_COLUMNS[column] for column in columns]
+    return queryset.values_list(*lookups).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows, columns):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def stream_export(queryset, export_format, columns=tuple(COLUMNS)):
+    """Yield the export as text chunks of up to EXPORT_CHUNK_SIZE rows."""
+    columns = list(columns)
+    rows = export_rows(queryset, columns)
+    lines = _csv_lines(rows, columns) if export_format == 'csv' else _ndjson_lines(rows, columns)
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= settings.EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,269 @@
+"""Daily goals, streaks and completed-pomodoro counts, kept up incrementally.
+
+apply_focus_changes() hands every rollup day it touches to evaluate_days()
+together with the day's focus before and after the write. Only streaks
+whose met/unmet status flipped on some day are looked at, and in the usual
+case (today's first session, or one more day on the end of a run) that is
+arithmetic on the stored run. A backdated day walks just the runs next to
+it in the rollups; un-meeting a day inside the longest run, or a streak
+with no stored state yet, rebuilds that streak from the user's rollups.
+Days are the user's local days, as the rollups are.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import DailyFocus, Goal, Session, Streak, Task
+
+
+User = get_user_model()
+
+ONE_DAY = timedelta(days=1)
+ROLLUP_FIELDS = ('date', 'focus_time', 'task_breakdown', 'project_breakdown')
+# (focus_time, task_breakdown, project_breakdown) of a day without sessions.
+EMPTY_DAY = (0, {}, {})
+
+
+def count_pomodoros(duration):
+    return duration // settings.POMODORO_LENGTH
+
+
+def day_state(rollup):
+    return rollup.focus_time, dict(rollup.task_breakdown), dict(rollup.project_breakdown)
+
+
+def goal_minutes(goal, focus_time, task_breakdown, project_breakdown):
+    """The minutes a day's focus puts towards ``goal``."""
+    if goal.task_id:
+        return task_breakdown.get(str(goal.task_id), {}).get('focus_time', 0)
+    if goal.project_id:
+        return project_breakdown.get(str(goal.project_id), {}).get('focus_time', 0)
+    return focus_time
+
+
+def is_met(goal, focus_time, task_breakdown, project_breakdown):
+    if goal is None:
+        return focus_time > 0
+    return goal_minutes(goal, focus_time, task_breakdown, project_breakdown) >= goal.daily_minutes
+
+
+def add_pomodoros(changes):
+    """Apply {task_id: delta} to the tasks' counters; returns whether any changed."""
+    changed = False
+    for task_id, delta in sorted(changes.items(), key=lambda item: item[0] or 0):
+        if task_id and delta:
+            # updated_at puts the new count in the next sync delta.
+            Task.objects.filter(pk=task_id).update(
+                completed_pomodoros=Greatest(F('completed_pomodoros') + delta, 0), updated_at=timezone.now(),
+            )
+            changed = True
+    return changed
+
+
+class _Runs:
+    """Tracks the latest and longest runs over met days fed in ascending order."""
+
+    def __init__(self):
+        self.start = self.end = self.longest_end = None
+        self.longest = 0
+
+    def add(self, day):
+        if self.end is not None and day == self.end + ONE_DAY:
+            self.end = day
+        else:
+            self.start = self.end = day
+        length = (self.end - self.start).days + 1
+        if length > self.longest:
+            self.longest, self.longest_end = length, self.end
+
+    def save_to(self, streak):
+        streak.run_start, streak.run_end = self.start, self.end
+        streak.longest, streak.longest_end = self.longest, self.longest_end
+
+
+def _rollups(user_id):
+    return DailyFocus.objects.filter(user_id=user_id).values_list(*ROLLUP_FIELDS)
+
+
+def build_streak(streak):
+    """Recompute ``streak`` from all of its user's rollups."""
+    runs = _Runs()
+    for day, *values in _rollups(streak.user_id).order_by('date').iterator(chunk_size=500):
+        if is_met(streak.goal, *values):
+            runs.add(day)
+    runs.save_to(streak)
+
+
+def _run_edge(streak, day, step, until=None):
+    """The far end of the run of met days next to ``day`` in direction ``step``.
+
+    Returns ``day`` itself when its neighbour isn't met; stops at ``until``.
+    """
+    rows = _rollups(streak.user_id)
+    rows = rows.filter(date__gt=day).order_by('date') if step > timedelta(0) else rows.filter(date__lt=day).order_by('-date')
+    edge = day
+    for date, *values in rows.iterator(chunk_size=31):
+        if date != edge + step or not is_met(streak.goal, *values):
+            break
+        edge = date
+        if edge == until:
+            break
+    return edge
+
+
+def _previous_met_day(streak, day):
+    rows = _rollups(streak.user_id).filter(date__lt=day).order_by('-date')
+    for date, *values in rows.iterator(chunk_size=31):
+        if is_met(streak.goal, *values):
+            return date
+    return None
+
+
+def _extend_longest(streak, start, end):
+    length = (end - start).days + 1
+    if length > streak.longest:
+        streak.longest, streak.longest_end = length, end
+
+
+def _add_day(streak, day):
+    if streak.run_end is None or day > streak.run_end + ONE_DAY:
+        streak.run_start = streak.run_end = day
+    elif day == streak.run_end + ONE_DAY:
+        streak.run_end = day
+    elif day >= streak.run_start:
+        return
+    else:
+        # A backdated day joins the run before it, and maybe the runs after it.
+        start = _run_edge(streak, day, -ONE_DAY)
+        end = _run_edge(streak, day, ONE_DAY, until=streak.run_start)
+        if end == streak.run_start:
+            streak.run_start, end = start, streak.run_end
+        _extend_longest(streak, start, end)
+        return
+    _extend_longest(streak, streak.run_start, streak.run_end)
+
+
+def _remove_day(streak, day):
+    longest_start = streak.longest_end - timedelta(days=streak.longest - 1) if streak.longest_end else None
+    if longest_start and longest_start <= day <= streak.longest_end:
+        # The longest run may now be any earlier one.
+        build_streak(streak)
+        return
+    if streak.run_end is None or not streak.run_start <= day <= streak.run_end:
+        return
+    if day == streak.run_start == streak.run_end:
+        previous = _previous_met_day(streak, day)
+        if previous is None:
+            streak.run_start = streak.run_end = None
+        else:
+            streak.run_start, streak.run_end = _run_edge(streak, previous, -ONE_DAY), previous
+    elif day == streak.run_end:
+        streak.run_end = day - ONE_DAY
+    else:
+        streak.run_start = day + ONE_DAY
+
+
+def evaluate_days(changes):
+    """Update streaks for (user_id, date, before, after) rollup changes.
+
+    ``before`` and ``after`` are day_state() tuples; the rollups must
+    already hold the new values.
+    """
+    by_user = defaultdict(list)
+    for user_id, day, before, after in changes:
+        by_user[user_id].append((day, before, after))
+    if not by_user:
+        return
+    streaks = {
+        (streak.user_id, streak.goal_id): streak
+        for streak in Streak.objects.select_for_update().filter(user_id__in=by_user)
+    }
+    goals = defaultdict(list)
+    for goal in Goal.objects.filter(user_id__in=by_user):
+        goals[goal.user_id].append(goal)
+
+    for user_id, days in by_user.items():
+        for goal in [None] + goals[user_id]:
+            flips = sorted(
+                (day, is_met(goal, *after)) for day, before, after in days
+                if is_met(goal, *before) != is_met(goal, *after)
+            )
+            if not flips:
+                continue
+            streak = streaks.get((user_id, goal.pk if goal else None))
+            if streak is None:
+                streak = Streak(user_id=user_id, goal=goal)
+                build_streak(streak)
+            else:
+                streak.goal = goal
+                for day, met in flips:
+                    (_add_day if met else _remove_day)(streak, day)
+            streak.save()
+
+
+def user_streak(user_id):
+    """The user's own streak, built from their rollups the first time it's needed."""
+    streak = Streak.objects.filter(user_id=user_id, goal=None).first()
+    if streak is None:
+        streak = Streak(user_id=user_id)
+        build_streak(streak)
+        streak.save()
+    return streak
+
+
+def rebuild_goal_streak(goal):
+    streak = Streak.objects.filter(goal=goal).first() or Streak(user_id=goal.user_id)
+    streak.goal = goal
+    build_streak(streak)
+    streak.save()
+    return streak
+
+
+def rebuild_goals(user_ids=None, chunk_size=500):
+    """Recompute streaks and tasks' completed pomodoros from the stored data.
+
+    Returns the number of streaks written.
+    """
+    tasks = Task.objects.all()
+    if user_ids is not None:
+        tasks = tasks.filter(user_id__in=user_ids)
+    pomodoros = (
+        Session.objects.filter(task=OuterRef('pk')).order_by().values('task')
+        .annotate(total=Sum(F('duration') / settings.POMODORO_LENGTH)).values('total')
+    )
+    counted = Coalesce(Subquery(pomodoros, output_field=IntegerField()), Value(0))
+    # Only changed counts are written, so a rebuild doesn't put every task in the next sync delta.
+    tasks.exclude(completed_pomodoros=counted).update(completed_pomodoros=counted, updated_at=timezone.now())
+
+    if user_ids is None:
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    user_ids = list(user_ids)
+    written = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        goals = defaultdict(list)
+        for goal in Goal.objects.filter(user_id__in=chunk):
+            goals[goal.user_id].append(goal)
+        streaks = {}
+        for user_id in chunk:
+            for goal in [None] + goals[user_id]:
+                streaks[user_id, goal] = (Streak(user_id=user_id, goal=goal), _Runs())
+        rows = DailyFocus.objects.filter(user_id__in=chunk).order_by('user_id', 'date')
+        for user_id, *row in rows.values_list('user_id', *ROLLUP_FIELDS).iterator(chunk_size=2000):
+            day, values = row[0], row[1:]
+            for goal in [None] + goals[user_id]:
+                if is_met(goal, *values):
+                    streaks[user_id, goal][1].add(day)
+        for streak, runs in streaks.values():
+            runs.save_to(streak)
+        with transaction.atomic():
+            Streak.objects.filter(user_id__in=chunk).delete()
+            Streak.objects.bulk_create([streak for streak, _ in streaks.values()])
+        written += len(streaks)
+    return written
@@ -0,0 +1,248 @@
+"""Bulk import of session and task history from CSV, NDJSON or a JSON array.
+
+The file is parsed as a stream and handled in chunks of IMPORT_CHUNK_SIZE
+rows: each chunk is validated, the projects, tags and tasks it names are
+looked up or created in a few set-based queries, and its sessions go in
+with one ``bulk_create``; counters, daily rollups, streaks and leaderboard
+scores are recomputed once at the end. The whole import runs in one transaction, so a
+file with invalid rows changes nothing. Rows use the export's column names
+(``start_time``, ``end_time``, ``duration``, ``task``, ``project``,
+``client_id``) plus optional ``tags``. A row with ``type`` set to ``task``
+declares a task without a session (``status``, ``estimated_pomodoros``,
+``color``). Tasks, projects and tags are matched by name, and existing
+ones are reused unchanged.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from .caching import bump_versions
+from .goals import rebuild_goals
+from .leaderboard import rebuild_scores
+from .models import Project, Session, Tag, Task
+from .serializers import SessionImportSerializer, TaskImportSerializer
+from .stats import rebuild_rollups
+
+
+FORMATS = ('csv', 'ndjson', 'json')
+
+
+class ImportFailed(Exception):
+    def __init__(self, errors):
+        super().__init__("The file contains invalid rows.")
+        self.errors = errors
+
+
+def _text_chunks(stream, size=64 * 1024):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    while True:
+        data = stream.read(size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _lines(chunks):
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _csv_records(chunks):
+    for row in csv.DictReader(_lines(chunks)):
+        # Empty cells mean "not given", like a missing JSON key.
+        yield {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def _ndjson_records(chunks):
+    for number, line in enumerate(_lines(chunks), 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ImportFailed({number: ["Invalid JSON."]})
+
+
+def _json_array_records(chunks):
+    decoder = json.JSONDecoder()
+    buffer, position, opened = '', 0, False
+    for chunk in chunks:
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or (opened and buffer[position] == ',')):
+                position += 1
+            if position == len(buffer):
+                break
+            if not opened:
+                if buffer[position] != '[':
+                    raise ImportFailed({1: ["Expected a JSON array."]})
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                break  # Incomplete value; wait for the next chunk.
+            yield record
+    raise ImportFailed({0: ["Invalid or truncated JSON array."]})
+
+
+def read_records(stream, import_format=None):
+    """Yield row dicts from a binary file object without reading it all into memory."""
+    chunks = _text_chunks(stream)
+    first = next(chunks, '')
+    rest = (chunk for part in ([first], chunks) for chunk in part)
+    if import_format is None:
+        start = first.lstrip()[:1]
+        import_format = 'json' if start == '[' else 'ndjson' if start == '{' else 'csv'
+    readers = {'csv': _csv_records, 'ndjson': _ndjson_records, 'json': _json_array_records}
+    return readers[import_format](rest)
+
+
+class SessionImporter:
+    def __init__(self, user):
+        self.user = user
+        self.projects, self.tags, self.tasks = {}, {}, {}
+        self.links = set()
+        self.errors = {}
+        self.summary = {'sessions': 0, 'duplicates': 0, 'tasks': 0, 'projects': 0, 'tags': 0}
+        self.minutes = 0
+        self.session_serializer = SessionImportSerializer()
+        self.task_serializer = TaskImportSerializer()
+
+    def run(self, records):
+        with transaction.atomic():
+            numbered = enumerate(records, 1)
+            while chunk := list(islice(numbered, settings.IMPORT_CHUNK_SIZE)):
+                self.add_chunk(chunk)
+                if len(self.errors) >= settings.IMPORT_MAX_ERRORS:
+                    break
+            if self.errors:
+                raise ImportFailed(self.errors)
+            if self.summary['sessions']:
+                self.user.add_focus(self.minutes, sessions=self.summary['sessions'])
+                rebuild_rollups([self.user.id])
+                rebuild_goals([self.user.id])
+                rebuild_scores([self.user.id])
+            bump_versions([self.user.id])
+        return self.summary
+
+    def _validate(self, chunk):
+        # One serializer per row type is reused: building the fields is far
+        # slower than validating a row.
+        valid = []
+        for number, record in chunk:
+            if not isinstance(record, dict):
+                self.errors[number] = ["Expected an object."]
+                continue
+            serializer = self.task_serializer if record.get('type') == 'task' else self.session_serializer
+            try:
+                valid.append((type(serializer), serializer.run_validation(record)))
+            except ValidationError as exc:
+                self.errors[number] = as_serializer_error(exc)
+        return valid
+
+    def add_chunk(self, chunk):
+        rows = self._validate(chunk)
+        if self.errors:
+            return  # Keep collecting errors, but nothing will be written.
+
+        self._resolve(Project, self.projects, {attrs['project'] for _, attrs in rows if attrs.get('project')}, 'projects')
+        # Tags belong to tasks, so they're ignored on rows without one.
+        tag_names = {name for _, attrs in rows if attrs.get('task') for name in attrs.get('tags', ())}
+        self._resolve(Tag, self.tags, tag_names, 'tags')
+        self._resolve_tasks(rows)
+
+        sessions = []
+        client_ids = {attrs.get('client_id') for kind, attrs in rows if kind is SessionImportSerializer} - {None}
+        stored = Session.objects.filter(user_id=self.user.id, client_id__in=client_ids)
+        seen = set(stored.values_list('client_id', flat=True))
+        for kind, attrs in rows:
+            if kind is not SessionImportSerializer:
+                continue
+            client_id = attrs.get('client_id')
+            if client_id:
+                if client_id in seen:
+                    self.summary['duplicates'] += 1
+                    continue
+                seen.add(client_id)
+            task_id = self.tasks[self._task_key(attrs)] if attrs.get('task') else None
+            sessions.append(Session(
+                user_id=self.user.id, task_id=task_id, start_time=attrs['start_time'], end_time=attrs.get('end_time'),
+                duration=attrs.get('duration', 0), client_id=client_id,
+            ))
+        Session.objects.bulk_create(sessions)
+        self.summary['sessions'] += len(sessions)
+        self.minutes += sum(session.duration for session in sessions)
+
+    def _resolve(self, model, known, names, counter):
+        missing = names - known.keys()
+        if not missing:
+            return
+        # Descending, so the oldest row wins when a name is used twice.
+        existing = model.objects.filter(user_id=self.user.id, name__in=missing).order_by('-id')
+        known.update(existing.values_list('name', 'id'))
+        created = model.objects.bulk_create(model(user_id=self.user.id, name=name) for name in missing - known.keys())
+        known.update((instance.name, instance.pk) for instance in created)
+        self.summary[counter] += len(created)
+
+    def _task_key(self, attrs):
+        project = attrs.get('project')
+        return attrs['task'], self.projects[project] if project else None
+
+    def _resolve_tasks(self, rows):
+        wanted = {}
+        for kind, attrs in rows:
+            if attrs.get('task'):
+                key = self._task_key(attrs)
+                if kind is TaskImportSerializer or key not in wanted:
+                    wanted[key] = attrs
+        missing = wanted.keys() - self.tasks.keys()
+        if missing:
+            existing = Task.objects.filter(user_id=self.user.id, name__in={name for name, _ in missing}).order_by('-id')
+            for name, project_id, pk in existing.values_list('name', 'project_id', 'id'):
+                if (name, project_id) in missing:
+                    self.tasks[name, project_id] = pk
+            new = [key for key in missing if key not in self.tasks]
+            created = Task.objects.bulk_create(
+                Task(
+                    user_id=self.user.id, name=name, project_id=project_id,
+                    **{field: wanted[name, project_id][field]
+                       for field in ('status', 'estimated_pomodoros', 'color') if field in wanted[name, project_id]},
+                )
+                for name, project_id in new
+            )
+            self.tasks.update(zip(new, (task.pk for task in created)))
+            self.summary['tasks'] += len(created)
+
+        links = {
+            (self.tasks[self._task_key(attrs)], self.tags[name])
+            for _, attrs in rows if attrs.get('task') for name in attrs.get('tags', ())
+        } - self.links
+        Task.tags.through.objects.bulk_create(
+            [Task.tags.through(task_id=task_id, tag_id=tag_id) for task_id, tag_id in links],
+            ignore_conflicts=True,
+        )
+        self.links |= links
+
+
+def import_sessions(user, stream, import_format=None):
+    return SessionImporter(user).run(read_records(stream, import_format))
@@ -0,0 +1,135 @@
+"""A small background job queue.
+
+Decorating a function with ``@job`` gives it a ``delay(**kwargs)`` method.
+With ``JOB_QUEUE_BACKEND = 'database'`` (the default) that stores a Job row
+in the caller's transaction and ``manage.py run_jobs`` executes it; with
+``'thread'`` it runs after commit on an in-process worker thread, which
+suits a single-process deployment. Failures are retried with exponential
+backoff until ``max_attempts`` is reached. Payloads must be JSON-serializable.
+"""
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def job(func=None, *, max_attempts=None):
+    def decorate(func):
+        name = f'{func.__module__}.{func.__name__}'
+        func.delay = lambda **kwargs: enqueue(name, kwargs, max_attempts)
+        func.is_job = True
+        return func
+    return decorate(func) if func is not None else decorate
+
+
+def enqueue(name, payload, max_attempts=None):
+    max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+    if settings.JOB_QUEUE_BACKEND == 'thread':
+        transaction.on_commit(lambda: _get_executor().submit(_run_with_retries, name, payload, max_attempts))
+        return None
+    return Job.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def _resolve(name):
+    func = import_string(name)
+    if not getattr(func, 'is_job', False):
+        raise ImportError(f"{name} is not a job.")
+    return func
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.JOB_THREAD_WORKERS, thread_name_prefix='jobs')
+        return _executor
+
+
+def _run_with_retries(name, payload, max_attempts):
+    try:
+        for attempt in range(1, max_attempts + 1):
+            try:
+                _resolve(name)(**payload)
+                return
+            except Exception:
+                if attempt == max_attempts:
+                    logger.exception("Job %s failed after %d attempts.", name, attempt)
+                    return
+                logger.warning("Job %s failed (attempt %d), retrying.", name, attempt, exc_info=True)
+                time.sleep(retry_delay(attempt).total_seconds())
+    finally:
+        close_old_connections()
+
+
+def claim_jobs(limit):
+    """Lock up to ``limit`` due jobs for this worker.
+
+    Jobs left running by a worker that died are picked up again after
+    JOB_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale))
+            .order_by('run_at')[:limit]
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    """Run a claimed job; successful jobs are deleted, failed ones rescheduled."""
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("Worker timed out on the final attempt.")
+        _resolve(job.name)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed permanently: %s", job.pk, job.name, error)
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, locked_at=None, last_error=error)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, locked_at=None, last_error=error,
+                run_at=timezone.now() + retry_delay(job.attempts),
+            )
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=100):
+    """Run one batch of due jobs and return (succeeded, failed)."""
+    succeeded = failed = 0
+    for job in claim_jobs(limit):
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
@@ -0,0 +1,335 @@
+"""Precomputed global and per-country leaderboards.
+
+Every board is a set of LeaderboardEntry rows keyed by metric, period and
+period start ('all' boards use ALL_TIME). There are two metrics: focus
+time, and streaks, the longest run of consecutive days with focus within
+the period (the user's longest ever on the 'all' board; streaks have no day
+boards, where every run is one day long). Periods are made of the users'
+local days, as the rollups are, and only active users are ranked.
+
+Scores are written incrementally: each session write schedules
+refresh_scores() for the (user, day) pairs it touched, which re-reads a few
+rollup rows and upserts the user's entries once the transaction commits.
+Ranks are positions by score (ties broken by user id) filled in by
+rank_board() in one set-based UPDATE per board, so reading the top of a
+board or a user's neighbours is an index range scan. Entries whose score
+changed since the last ranking keep their old rank until the next batch;
+new entries have none yet.
+"""
+from collections import defaultdict
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DailyFocus, LeaderboardEntry, Streak
+
+
+User = get_user_model()
+
+ALL_TIME = date(1970, 1, 1)
+PERIODS = [period for period, _ in LeaderboardEntry.PERIOD_CHOICES]
+METRICS = [metric for metric, _ in LeaderboardEntry.METRIC_CHOICES]
+METRIC_PERIODS = {
+    LeaderboardEntry.FOCUS: PERIODS,
+    LeaderboardEntry.STREAK: [period for period in PERIODS if period != 'day'],
+}
+CHUNK_SIZE = 2000
+# Local time runs from UTC-12 to UTC+14, so each date is in progress
+# somewhere for 50 hours.
+EARLIEST_OFFSET = timedelta(hours=-12)
+LATEST_OFFSET = timedelta(hours=14)
+FINAL_RANK_MARK_SECONDS = 3 * 24 * 3600
+
+
+def ranked_users():
+    """The users that appear on the boards."""
+    return User.objects.filter(is_active=True)
+
+
+def board_starts(day, metric=LeaderboardEntry.FOCUS):
+    """The start of each of ``metric``'s boards that ``day`` counts towards."""
+    starts = {
+        'all': ALL_TIME,
+        'day': day,
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1),
+    }
+    return {period: starts[period] for period in METRIC_PERIODS[metric]}
+
+
+def _board_end(period, start):
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(weeks=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def board(period, day, metric=LeaderboardEntry.FOCUS):
+    return LeaderboardEntry.objects.filter(metric=metric, period=period, period_start=board_starts(day, metric)[period])
+
+
+def top(period, day, country=None, limit=10, metric=LeaderboardEntry.FOCUS):
+    """The first ``limit`` ranked entries, globally or within ``country``."""
+    entries = board(period, day, metric)
+    if country:
+        entries = entries.filter(country=country, country_rank__lte=limit).order_by('country_rank')
+    else:
+        entries = entries.filter(global_rank__lte=limit).order_by('global_rank')
+    return list(entries)
+
+
+def around(user_id, period, day, by_country=False, neighbours=5, metric=LeaderboardEntry.FOCUS):
+    """The user's entry and the ranked entries within ``neighbours`` places of it.
+
+    Returns (None, []) when the user isn't on the board and (entry, []) when
+    the entry hasn't been ranked yet.
+    """
+    entries = board(period, day, metric)
+    entry = entries.filter(user_id=user_id).first()
+    rank_field = 'country_rank' if by_country else 'global_rank'
+    rank = getattr(entry, rank_field, None)
+    if rank is None:
+        return entry, []
+    if by_country:
+        entries = entries.filter(country=entry.country)
+    nearby = entries.filter(**{
+        f'{rank_field}__gte': max(rank - neighbours, 1),
+        f'{rank_field}__lte': rank + neighbours,
+    }).order_by(rank_field)
+    return entry, list(nearby)
+
+
+def schedule_refresh(user_dates):
+    """Refresh the scores fed by focus on these (user_id, date) pairs after commit."""
+    user_dates = set(user_dates)
+    if user_dates:
+        transaction.on_commit(lambda: refresh_scores(user_dates))
+
+
+def refresh_scores(user_dates):
+    """Recompute the user's entries on every board the given days fall in.
+
+    Period scores are recomputed from the daily rollups (at most a month of
+    rows per user and day); the all-time scores are the user's focus counter
+    and longest streak. So the result doesn't depend on what was stored
+    before, and users who are no longer ranked lose their entries.
+    """
+    keys = {
+        (user_id, metric, period, start)
+        for user_id, day in user_dates for metric in METRICS
+        for period, start in board_starts(day, metric).items()
+    }
+    if not keys:
+        return
+    user_ids = {key[0] for key in keys}
+    users = {
+        pk: (country or '', total) for pk, country, total in
+        ranked_users().filter(pk__in=user_ids).values_list('pk', 'country', 'total_focus_time')
+    }
+    longest = dict(Streak.objects.filter(user_id__in=users, goal=None).values_list('user_id', 'longest'))
+
+    # The week and month ranges cover the day boards too; weeks can straddle two months.
+    ranges = Q()
+    for user_id, metric, period, start in keys:
+        if period in ('week', 'month'):
+            ranges |= Q(user_id=user_id, date__gte=start, date__lt=_board_end(period, start))
+    rollups = defaultdict(list)
+    rows = DailyFocus.objects.filter(ranges).order_by('date').values_list('user_id', 'date', 'focus_time')
+    for user_id, day, focus_time in rows:
+        rollups[user_id].append((day, focus_time))
+
+    scores = {}
+    for key in keys:
+        user_id, metric, period, start = key
+        if user_id not in users:
+            scores[key] = 0
+        elif period == 'all':
+            scores[key] = users[user_id][1] if metric == LeaderboardEntry.FOCUS else longest.get(user_id, 0)
+        else:
+            end = _board_end(period, start)
+            scores[key] = _score(metric, [(day, minutes) for day, minutes in rollups[user_id] if start <= day < end])
+    _write_scores(scores, users)
+
+
+def _score(metric, days):
+    """A period's score from its (date, focus_time) rollups in date order."""
+    if metric == LeaderboardEntry.FOCUS:
+        return sum(focus_time for _, focus_time in days)
+    longest = run = 0
+    previous = None
+    for day, focus_time in days:
+        if focus_time <= 0:
+            continue
+        run = run + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+        longest, previous = max(longest, run), day
+    return longest
+
+
+def _write_scores(scores, users):
+    entries = [
+        LeaderboardEntry(
+            user_id=user_id, metric=metric, period=period, period_start=start, country=users[user_id][0], score=score,
+        )
+        for (user_id, metric, period, start), score in scores.items() if score > 0
+    ]
+    LeaderboardEntry.objects.bulk_create(
+        entries, update_conflicts=True,
+        unique_fields=['metric', 'period', 'period_start', 'user'], update_fields=['country', 'score'],
+    )
+    emptied = Q()
+    for (user_id, metric, period, start), score in scores.items():
+        if score <= 0:
+            emptied |= Q(user_id=user_id, metric=metric, period=period, period_start=start)
+    if emptied:
+        LeaderboardEntry.objects.filter(emptied).delete()
+
+
+def set_country(user_id, country):
+    """Move the user's entries after a profile change; ranks follow at the next batch."""
+    LeaderboardEntry.objects.filter(user_id=user_id).update(country=country or '')
+
+
+def rebuild_scores(user_ids=None, since=None):
+    """Recompute entries from the daily rollups, users' focus counters and streaks.
+
+    The all-time streak boards read the stored streaks, so rebuild those
+    first when they may be stale. Only boards starting on or after the week
+    containing the first of ``since``'s month are replaced (every board
+    when ``since`` is None), so a nightly run can stay small. Returns the
+    number of entries written.
+    """
+    users = ranked_users()
+    rollups = DailyFocus.objects.all()
+    entries = LeaderboardEntry.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    boundary = ALL_TIME
+    if since is not None:
+        boundary = board_starts(board_starts(since)['month'])['week']
+        rollups = rollups.filter(date__gte=boundary)
+        entries = entries.filter(Q(period='all') | Q(period_start__gte=boundary))
+
+    written = 0
+    with transaction.atomic():
+        entries.delete()
+        buffer = []
+
+        def flush(force=False):
+            nonlocal buffer, written
+            if buffer and (force or len(buffer) >= CHUNK_SIZE):
+                LeaderboardEntry.objects.bulk_create(buffer)
+                written += len(buffer)
+                buffer = []
+
+        all_time = [
+            (LeaderboardEntry.FOCUS, users.filter(total_focus_time__gt=0).values_list('pk', 'country', 'total_focus_time')),
+            (LeaderboardEntry.STREAK, Streak.objects.filter(user__in=users.values('pk'), goal=None, longest__gt=0)
+                .values_list('user_id', 'user__country', 'longest')),
+        ]
+        for metric, rows in all_time:
+            for user_id, country, score in rows.iterator(chunk_size=CHUNK_SIZE):
+                buffer.append(LeaderboardEntry(
+                    user_id=user_id, metric=metric, period='all', period_start=ALL_TIME, country=country or '', score=score,
+                ))
+                flush()
+
+        rows = (
+            rollups.filter(user__in=users.values('pk'), focus_time__gt=0)
+            .order_by('user_id', 'date').values_list('user_id', 'user__country', 'date', 'focus_time')
+        )
+        current, current_country, boards = None, '', defaultdict(list)
+        for user_id, country, day, focus_time in rows.iterator(chunk_size=CHUNK_SIZE):
+            if user_id != current:
+                buffer.extend(_period_entries(current, current_country, boards))
+                current, current_country, boards = user_id, country, defaultdict(list)
+            for period, start in board_starts(day).items():
+                # A month that began before the boundary keeps its stored entry.
+                if period != 'all' and start >= boundary:
+                    boards[period, start].append((day, focus_time))
+            flush()
+        buffer.extend(_period_entries(current, current_country, boards))
+        flush(force=True)
+    return written
+
+
+def _period_entries(user_id, country, boards):
+    entries = []
+    for (period, start), days in boards.items():
+        for metric in METRICS:
+            score = _score(metric, days) if period in METRIC_PERIODS[metric] else 0
+            if score > 0:
+                entries.append(LeaderboardEntry(
+                    user_id=user_id, metric=metric, period=period, period_start=start, country=country or '', score=score,
+                ))
+    return entries
+
+
+RANK_SQL = '''
+    UPDATE {table} SET global_rank = ranked.global_rank, country_rank = ranked.country_rank
+    FROM (
+        SELECT id,
+            ROW_NUMBER() OVER (ORDER BY score DESC, user_id) AS global_rank,
+            ROW_NUMBER() OVER (PARTITION BY country ORDER BY score DESC, user_id) AS country_rank
+        FROM {table}
+        WHERE metric = %s AND period = %s AND period_start = %s
+    ) AS ranked
+    WHERE {table}.id = ranked.id AND (
+        {table}.global_rank IS NULL OR {table}.global_rank <> ranked.global_rank
+        OR {table}.country_rank IS NULL OR {table}.country_rank <> ranked.country_rank
+    )
+'''
+
+
+def rank_board(period, start, metric=LeaderboardEntry.FOCUS):
+    """Renumber one board in a single statement; returns the rows whose rank changed."""
+    sql = RANK_SQL.format(table=connection.ops.quote_name(LeaderboardEntry._meta.db_table))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, [metric, period, connection.ops.adapt_datefield_value(start)])
+        return cursor.rowcount
+
+
+def rank_leaderboards(day, metric=LeaderboardEntry.FOCUS):
+    """Rank every ``metric`` board that ``day`` falls in, returning {period: rows changed}."""
+    return {period: rank_board(period, start, metric) for period, start in board_starts(day, metric).items()}
+
+
+def open_days(now=None):
+    """The local dates that are in progress in some time zone."""
+    now = now or timezone.now()
+    first = (now + EARLIEST_OFFSET).astimezone(dt_timezone.utc).date()
+    last = (now + LATEST_OFFSET).astimezone(dt_timezone.utc).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def _boards(days):
+    return {
+        (metric, period, start)
+        for day in days for metric in METRICS for period, start in board_starts(day, metric).items()
+    }
+
+
+def rank_open_boards(now=None):
+    """Rank every board still open in some time zone, and give just-closed boards their final ranks.
+
+    A board closes once its last day has ended everywhere, and is ranked a
+    last time on the first call after that. Which closed boards were done
+    is remembered in the cache, so with a per-process cache they are ranked
+    on every call until the next day closes. Returns {(metric, period,
+    start): rows changed}.
+    """
+    days = open_days(now)
+    current = _boards(days)
+    changed = {(metric, period, start): rank_board(period, start, metric) for metric, period, start in sorted(current)}
+    for metric, period, start in sorted(_boards([days[0] - timedelta(days=1)]) - current):
+        key = f'pomodoro:leaderboard-final:{metric}:{period}:{start}'
+        if cache.get(key) is None:
+            changed[metric, period, start] = rank_board(period, start, metric)
+            cache.set(key, 1, FINAL_RANK_MARK_SECONDS)
+    return changed
@@ -0,0 +1,86 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from pomodoro.benchmarks import summarize_latencies
+
+
+# mode: settings_dict overrides (None runs the configured settings as they are)
+MODES = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checks': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'configured': None,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the database side of simulated requests (request signals around a few "
+        "trivial queries) with a new connection per request, with persistent connections "
+        "with and without health checks, and with the configured settings (which may use "
+        "a pool). Prints JSON. Run it against the production database engine: SQLite "
+        "connections are nearly free to open."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--queries', type=int, default=3, help="Queries per simulated request.")
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--mode', action='append', choices=sorted(MODES), help="Only run these modes (repeatable).")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        results = {
+            'config': {
+                'vendor': connection.vendor,
+                'requests': options['requests'],
+                'queries': options['queries'],
+                'configured': {
+                    'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+                    'CONN_HEALTH_CHECKS': connection.settings_dict['CONN_HEALTH_CHECKS'],
+                    'pool': pool or None,
+                },
+            },
+            'modes': {},
+        }
+        for mode in options['mode'] or MODES:
+            overrides = MODES[mode] or {}
+            if pool and overrides.get('CONN_MAX_AGE'):
+                continue  # Django refuses persistent connections on a pooled alias.
+            results['modes'][mode] = self.run(connection, overrides, options['requests'], options['queries'])
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, connection, overrides, requests, queries):
+        saved = {key: connection.settings_dict[key] for key in overrides}
+        connection.close()
+        connection.settings_dict.update(overrides)
+        try:
+            # The first request connects in every mode; leave it out.
+            self.request(connection, queries)
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(requests):
+                request_started_at = time.perf_counter()
+                self.request(connection, queries)
+                latencies.append(time.perf_counter() - request_started_at)
+            return summarize_latencies(latencies, time.perf_counter() - started)
+        finally:
+            connection.close()
+            connection.settings_dict.update(saved)
+
+    def request(self, connection, queries):
+        # The same signals Django's handlers send, which open and close
+        # connections according to CONN_MAX_AGE and CONN_HEALTH_CHECKS.
+        request_started.send(sender=self.__class__)
+        try:
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+        finally:
+            request_finished.send(sender=self.__class__)
@@ -0,0 +1,101 @@
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pomodoro.benchmarks import summarize_latencies
+from pomodoro.goals import rebuild_goals
+from pomodoro.leaderboard import METRICS, around, rank_leaderboards, rebuild_scores, refresh_scores, top
+from pomodoro.models import DailyFocus
+from pomodoro.purge import purge_users
+
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'leaderboard-bench.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users, build and rank their leaderboards, and time top-N, "
+        "rank-with-neighbours and incremental score updates. Prints JSON. "
+        "Run it against a scratch database: seeding 1M users takes a while."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--countries', type=int, default=50)
+        parser.add_argument('--samples', type=int, default=500, help="Timed calls per operation.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--keep', action='store_true', help="Leave the synthetic users in place afterwards.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        today = timezone.localdate()
+        countries = [f'C{i:02d}' for i in range(options['countries'])]
+        results = {'config': {key: options[key] for key in ('users', 'countries', 'samples', 'seed')}}
+
+        started = time.perf_counter()
+        user_ids = self.seed(rng, options['users'], countries, today)
+        # The all-time streak boards read the users' streaks.
+        rebuild_goals(user_ids)
+        results['seed_seconds'] = round(time.perf_counter() - started, 3)
+
+        started = time.perf_counter()
+        results['rebuild'] = {'entries': rebuild_scores(user_ids), 'seconds': round(time.perf_counter() - started, 3)}
+        started = time.perf_counter()
+        results['rank'] = {
+            'changed': {metric: rank_leaderboards(today, metric) for metric in METRICS},
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+        operations = {
+            'top_global': lambda: top('all', today, limit=10),
+            'top_country': lambda: top('week', today, country=rng.choice(countries), limit=10),
+            'around_global': lambda: around(rng.choice(user_ids), 'all', today),
+            'around_country': lambda: around(rng.choice(user_ids), 'month', today, by_country=True),
+            'top_streak': lambda: top('week', today, limit=10, metric='streak'),
+            'refresh_scores': lambda: refresh_scores({(rng.choice(user_ids), today)}),
+        }
+        results['operations'] = {}
+        for name, operation in operations.items():
+            with CaptureQueriesContext(connection) as queries:
+                operation()
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(options['samples']):
+                call_started = time.perf_counter()
+                operation()
+                latencies.append(time.perf_counter() - call_started)
+            results['operations'][name] = {
+                'queries': len(queries),
+                **summarize_latencies(latencies, time.perf_counter() - started),
+            }
+
+        if not options['keep']:
+            purge_users(User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}'))
+        self.stdout.write(json.dumps(results, indent=2, default=str))
+
+    def seed(self, rng, count, countries, today):
+        batch = 5000
+        for start in range(0, count, batch):
+            users = [
+                User(email=f'user{i}@{EMAIL_DOMAIN}', password='!', country=rng.choice(countries),
+                     total_focus_time=int(rng.paretovariate(1.2) * 100))
+                for i in range(start, min(start + batch, count))
+            ]
+            User.objects.bulk_create(users)
+        user_ids = list(User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').values_list('pk', flat=True))
+        # Roughly a third of the users focused today.
+        active = rng.sample(user_ids, len(user_ids) // 3)
+        for start in range(0, len(active), batch):
+            DailyFocus.objects.bulk_create(
+                DailyFocus(user_id=user_id, date=today, focus_time=rng.randint(25, 300), sessions=1)
+                for user_id in active[start:start + batch]
+            )
+        return user_ids
@@ -0,0 +1,116 @@
+import json
+import platform
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pomodoro.benchmarks import (
+    BENCH_DOMAIN, SCENARIOS, ClientTransport, HTTPTransport, run_scenario, seed_users,
+)
+from pomodoro.purge import purge_users
+
+
+User = get_user_model()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset and run the API scenarios (login, list sessions, create "
+        "session, list tasks, profile) through the test client and optionally a local server. "
+        "Prints throughput, latency percentiles and queries per request as JSON for diffing "
+        "between releases. Run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Synthetic users to create.")
+        parser.add_argument('--sessions', type=int, default=200, help="Sessions per user.")
+        parser.add_argument('--tasks', type=int, default=20, help="Tasks per user.")
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=20, help="Unmeasured requests sent first per scenario.")
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=list(SCENARIOS),
+                            help="Only run these scenarios (repeatable).")
+        parser.add_argument('--server', metavar='URL',
+                            help="Also run against this server; 'local' starts a threaded one in-process.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Connections used against --server.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON here instead of stdout.")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic users afterwards.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1.")
+        scenarios = options['scenarios'] or list(SCENARIOS)
+        results = {
+            'config': {
+                key: options[key]
+                for key in ('users', 'sessions', 'tasks', 'requests', 'warmup', 'concurrency', 'seed')
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+            },
+        }
+
+        started = time.perf_counter()
+        user_ids = seed_users(options['users'], tasks=options['tasks'], sessions=options['sessions'], seed=options['seed'])
+        results['dataset'] = {'users': len(user_ids), 'seconds': round(time.perf_counter() - started, 3)}
+        users = list(User.objects.filter(pk__in=user_ids[:50]))
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in users}
+
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results['client'] = self.run_all(ClientTransport(), scenarios, users, tokens, options, concurrency=1)
+            if options['server']:
+                results['server'] = self.run_server(options['server'], scenarios, users, tokens, options)
+        finally:
+            if not options['keep']:
+                purge_users(User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}'))
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def run_all(self, transport, scenarios, users, tokens, options, concurrency):
+        results = {}
+        for name in scenarios:
+            if options['warmup']:
+                run_scenario(transport, name, users, tokens, options['warmup'], concurrency, seed=options['seed'])
+            results[name] = run_scenario(
+                transport, name, users, tokens, options['requests'], concurrency, seed=options['seed'],
+            )
+        return results
+
+    def run_server(self, url, scenarios, users, tokens, options):
+        server = None
+        if url == 'local':
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+            server.set_app(get_internal_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            return {
+                'url': url,
+                **self.run_all(HTTPTransport(url), scenarios, users, tokens, options, options['concurrency']),
+            }
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from pomodoro.export import COLUMNS, FORMATS, USER_COLUMNS, session_export_queryset, stream_export
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream every user's sessions (or only --email users) to a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write; defaults to stdout.")
+        parser.add_argument('--email', action='append', dest='emails', help="Only export these users (repeatable).")
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to include (YYYY-MM-DD).")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to include (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['emails']:
+            user_ids = list(User.objects.filter(email__in=options['emails']).values_list('id', flat=True))
+            if not user_ids:
+                raise CommandError("No users match the given emails.")
+        queryset = session_export_queryset(user_ids, start=options['start'], end=options['end'])
+        columns = [*USER_COLUMNS, *COLUMNS]
+
+        chunks = stream_export(queryset, options['export_format'], columns)
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(chunks)
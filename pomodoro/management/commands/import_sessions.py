@@ -0,0 +1,34 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from pomodoro.importer import FORMATS, ImportFailed, import_sessions
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import a user's session and task history from a CSV, NDJSON or JSON array file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True, help="The user to import into.")
+        parser.add_argument('--format', dest='import_format', choices=FORMATS,
+                            help="Defaults to detecting it from the file's first character.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}.")
+        try:
+            with open(options['path'], 'rb') as stream:
+                summary = import_sessions(user, stream, options['import_format'])
+        except ImportFailed as exc:
+            raise CommandError(f"Nothing imported; invalid rows: {json.dumps(exc.errors, default=str)}")
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {sessions} sessions ({duplicates} duplicates skipped), "
+            "{tasks} tasks, {projects} projects and {tags} tags.".format(**summary)
+        ))
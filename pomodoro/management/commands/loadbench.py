@@ -0,0 +1,55 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pomodoro.benchmarks import run_http_load
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test running servers and print throughput and latency percentiles as JSON. "
+        "To compare WSGI and ASGI, start both with the same worker count, e.g. "
+        "`gunicorn -w 4 -b :8000 pomodorocore.wsgi` and "
+        "`gunicorn -w 4 -k uvicorn_worker.UvicornWorker -b :8001 pomodorocore.asgi`, then run "
+        "--target wsgi=http://127.0.0.1:8000/api/sessions/ "
+        "--target asgi=http://127.0.0.1:8001/api/async/sessions/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help="A named URL to load (repeatable).")
+        parser.add_argument('--email', help="Authenticate as this existing user with a freshly minted access token.")
+        parser.add_argument('--token', help="Access token to send instead of --email.")
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--warmup', type=int, default=50, help="Unmeasured requests sent first to each target.")
+
+    def handle(self, *args, **options):
+        token = options['token']
+        if options['email']:
+            try:
+                token = str(AccessToken.for_user(User.objects.get(email=options['email'])))
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['email']}.")
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        results = {
+            'config': {'requests': options['requests'], 'concurrency': options['concurrency']},
+            'targets': {},
+        }
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f"Expected NAME=URL, got {target!r}.")
+            if options['warmup']:
+                run_http_load(url, options['warmup'], options['concurrency'], headers)
+            results['targets'][name] = {
+                'url': url,
+                **run_http_load(url, options['requests'], options['concurrency'], headers),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
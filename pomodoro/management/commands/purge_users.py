@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from pomodoro.purge import purge_counts, purge_users
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Delete user accounts and everything they own in bulk. Superusers are never selected."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', action='append', dest='emails', help="Purge this user (repeatable).")
+        parser.add_argument('--unverified-days', type=int, metavar='DAYS',
+                            help="Purge accounts that are still unverified this many days after signing up.")
+        parser.add_argument('--chunk-size', type=int, help="Rows per DELETE; defaults to PURGE_CHUNK_SIZE.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        if not options['emails'] and options['unverified_days'] is None:
+            raise CommandError("Select users with --email or --unverified-days.")
+        users = User.objects.filter(is_superuser=False)
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+        if options['unverified_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['unverified_days'])
+            users = users.filter(is_active=False, date_joined__lt=cutoff)
+
+        if options['dry_run']:
+            counts = purge_counts(users)
+            verb = "Would delete"
+        else:
+            counts = purge_users(users, options['chunk_size'])
+            verb = "Deleted"
+        self.stdout.write(f"{verb}:")
+        for name, count in counts.items():
+            self.stdout.write(f"  {name}: {count}")
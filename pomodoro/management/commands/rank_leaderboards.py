@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from pomodoro.leaderboard import METRICS, board_starts, rank_leaderboards, rank_open_boards, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-rank the leaderboards that are still open in some time zone, and give boards "
+        "that have just closed their final ranks (or rank the boards --date falls in). "
+        "Run it every few minutes; scores are kept current as sessions are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Rank the boards this day falls in.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute the scores from the daily rollups first.")
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help="With --rebuild, only replace boards from this date's month on.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = rebuild_scores(since=options['since'])
+            self.stdout.write(f"Rebuilt {written} leaderboard entries.")
+        if options['date']:
+            changed = {}
+            for metric in METRICS:
+                starts = board_starts(options['date'], metric)
+                for period, count in rank_leaderboards(options['date'], metric).items():
+                    changed[metric, period, starts[period]] = count
+        else:
+            changed = rank_open_boards()
+        for (metric, period, start), count in changed.items():
+            self.stdout.write(f"  {metric} {period} {start}: {count} ranks changed")
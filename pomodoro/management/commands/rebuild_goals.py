@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from pomodoro.goals import rebuild_goals
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute streaks and tasks' completed pomodoros from the rollups and sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', action='append', dest='emails', help="Only rebuild these users (repeatable).")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['emails']:
+            user_ids = list(User.objects.filter(email__in=options['emails']).values_list('id', flat=True))
+        count = rebuild_goals(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} streaks."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pomodoro.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs, polling the database until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due now and exit.")
+        parser.add_argument('--batch', type=int, default=100, help="Jobs claimed per poll.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            succeeded, failed = run_pending(options['batch'])
+            if succeeded or failed:
+                self.stdout.write(f"Ran {succeeded + failed} jobs: {succeeded} succeeded, {failed} failed.")
+            if options['once'] and succeeded + failed < options['batch']:
+                break
+            if not succeeded + failed:
+                time.sleep(options['sleep'])
@@ -0,0 +1,36 @@
+"""Middleware that can run on either side of the ASGI/WSGI split.
+
+Django adapts a sync-only middleware under ASGI by running it, and so
+everything after it, in a thread. WhiteNoise's middleware is sync-only and
+sits first, which would push every request off the event loop; this
+subclass serves static files the same way but passes everything else
+straight through to the async chain.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Opens the file, so off the event loop.
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFocus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('focus_time', models.PositiveIntegerField(default=0, verbose_name='Focus Time (minutes)')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('task_breakdown', models.JSONField(blank=True, default=dict)),
+                ('project_breakdown', models.JSONField(blank=True, default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_focus_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0002_dailyfocus'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='project',
+            options={'ordering': ['id']},
+        ),
+        migrations.AlterModelOptions(
+            name='session',
+            options={'ordering': ['-start_time', '-id']},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ['id']},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['id']},
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', 'start_time', 'id'], name='session_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status'], name='task_user_status_idx'),
+        ),
+    ]
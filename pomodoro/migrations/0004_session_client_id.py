@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0003_indexes_and_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='session',
+            constraint=models.UniqueConstraint(fields=('user', 'client_id'), name='unique_session_client_id'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0008_session_start_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('focus', 'Focus time')], default='focus', max_length=10)),
+                ('period', models.CharField(choices=[('all', 'All time'), ('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('country', models.CharField(blank=True, default='', max_length=100)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('global_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('country_rank', models.PositiveIntegerField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'period', 'period_start', 'global_rank'], name='leaderboard_global_idx'), models.Index(fields=['metric', 'period', 'period_start', 'country', 'country_rank'], name='leaderboard_country_idx')],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'period', 'period_start', 'user'), name='unique_leaderboard_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:22
+
+import django.db.models.deletion
+import pomodoro.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0009_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='completed_pomodoros',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[pomodoro.models.validate_timezone], verbose_name='Time zone'),
+        ),
+        migrations.CreateModel(
+            name='Goal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_minutes', models.PositiveIntegerField(default=25)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='goals', to='pomodoro.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='goals', to='pomodoro.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Streak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_start', models.DateField(blank=True, null=True)),
+                ('run_end', models.DateField(blank=True, null=True)),
+                ('longest', models.PositiveIntegerField(default=0)),
+                ('longest_end', models.DateField(blank=True, null=True)),
+                ('goal', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='streak', to='pomodoro.goal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='goal',
+            constraint=models.CheckConstraint(condition=models.Q(('task__isnull', True), ('project__isnull', True), _connector='OR'), name='goal_single_target'),
+        ),
+        migrations.AddConstraint(
+            model_name='streak',
+            constraint=models.UniqueConstraint(condition=models.Q(('goal__isnull', True)), fields=('user',), name='unique_user_streak'),
+        ),
+    ]
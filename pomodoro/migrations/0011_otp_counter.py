@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0010_goals_and_streaks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OTPCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def drop_codes(apps, schema_editor):
+    # Queued OTP mails now make their own code; stored ones are dropped.
+    Job = apps.get_model('pomodoro', 'Job')
+    jobs = Job.objects.filter(name='pomodoro.emails.send_otp_email', payload__has_key='otp')
+    for job in jobs.iterator():
+        job.payload.pop('otp', None)
+        job.save(update_fields=['payload'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0011_otp_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pomodoro', '0012_drop_otp_from_job_payloads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaderboardentry',
+            name='metric',
+            field=models.CharField(choices=[('focus', 'Focus time'), ('streak', 'Streak')], default='focus', max_length=10),
+        ),
+    ]
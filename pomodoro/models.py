@@ -1,10 +1,22 @@
+import zoneinfo
+
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models import Q
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Greatest
+from django.db.models.lookups import GreaterThan
 from django.utils import timezone
 from django.contrib.auth.base_user import BaseUserManager
 from django.conf import settings
 from django.core.exceptions import ValidationError
-import random
+
+def validate_timezone(value):
+    try:
+        zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"{value!r} is not a known time zone.")
+
 
 class CustomUserManager(BaseUserManager):
     def _create_user(self, email, password, **extra_fields):
@@ -53,6 +65,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_superuser = models.BooleanField("Superuser status", default=False)
 
     date_joined = models.DateTimeField("Date Joined", default=timezone.now)
+    # IANA name; decides which local day a session counts towards.
+    timezone = models.CharField("Time zone", max_length=64, default='UTC', validators=[validate_timezone])
 
     objects = CustomUserManager()
 
@@ -65,22 +79,39 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return f"{self.email} ({'Staff' if self.is_staff else 'User'})"
-    
-    otp_code = models.CharField(max_length=6, blank=True, null=True)
-    otp_created_at = models.DateTimeField(blank=True, null=True)
 
-    def generate_otp(self):
-        otp = f"{random.randint(1000, 9999)}"
-        self.otp_code = otp
-        self.otp_created_at = timezone.now()
-        self.save()
-        return otp
+    @property
+    def zone(self):
+        return zoneinfo.ZoneInfo(self.timezone)
+
+    def add_focus(self, minutes, sessions=1):
+        # Evaluated by the database against the current row, so concurrent
+        # session writes for the same user can't overwrite each other.
+        total_focus_time = Greatest(F('total_focus_time') + minutes, 0)
+        total_sessions = Greatest(F('total_sessions') + sessions, 0)
+        self.total_focus_time = total_focus_time
+        self.total_sessions = total_sessions
+        self.average_focus_time = Case(
+            When(GreaterThan(total_sessions, 0), then=Cast(total_focus_time, FloatField()) / total_sessions),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        fields = ['total_focus_time', 'total_sessions', 'average_focus_time']
+        self.save(update_fields=fields)
+        self.refresh_from_db(fields=fields)
 
 
 class Project(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     color = models.CharField(max_length=20, default="#FFFFFF")  # Hex color code
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='project_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -91,6 +122,13 @@ class Tag(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     color = models.CharField(max_length=20, default="#FFFFFF")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='tag_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -110,6 +148,16 @@ class Task(models.Model):
     tags = models.ManyToManyField(Tag, blank=True, related_name='tasks')
     color = models.CharField(max_length=20, default="#FFFFFF")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    # Sessions of POMODORO_LENGTH minutes count as one pomodoro each.
+    completed_pomodoros = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='task_user_status_idx'),
+            models.Index(fields=['user', 'updated_at'], name='task_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -122,6 +170,193 @@ class Session(models.Model):
     start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(null=True, blank=True)
     duration = models.PositiveIntegerField(default=0) 
+    # Generated by the client so replayed offline uploads can be recognised.
+    client_id = models.UUIDField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Newest first; id breaks ties between sessions started in the same instant.
+        ordering = ['-start_time', '-id']
+        indexes = [
+            models.Index(fields=['user', 'start_time', 'id'], name='session_user_start_idx'),
+            # The admin's unfiltered changelist and date drill-down.
+            models.Index(fields=['start_time', 'id'], name='session_start_idx'),
+            models.Index(fields=['user', 'updated_at'], name='session_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_id'], name='unique_session_client_id'),
+        ]
+
+    def __str__(self):
+        return f"Session for {self.user.email} - {self.duration} min"
+
+
+class DailyFocus(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    date = models.DateField()
+    focus_time = models.PositiveIntegerField("Focus Time (minutes)", default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    # {"<task or project id>": {"focus_time": minutes, "sessions": count}}
+    task_breakdown = models.JSONField(default=dict, blank=True)
+    project_breakdown = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_focus_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date}: {self.focus_time} min"
+
+
+
+class Goal(models.Model):
+    """Daily focus target for a task, a project, or overall when neither is set."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='goals')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='goals')
+    daily_minutes = models.PositiveIntegerField(default=25)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.CheckConstraint(condition=Q(task__isnull=True) | Q(project__isnull=True), name='goal_single_target'),
+        ]
+
+    def __str__(self):
+        target = self.task or self.project or 'overall'
+        return f"{self.user_id} - {target}: {self.daily_minutes} min/day"
+
+
+class Streak(models.Model):
+    """The latest and the longest run of met days, for a user or one of their goals.
+
+    A user's own streak (``goal`` unset) counts days with any focus.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    goal = models.OneToOneField(Goal, on_delete=models.CASCADE, null=True, blank=True, related_name='streak')
+    run_start = models.DateField(null=True, blank=True)
+    run_end = models.DateField(null=True, blank=True)
+    longest = models.PositiveIntegerField(default=0)
+    longest_end = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user'], condition=Q(goal__isnull=True), name='unique_user_streak'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.goal_id or 'focus'}: {self.run_length} days"
+
+    @property
+    def run_length(self):
+        return (self.run_end - self.run_start).days + 1 if self.run_end else 0
+
+    def current(self, today):
+        """The latest run, if it reaches today or yesterday."""
+        return self.run_length if self.run_end and (today - self.run_end).days <= 1 else 0
+
+
+class LeaderboardEntry(models.Model):
+    """A user's score on one leaderboard.
+
+    Scores are kept current as sessions are written; the ranks are filled in
+    by the periodic ``rank_leaderboards`` batch.
+    """
+    FOCUS = 'focus'
+    STREAK = 'streak'
+    METRIC_CHOICES = [
+        (FOCUS, 'Focus time'),
+        (STREAK, 'Streak'),
+    ]
+    PERIOD_CHOICES = [
+        ('all', 'All time'),
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES, default=FOCUS)
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    # Copied from the user so country boards don't need a join.
+    country = models.CharField(max_length=100, blank=True, default='')
+    score = models.PositiveIntegerField(default=0)
+    global_rank = models.PositiveIntegerField(null=True, blank=True)
+    country_rank = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'period', 'period_start', 'user'], name='unique_leaderboard_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['metric', 'period', 'period_start', 'global_rank'], name='leaderboard_global_idx'),
+            models.Index(
+                fields=['metric', 'period', 'period_start', 'country', 'country_rank'], name='leaderboard_country_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.metric} {self.period} {self.period_start}: {self.score}"
+
+
+class Tombstone(models.Model):
+    """Marks a deleted row so delta sync can tell clients to drop it."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_jobs``."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class OTPCounter(models.Model):
+    """A count of OTP requests or guesses that resets at ``expires_at``.
+
+    Kept in the database rather than the cache because cache backends such
+    as the database cache don't increment atomically.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f"Session for {self.user.email} - {self.duration} min"
\ No newline at end of file
+        return f"{self.key}: {self.count} until {self.expires_at}"
@@ -0,0 +1,97 @@
+"""One-time codes for account verification and password reset.
+
+Codes live only in the cache, stored as a keyed hash with a TTL, so issuing
+and checking them never touches the user table. Each email gets a limited
+number of guesses per code and a limited number of codes per hour; those
+counters are OTPCounter rows, incremented under a row lock, because not
+every cache backend increments atomically or keeps the TTL when it does.
+"""
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import OTPCounter
+
+
+class OTPError(Exception):
+    pass
+
+
+class OTPThrottled(OTPError):
+    def __init__(self, wait):
+        super().__init__("Too many codes requested. Try again later.")
+        self.wait = wait
+
+
+def _key(kind, purpose, email):
+    return f'pomodoro:otp:{kind}:{purpose}:{email.strip().lower()}'
+
+
+def _hash(purpose, email, code):
+    return salted_hmac('pomodoro.otp', f'{purpose}:{email.strip().lower()}:{code}', algorithm='sha256').hexdigest()
+
+
+def _count(key, window):
+    """Add one to the counter ``key``, which resets ``window`` seconds after its first hit; returns the new count."""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=window)
+    with transaction.atomic():
+        counter, created = OTPCounter.objects.select_for_update().get_or_create(
+            key=key, defaults={'expires_at': expires_at},
+        )
+        if created:
+            return counter.count
+        if counter.expires_at <= now:
+            counter.count, counter.expires_at = 1, expires_at
+        else:
+            counter.count = F('count') + 1
+        counter.save(update_fields=['count', 'expires_at'])
+        counter.refresh_from_db(fields=['count'])
+    return counter.count
+
+
+def throttle_otp(email, purpose):
+    """Count a code request for ``email``, raising OTPThrottled once it is over the limits."""
+    OTPCounter.objects.filter(expires_at__lte=timezone.now()).delete()
+    if _count(_key('cooldown', purpose, email), settings.OTP_RESEND_INTERVAL) > 1:
+        raise OTPThrottled(settings.OTP_RESEND_INTERVAL)
+    if _count(_key('sent', purpose, email), 3600) > settings.OTP_HOURLY_LIMIT:
+        raise OTPThrottled(3600)
+
+
+def new_otp(email, purpose):
+    """Create a fresh code for ``email``, replacing any earlier one, and return it."""
+    code = f'{secrets.randbelow(10 ** settings.OTP_DIGITS):0{settings.OTP_DIGITS}d}'
+    cache.set(_key('code', purpose, email), _hash(purpose, email, code), settings.OTP_TTL)
+    OTPCounter.objects.filter(key=_key('attempts', purpose, email)).delete()
+    return code
+
+
+def issue_otp(email, purpose):
+    throttle_otp(email, purpose)
+    return new_otp(email, purpose)
+
+
+def _consume(purpose, email):
+    cache.delete(_key('code', purpose, email))
+    OTPCounter.objects.filter(key=_key('attempts', purpose, email)).delete()
+
+
+def verify_otp(email, purpose, code):
+    """Consume the code, raising OTPError if it is wrong, expired or out of attempts."""
+    expected = cache.get(_key('code', purpose, email))
+    if expected is None:
+        raise OTPError("OTP has expired. Please request a new one.")
+    if _count(_key('attempts', purpose, email), settings.OTP_TTL) > settings.OTP_MAX_ATTEMPTS:
+        # The counter stays until the next code, so racing guesses stay refused.
+        cache.delete(_key('code', purpose, email))
+        raise OTPError("Too many attempts. Please request a new OTP.")
+    if not constant_time_compare(expected, _hash(purpose, email, code)):
+        raise OTPError("Invalid OTP.")
+    _consume(purpose, email)
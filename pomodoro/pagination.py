@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class SessionCursorPagination(IdCursorPagination):
+    ordering = ('-start_time', '-id')
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin paginator that avoids ``COUNT(*)`` over a whole large table.
+
+    On PostgreSQL an unfiltered changelist takes the planner's row estimate
+    from ``pg_class``; filtered querysets, small tables and other databases
+    get an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and connections[queryset.db].vendor == 'postgresql':
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
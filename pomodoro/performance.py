@@ -0,0 +1,242 @@
+"""Request-level performance metrics.
+
+PerformanceMiddleware times every request and counts its response size
+per view. A PERF_SAMPLE_RATE share of requests is also sampled: each query
+they run is timed and checked for exact duplicates (the same SQL with the
+same parameters, usually an N+1 loop), and sampled requests slower than
+PERF_SLOW_REQUEST_MS are logged with their SQL. Queries reach the probe
+through an execute wrapper installed on every connection as it opens, so
+unsampled requests only pay for one context variable lookup per query,
+and sync_to_async calls made by async views are covered too.
+
+The aggregates are histograms in this process's memory, served in the
+Prometheus text format by metrics_view(); with several worker processes
+each one exposes its own.
+"""
+import hmac
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# name: (type, help, buckets)
+METRICS = {
+    'pomodoro_requests_total': ('counter', "Requests by view, method and status.", None),
+    'pomodoro_request_duration_seconds': ('histogram', "Wall time spent in Django per request.", DURATION_BUCKETS),
+    'pomodoro_response_size_bytes': ('histogram', "Response body size, when known up front.", SIZE_BUCKETS),
+    'pomodoro_db_duration_seconds': ('histogram', "Time spent in queries per sampled request.", DURATION_BUCKETS),
+    'pomodoro_db_queries': ('histogram', "Queries run per sampled request.", QUERY_BUCKETS),
+    'pomodoro_duplicate_queries_total': ('counter', "Repeats of an identical query within a sampled request.", None),
+}
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    return ','.join(f'{name}="{_label_value(value)}"' for name, value in pairs)
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(float)
+            # (name, labels): [per-bucket counts..., count above the last bucket], sum
+            self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[name, labels] = [[0] * (len(buckets) + 1), 0]
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+        series = defaultdict(list)
+        for (name, labels), value in counters.items():
+            series[name].append(f'{name}{{{_labels(labels)}}} {value:g}')
+        for (name, labels), (counts, total) in histograms.items():
+            cumulative = 0
+            for bound, count in zip(METRICS[name][2] + ('+Inf',), counts):
+                cumulative += count
+                series[name].append(f'{name}_bucket{{{_labels(labels + (("le", bound),))}}} {cumulative}')
+            series[name].append(f'{name}_sum{{{_labels(labels)}}} {total:g}')
+            series[name].append(f'{name}_count{{{_labels(labels)}}} {cumulative}')
+        lines = []
+        for name, (kind, help_text, _) in METRICS.items():
+            if series[name]:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *sorted(series[name])]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Probe:
+    """The query timings of one sampled request."""
+
+    def __init__(self, max_statements):
+        self.db_time = 0.0
+        self.queries = 0
+        self.max_statements = max_statements
+        self.statements = []
+        self.seen = Counter()
+
+    def record(self, sql, params, duration):
+        self.db_time += duration
+        self.queries += 1
+        self.seen[sql, repr(params)] += 1
+        if len(self.statements) < self.max_statements:
+            self.statements.append((duration, sql))
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.seen.values())
+
+
+_probe = ContextVar('pomodoro_performance_probe', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    probe = _probe.get()
+    if probe is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        probe.record(sql, params, time.perf_counter() - started)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """connection_created receiver; reconnects reuse the same wrapper object."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.PERF_METRICS_ENABLED:
+            return self.get_response(request)
+        started, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            probe = _probe.get()
+            _probe.reset(token)
+        return self._finish(request, response, started, probe)
+
+    async def __acall__(self, request):
+        if not settings.PERF_METRICS_ENABLED:
+            return await self.get_response(request)
+        started, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            probe = _probe.get()
+            _probe.reset(token)
+        return self._finish(request, response, started, probe)
+
+    def _start(self):
+        rate = settings.PERF_SAMPLE_RATE
+        probe = _Probe(settings.PERF_SLOW_LOG_MAX_QUERIES) if rate > 0 and random.random() < rate else None
+        return time.perf_counter(), _probe.set(probe)
+
+    def _finish(self, request, response, started, probe):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        labels = (('view', view),)
+        method = request.method if request.method in METHODS else 'other'
+        REGISTRY.inc('pomodoro_requests_total', labels + (('method', method), ('status', response.status_code)))
+        REGISTRY.observe('pomodoro_request_duration_seconds', labels, elapsed)
+        size = self._response_size(response)
+        if size is not None:
+            REGISTRY.observe('pomodoro_response_size_bytes', labels, size)
+
+        timing = [f'app;dur={elapsed * 1000:.1f}']
+        if probe is not None:
+            REGISTRY.observe('pomodoro_db_duration_seconds', labels, probe.db_time)
+            REGISTRY.observe('pomodoro_db_queries', labels, probe.queries)
+            if probe.duplicates:
+                REGISTRY.inc('pomodoro_duplicate_queries_total', labels, probe.duplicates)
+            timing.append(f'db;dur={probe.db_time * 1000:.1f};desc="{probe.queries} queries"')
+        if elapsed * 1000 >= settings.PERF_SLOW_REQUEST_MS:
+            self._log_slow(request, view, elapsed, probe)
+        if settings.PERF_SERVER_TIMING:
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = ', '.join(([existing] if existing else []) + timing)
+        return response
+
+    def _response_size(self, response):
+        if not response.streaming:
+            return len(response.content)
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+
+    def _log_slow(self, request, view, elapsed, probe):
+        if probe is None:
+            logger.warning("Slow request %s %s (%s): %.1f ms, not sampled", request.method, request.path, view, elapsed * 1000)
+            return
+        statements = ''.join(f'\n  {duration * 1000:8.1f} ms  {sql}' for duration, sql in probe.statements)
+        omitted = probe.queries - len(probe.statements)
+        logger.warning(
+            "Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, %d duplicates%s%s",
+            request.method, request.path, view, elapsed * 1000, probe.queries, probe.db_time * 1000,
+            probe.duplicates, statements, f'\n  ... {omitted} more' if omitted > 0 else '',
+        )
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint: a bearer PERF_METRICS_TOKEN, or a staff login."""
+    token = settings.PERF_METRICS_TOKEN
+    parts = request.headers.get('Authorization', '').split()
+    authorized = (
+        (token and len(parts) == 2 and parts[0] == 'Bearer' and hmac.compare_digest(parts[1], token))
+        or request.user.is_staff
+    )
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,92 @@
+"""Set-based deletion of whole user accounts.
+
+Each table is emptied for the selected users with plain DELETE statements
+in chunks of PURGE_CHUNK_SIZE rows, each committed on its own so no lock is
+held for long. This skips Django's collector and the delete signals (the
+app registers none), which is what makes it fast. An interrupted purge can
+simply be run again.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .authentication import forget_user
+from .caching import bump_versions
+from .models import DailyFocus, Goal, LeaderboardEntry, Project, Session, Streak, Tag, Task, Tombstone
+
+
+User = get_user_model()
+
+
+def _owned_rows(users):
+    """(name, queryset) pairs in an order that never leaves a dangling foreign key."""
+    owners = users.values('pk')
+    return [
+        ('sessions', Session.objects.filter(user__in=owners)),
+        ('task_tags', Task.tags.through.objects.filter(Q(task__user__in=owners) | Q(tag__user__in=owners))),
+        ('daily_focus', DailyFocus.objects.filter(user__in=owners)),
+        ('leaderboard', LeaderboardEntry.objects.filter(user__in=owners)),
+        ('tombstones', Tombstone.objects.filter(user__in=owners)),
+        ('streaks', Streak.objects.filter(user__in=owners)),
+        ('goals', Goal.objects.filter(user__in=owners)),
+        ('tasks', Task.objects.filter(user__in=owners)),
+        ('projects', Project.objects.filter(user__in=owners)),
+        ('tags', Tag.objects.filter(user__in=owners)),
+    ]
+
+
+def purge_counts(users):
+    """What purge_users() would delete, without deleting anything."""
+    counts = {name: queryset.count() for name, queryset in _owned_rows(users)}
+    counts['users'] = users.count()
+    return counts
+
+
+def _delete_pks(model, pks, using):
+    # Written out rather than QuerySet.delete(), whose collector would look up
+    # every related table again for each chunk; the callers delete dependents first.
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', pks)
+        return cursor.rowcount
+
+
+def _delete_in_chunks(queryset, chunk_size):
+    deleted = 0
+    while True:
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+            if pks:
+                deleted += _delete_pks(queryset.model, pks, queryset.db)
+        if len(pks) < chunk_size:
+            return deleted
+
+
+def purge_users(users, chunk_size=None):
+    """Delete the users in the ``users`` queryset with everything they own."""
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    user_ids = list(users.values_list('pk', flat=True))
+    users = User.objects.filter(pk__in=user_ids)
+    owners = users.values('pk')
+
+    # Other users' rows pointing at purged tasks or projects would block the raw deletes.
+    Session.objects.filter(task__user__in=owners).exclude(user__in=owners).update(task=None)
+    Task.objects.filter(project__user__in=owners).exclude(user__in=owners).update(project=None)
+
+    counts = {name: _delete_in_chunks(queryset, chunk_size) for name, queryset in _owned_rows(users)}
+    # The remaining dependents (admin log, group memberships, ...) are few,
+    # so the regular delete handles them.
+    counts['users'] = 0
+    for start in range(0, len(user_ids), chunk_size):
+        with transaction.atomic():
+            _, deleted = User.objects.filter(pk__in=user_ids[start:start + chunk_size]).delete()
+        counts['users'] += deleted.get(User._meta.label, 0)
+
+    bump_versions(user_ids)
+    for user_id in user_ids:
+        forget_user(user_id)
+    return counts
@@ -0,0 +1,126 @@
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBroker:
+    """Delivers events to subscribers in this process only.
+
+    Enough for tests and single-process deployments; multi-worker setups
+    need a broker that fans events out between processes.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, callback):
+        with self._lock:
+            self._subscribers[user_id].add(callback)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers[user_id].discard(callback)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+        return unsubscribe
+
+    def publish(self, user_id, event):
+        self._deliver(user_id, event)
+
+    def _deliver(self, user_id, event):
+        with self._lock:
+            callbacks = list(self._subscribers.get(user_id, ()))
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Realtime subscriber failed for user %s", user_id)
+
+
+class PostgresBroker(InMemoryBroker):
+    """Fans events out between processes with PostgreSQL LISTEN/NOTIFY.
+
+    Each process keeps one listening connection, started on its first
+    subscription, and hands notifications to its local subscribers.
+    """
+
+    channel = 'pomodoro_events'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event}, cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def subscribe(self, user_id, callback):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='pomodoro-realtime', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id, callback)
+
+    def _listen(self):
+        # A dedicated connection opened with the backend's own driver
+        # (psycopg or psycopg2) and its parameters; Django's wrapper would
+        # hand out a pooled connection, which can't be held to LISTEN.
+        params = connection.get_connection_params()
+        while True:
+            try:
+                listener = connection.Database.connect(**params)
+                listener.autocommit = True
+                with listener.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                for payload in self._notifications(listener):
+                    message = json.loads(payload)
+                    self._deliver(message['user'], message['event'])
+            except Exception:
+                logger.exception("Realtime listener lost its connection, reconnecting")
+                time.sleep(1)
+
+    def _notifications(self, listener):
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        if is_psycopg3:
+            for notify in listener.notifies():
+                yield notify.payload
+            return
+        while True:
+            if select.select([listener], [], [], 5) == ([], [], []):
+                continue
+            listener.poll()
+            while listener.notifies:
+                yield listener.notifies.pop(0).payload
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.REALTIME_BROKER)()
+        return _broker
+
+
+def publish(user_id, event_type, data):
+    """Send an event to the user's connected clients once the current transaction commits."""
+    event = {'type': event_type, 'data': data}
+    # Token claims carry the user id as a string, so subscriptions are keyed that way.
+    transaction.on_commit(lambda: get_broker().publish(str(user_id), event))
@@ -0,0 +1,105 @@
+"""Read-replica routing for the API's read endpoints.
+
+When REPLICA_DATABASE_URL is set, views with ReplicaReadMixin serve safe
+requests from the 'replica' alias; everything else, including every write
+and every request outside those views, stays on the primary. A user whose
+data changed in the last REPLICA_PIN_SECONDS (an API write, or anything
+that bumps their cache version) is pinned to the primary so they read
+their own writes despite replication lag. The pin lives in the cache, so
+multi-process deployments need a shared cache backend. A replica that
+can't be reached is skipped for REPLICA_RETRY_SECONDS.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+
+_reading_from_replica = ContextVar('pomodoro_reading_from_replica', default=False)
+_down_until = 0
+
+
+def replica_configured():
+    return bool(settings.REPLICA_DATABASE_URL)
+
+
+def _pin_key(user_id):
+    return f'pomodoro:replica-pin:{user_id}'
+
+
+def pin_to_primary(user_ids):
+    """Send these users' reads to the primary for the next REPLICA_PIN_SECONDS."""
+    if replica_configured():
+        cache.set_many({_pin_key(user_id): 1 for user_id in user_ids}, settings.REPLICA_PIN_SECONDS)
+
+
+def use_replica(user_id):
+    """Whether this user's reads can go to the replica right now."""
+    global _down_until
+    if not replica_configured() or time.monotonic() < _down_until or cache.get(_pin_key(user_id)):
+        return False
+    try:
+        connections[REPLICA].ensure_connection()
+    except DatabaseError:
+        logger.warning("Read replica unavailable; using the primary for %ss", settings.REPLICA_RETRY_SECONDS, exc_info=True)
+        _down_until = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return REPLICA if _reading_from_replica.get() else None
+
+    def db_for_write(self, model, **hints):
+        # Objects read from the replica are saved to the primary.
+        return DEFAULT_DB_ALIAS if replica_configured() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """Routes the reads of safe requests to the replica, and pins users after writes.
+
+    Views using it must not write during safe requests: whatever they read
+    back may come from the replica. Actions listed in ``replica_exempt_actions``
+    skip both the routing and the pin.
+    """
+
+    replica_exempt_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _reading_from_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _reading_from_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permission checks run on the primary.
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not self._replica_exempt():
+            _reading_from_replica.set(use_replica(request.user.id))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        user_id = getattr(request.user, 'id', None)
+        if request.method not in SAFE_METHODS and user_id and not self._replica_exempt():
+            pin_to_primary([user_id])
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def _replica_exempt(self):
+        return getattr(self, 'action', None) in self.replica_exempt_actions
@@ -1,10 +1,25 @@
 from rest_framework import serializers
-from .models import User, Project, Tag, Task, Session
+from .models import User, Project, Tag, Task, Session, Goal, Streak, LeaderboardEntry
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from rest_framework.exceptions import Throttled
 from django.utils import timezone
+from .otp import OTPError, OTPThrottled, throttle_otp, verify_otp
+from .emails import send_otp_email
+from .goals import goal_minutes
+from .leaderboard import METRIC_PERIODS, PERIODS as LEADERBOARD_PERIODS
+from .stats import PERIODS, default_range
 
 User = get_user_model()
 
+def send_otp(email, purpose):
+    try:
+        throttle_otp(email, purpose)
+    except OTPThrottled as exc:
+        raise Throttled(wait=exc.wait, detail=str(exc))
+    send_otp_email.delay(email=email, purpose=purpose)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -19,8 +34,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
-        otp = user.generate_otp()
-        print(f"OTP sent to {user.email}: {otp}")
+        send_otp(user.email, 'verify')
         return user
     
 class CompleteProfileSerializer(serializers.ModelSerializer):
@@ -40,23 +54,13 @@ class VerifyOTPSerializer(serializers.Serializer):
     otp = serializers.CharField(max_length=6)
 
     def validate(self, data):
-        email = data['email']
-        otp = data['otp']
         try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User not found.")
-
-        if user.otp_code != otp:
-            raise serializers.ValidationError("Invalid OTP.")
-
-        if (timezone.now() - user.otp_created_at).seconds > 300:
-            raise serializers.ValidationError("OTP has expired. Please request a new one.")
+            verify_otp(data['email'], 'verify', data['otp'])
+        except OTPError as exc:
+            raise serializers.ValidationError(str(exc))
 
-        user.is_active = True
-        user.otp_code = None
-        user.otp_created_at = None
-        user.save()
+        if not User.objects.filter(email=data['email']).update(is_active=True):
+            raise serializers.ValidationError("User not found.")
         return data
 
 
@@ -64,13 +68,10 @@ class ForgotPasswordRequestSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
     def validate_email(self, value):
-        try:
-            user = User.objects.get(email=value)
-            otp = user.generate_otp()
-            print(f"[Forgot Password] OTP for {user.email}: {otp}")  # Replace with actual email logic
-            return value
-        except User.DoesNotExist:
+        if not User.objects.filter(email=value).exists():
             raise serializers.ValidationError("No user is associated with this email.")
+        send_otp(value, 'reset')
+        return value
         
 class ForgotPasswordVerifySerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -78,23 +79,14 @@ class ForgotPasswordVerifySerializer(serializers.Serializer):
     new_password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        email = data['email']
-        otp = data['otp']
         try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User not found.")
-
-        if user.otp_code != otp:
-            raise serializers.ValidationError("Invalid OTP.")
+            verify_otp(data['email'], 'reset', data['otp'])
+        except OTPError as exc:
+            raise serializers.ValidationError(str(exc))
 
-        if (timezone.now() - user.otp_created_at).seconds > 300:
-            raise serializers.ValidationError("OTP has expired.")
-
-        user.set_password(data['new_password'])
-        user.otp_code = None
-        user.otp_created_at = None
-        user.save()
+        password = make_password(data['new_password'])
+        if not User.objects.filter(email=data['email']).update(password=password):
+            raise serializers.ValidationError("User not found.")
 
         return data
 
@@ -114,15 +106,175 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Only accepts ids of rows that belong to the requesting user."""
+
+    def get_queryset(self):
+        request = self.context.get('request')
+        return super().get_queryset().filter(user_id=request.user.id if request else None)
+
+
 class TaskSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    project = OwnedPrimaryKeyRelatedField(queryset=Project.objects.all(), required=False, allow_null=True)
+    tags = OwnedPrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True, required=False)
+
     class Meta:
         model = Task
         fields = '__all__'
+        read_only_fields = ['completed_pomodoros']
 
 
 class SessionSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    task = OwnedPrimaryKeyRelatedField(queryset=Task.objects.all(), required=False, allow_null=True)
+
+    class Meta:
+        model = Session
+        fields = '__all__'
+        # A repeated client_id is a replay, which SessionViewSet upserts
+        # instead of rejecting.
+        validators = []
+
+
+class TaskExpandedSerializer(TaskSerializer):
+    project = ProjectSerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+
+
+class SessionExpandedSerializer(SessionSerializer):
+    task = TaskExpandedSerializer(read_only=True)
+
+class NameListField(serializers.ListField):
+    """A list of names, also accepted as one comma-separated string."""
+    child = serializers.CharField(max_length=100)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [name.strip() for name in data.split(',') if name.strip()]
+        return super().to_internal_value(data)
+
+
+class SessionImportSerializer(serializers.ModelSerializer):
+    task = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    project = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    tags = NameListField(required=False)
+
     class Meta:
         model = Session
-        fields = '__all__'
\ No newline at end of file
+        fields = ['start_time', 'end_time', 'duration', 'client_id', 'task', 'project', 'tags']
+        extra_kwargs = {'start_time': {'required': True}}
+
+
+class TaskImportSerializer(serializers.ModelSerializer):
+    task = serializers.CharField(max_length=255)
+    project = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    tags = NameListField(required=False)
+
+    class Meta:
+        model = Task
+        fields = ['task', 'estimated_pomodoros', 'color', 'status', 'project', 'tags']
+
+
+class SessionExportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    task = serializers.IntegerField(required=False)
+    project = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """``end`` defaults to today in the context's ``zone`` (the user's time zone)."""
+    period = serializers.ChoiceField(choices=PERIODS, default='day')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate(timezone=self.context.get('zone')))
+        data.setdefault('start', default_range(data['period'], data['end']))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
+
+
+
+class StreakSerializer(serializers.ModelSerializer):
+    current = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Streak
+        fields = ['current', 'longest', 'run_start', 'run_end']
+
+    def get_current(self, streak):
+        return streak.current(self.context['today'])
+
+
+class GoalSerializer(serializers.ModelSerializer):
+    """Expects ``today`` (the user's local date) and ``today_focus`` (its day_state()) in the context."""
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    streak = StreakSerializer(read_only=True)
+    today = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Goal
+        fields = ['id', 'user', 'task', 'project', 'daily_minutes', 'streak', 'today', 'updated_at']
+        extra_kwargs = {'daily_minutes': {'min_value': 1}}
+
+    def validate(self, data):
+        user_id = self.context['request'].user.id
+        task = data.get('task', getattr(self.instance, 'task', None))
+        project = data.get('project', getattr(self.instance, 'project', None))
+        if task and project:
+            raise serializers.ValidationError("A goal is for a task or a project, not both.")
+        if (task and task.user_id != user_id) or (project and project.user_id != user_id):
+            raise serializers.ValidationError("Task or project not found.")
+        return data
+
+    def get_today(self, goal):
+        minutes = goal_minutes(goal, *self.context['today_focus'])
+        return {'focus_time': minutes, 'met': minutes >= goal.daily_minutes}
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['user', 'country', 'score', 'global_rank', 'country_rank']
+
+
+class LeaderboardBoardSerializer(serializers.Serializer):
+    metric = serializers.ChoiceField(choices=LeaderboardEntry.METRIC_CHOICES, default=LeaderboardEntry.FOCUS)
+    period = serializers.ChoiceField(choices=LEADERBOARD_PERIODS, default='all')
+    date = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs['period'] not in METRIC_PERIODS[attrs['metric']]:
+            raise serializers.ValidationError({'period': f"The {attrs['metric']} leaderboard has no {attrs['period']} board."})
+        # Boards are made of local days, so "today" is the viewer's.
+        attrs.setdefault('date', timezone.localdate(timezone=self.context.get('zone')))
+        return attrs
+
+
+class LeaderboardQuerySerializer(LeaderboardBoardSerializer):
+    country = serializers.CharField(required=False, max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class LeaderboardRankQuerySerializer(LeaderboardBoardSerializer):
+    scope = serializers.ChoiceField(choices=['global', 'country'], default='global')
+    neighbours = serializers.IntegerField(min_value=0, max_value=50, default=5)
+
+
+class TimerStartSerializer(serializers.Serializer):
+    task = serializers.IntegerField(required=False, allow_null=True)
+    client_id = serializers.UUIDField(required=False, allow_null=True)
+
+    def validate_task(self, value):
+        user = self.context['request'].user
+        if value is not None and not Task.objects.filter(pk=value, user_id=user.id).exists():
+            raise serializers.ValidationError("Task not found.")
+        return value
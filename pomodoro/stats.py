@@ -0,0 +1,235 @@
+import zoneinfo
+from collections import defaultdict, namedtuple
+from datetime import date as Date, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import bump_versions
+from .goals import EMPTY_DAY, add_pomodoros, count_pomodoros, day_state, evaluate_days, rebuild_goals
+from .jobs import job
+from .leaderboard import rebuild_scores, schedule_refresh
+from .models import DailyFocus, Session, User
+
+
+FocusEntry = namedtuple('FocusEntry', ['user_id', 'date', 'task_id', 'project_id', 'duration'])
+
+PERIODS = ('day', 'week', 'month', 'year')
+
+
+def focus_entry(session, zone=None):
+    """The session's contribution to its user's rollups; ``zone`` is the user's time zone."""
+    project_id = session.task.project_id if session.task_id else None
+    return FocusEntry(
+        user_id=session.user_id,
+        date=timezone.localdate(session.start_time, zone),
+        task_id=session.task_id,
+        project_id=project_id,
+        duration=session.duration,
+    )
+
+
+def _add_to_breakdown(breakdown, key, minutes, sessions):
+    if key is None:
+        return
+    key = str(key)
+    current = breakdown.get(key, {'focus_time': 0, 'sessions': 0})
+    updated = {
+        'focus_time': max(current['focus_time'] + minutes, 0),
+        'sessions': max(current['sessions'] + sessions, 0),
+    }
+    if updated['sessions'] == 0:
+        breakdown.pop(key, None)
+    else:
+        breakdown[key] = updated
+
+
+def lock_users(user_ids=None):
+    """Lock the users' rows (every user's when ``user_ids`` is None) until the transaction ends.
+
+    Every writer of derived data takes these locks first and in pk order,
+    so a rebuild can't interleave with incremental updates or deadlock
+    against them on the rollup rows.
+    """
+    users = User.objects.select_for_update().order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    return list(users.values_list('pk', flat=True))
+
+
+def _apply_entry(rollup, entry, sign):
+    minutes = entry.duration * sign
+    rollup.focus_time = max(rollup.focus_time + minutes, 0)
+    rollup.sessions = max(rollup.sessions + sign, 0)
+    _add_to_breakdown(rollup.task_breakdown, entry.task_id, minutes, sign)
+    _add_to_breakdown(rollup.project_breakdown, entry.project_id, minutes, sign)
+
+
+def apply_focus_changes(added=(), removed=()):
+    """Fold session additions/removals into the per-day rollups.
+
+    Entries are grouped by (user, day) so a batch costs one locked
+    read-modify-write per affected rollup row rather than one per session.
+    Streaks and the tasks' pomodoro counts are updated in the same
+    transaction.
+    """
+    grouped = defaultdict(list)
+    pomodoros = defaultdict(int)
+    # Removals go first: the breakdowns clamp at zero and drop emptied keys,
+    # so an edit must take out the old entry before adding the new one.
+    for entry in removed:
+        grouped[(entry.user_id, entry.date)].append((entry, -1))
+        pomodoros[entry.task_id] -= count_pomodoros(entry.duration)
+    for entry in added:
+        grouped[(entry.user_id, entry.date)].append((entry, 1))
+        pomodoros[entry.task_id] += count_pomodoros(entry.duration)
+
+    days = []
+    with transaction.atomic():
+        lock_users({user_id for user_id, _ in grouped})
+        # Sorted so concurrent writers lock rollup rows in the same order.
+        for (user_id, date), changes in sorted(grouped.items()):
+            rollup, _ = DailyFocus.objects.select_for_update().get_or_create(user_id=user_id, date=date)
+            before = day_state(rollup)
+            for entry, sign in changes:
+                _apply_entry(rollup, entry, sign)
+            if rollup.sessions == 0:
+                rollup.delete()
+                days.append((user_id, date, before, EMPTY_DAY))
+            else:
+                rollup.save()
+                days.append((user_id, date, before, day_state(rollup)))
+        evaluate_days(days)
+        if add_pomodoros(pomodoros):
+            bump_versions({user_id for user_id, _ in grouped})
+        schedule_refresh(grouped)
+
+
+def move_task_focus(moves):
+    """Move tasks' minutes between projects in the rollups after a project change.
+
+    ``moves`` maps task ids to (user_id, old_project_id, new_project_id).
+    """
+    moves = {task_id: move for task_id, move in moves.items() if move[1] != move[2]}
+    if not moves:
+        return
+    lookup = Q()
+    for task_id, (user_id, _, _) in moves.items():
+        lookup |= Q(user_id=user_id, task_breakdown__has_key=str(task_id))
+    days = []
+    with transaction.atomic():
+        lock_users({user_id for user_id, _, _ in moves.values()})
+        for rollup in DailyFocus.objects.select_for_update().filter(lookup).order_by('user_id', 'date'):
+            before = day_state(rollup)
+            for task_id, (user_id, old_project_id, new_project_id) in moves.items():
+                share = rollup.task_breakdown.get(str(task_id))
+                if rollup.user_id != user_id or not share:
+                    continue
+                _add_to_breakdown(rollup.project_breakdown, old_project_id, -share['focus_time'], -share['sessions'])
+                _add_to_breakdown(rollup.project_breakdown, new_project_id, share['focus_time'], share['sessions'])
+            rollup.save(update_fields=['project_breakdown'])
+            days.append((rollup.user_id, rollup.date, before, day_state(rollup)))
+        # Project goals may have been met or missed by the moved minutes.
+        evaluate_days(days)
+
+
+def rebuild_rollups(user_ids=None):
+    sessions = Session.objects.all()
+    rollups = DailyFocus.objects.all()
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    built = {}
+    zones = {}
+    with transaction.atomic():
+        # Sessions written while the users are locked wait and are folded in
+        # incrementally after the rebuild commits; earlier ones are read here.
+        lock_users(user_ids)
+        rows = sessions.values_list('user_id', 'user__timezone', 'start_time', 'task_id', 'task__project_id', 'duration')
+        for user_id, zone, start_time, task_id, project_id, duration in rows.iterator(chunk_size=2000):
+            if zone not in zones:
+                zones[zone] = zoneinfo.ZoneInfo(zone)
+            entry = FocusEntry(user_id, timezone.localdate(start_time, zones[zone]), task_id, project_id, duration)
+            key = (user_id, entry.date)
+            if key not in built:
+                built[key] = DailyFocus(user_id=user_id, date=entry.date, task_breakdown={}, project_breakdown={})
+            _apply_entry(built[key], entry, 1)
+
+        rollups.delete()
+        DailyFocus.objects.bulk_create(built.values(), batch_size=1000)
+    return len(built)
+
+
+@job
+def rebuild_user_stats(user_id):
+    """Rebuild everything derived from a user's local days, e.g. after a time zone change."""
+    with transaction.atomic():
+        rebuild_rollups([user_id])
+        rebuild_goals([user_id])
+        rebuild_scores([user_id])
+    bump_versions([user_id])
+
+
+def period_start(date, period):
+    if period == 'week':
+        return date - timedelta(days=date.weekday())
+    if period == 'month':
+        return date.replace(day=1)
+    if period == 'year':
+        return date.replace(month=1, day=1)
+    return date
+
+
+def default_range(period, end):
+    if period == 'week':
+        return period_start(end, 'week') - timedelta(weeks=11)
+    if period == 'month':
+        months = end.year * 12 + end.month - 1 - 11
+        return Date(months // 12, months % 12 + 1, 1)
+    if period == 'year':
+        return Date(end.year - 4, 1, 1)
+    return end - timedelta(days=29)
+
+
+def _rollup_rows(user, start, end):
+    return (
+        DailyFocus.objects.filter(user=user, date__gte=start, date__lte=end)
+        .order_by('date')
+        .values_list('date', 'focus_time', 'sessions', 'task_breakdown', 'project_breakdown')
+    )
+
+
+def bucket_rollups(rows, period):
+    buckets = {}
+    for date, focus_time, sessions, task_breakdown, project_breakdown in rows:
+        key = period_start(date, period)
+        if key not in buckets:
+            buckets[key] = {'start': key, 'focus_time': 0, 'sessions': 0, 'tasks': {}, 'projects': {}}
+        bucket = buckets[key]
+        bucket['focus_time'] += focus_time
+        bucket['sessions'] += sessions
+        for target, breakdown in ((bucket['tasks'], task_breakdown), (bucket['projects'], project_breakdown)):
+            for item_id, values in breakdown.items():
+                _add_to_breakdown(target, item_id, values['focus_time'], values['sessions'])
+    return list(buckets.values())
+
+
+def focus_series(user, period, start, end):
+    return bucket_rollups(_rollup_rows(user, start, end), period)
+
+
+async def afocus_series(user, period, start, end):
+    return bucket_rollups([row async for row in _rollup_rows(user, start, end)], period)
+
+
+def summarize(period, start, end, series):
+    return {
+        'period': period,
+        'start': start,
+        'end': end,
+        'focus_time': sum(bucket['focus_time'] for bucket in series),
+        'sessions': sum(bucket['sessions'] for bucket in series),
+        'results': series,
+    }
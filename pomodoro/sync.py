@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Project, Tag, Task, Session, Tombstone
+from .serializers import ProjectSerializer, TagSerializer, TaskSerializer, SessionSerializer
+
+
+SYNC_MODELS = {
+    'projects': (Project, ProjectSerializer),
+    'tags': (Tag, TagSerializer),
+    'tasks': (Task, TaskSerializer),
+    'sessions': (Session, SessionSerializer),
+}
+
+TOKEN_SALT = 'pomodoro.sync'
+
+# Rows are stamped when they are saved but only become visible when their
+# transaction commits, so each sync re-reads a short window before the token.
+OVERLAP = timedelta(seconds=5)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def make_token(moment):
+    return signing.dumps(moment.isoformat(), salt=TOKEN_SALT)
+
+
+def read_token(token):
+    try:
+        value = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidToken("Invalid sync token.")
+    return datetime.fromisoformat(value)
+
+
+def delete_tracked(queryset):
+    """Delete rows of a synced model, leaving tombstones behind.
+
+    Rows whose foreign keys or tags are cleared by the delete are touched
+    as well, otherwise clients would never see them change.
+    """
+    model = queryset.model
+    rows = list(queryset.values_list('pk', 'user_id'))
+    if not rows:
+        return 0
+    ids = [pk for pk, _ in rows]
+    now = timezone.now()
+    with transaction.atomic():
+        if model is Project:
+            Task.objects.filter(project_id__in=ids).update(project=None, updated_at=now)
+        elif model is Tag:
+            Task.objects.filter(tags__in=ids).update(updated_at=now)
+        elif model is Task:
+            Session.objects.filter(task_id__in=ids).update(task=None, updated_at=now)
+        Tombstone.objects.bulk_create(
+            Tombstone(user_id=user_id, model=model._meta.model_name, object_id=pk, deleted_at=now)
+            for pk, user_id in rows
+        )
+        model.objects.filter(pk__in=ids).delete()
+    return len(rows)
+
+
+def changes_since(user, since, serializer_context):
+    now = timezone.now()
+    reset = since is None or since < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+    deleted = {name: [] for name in SYNC_MODELS}
+    if not reset:
+        names = {model._meta.model_name: name for name, (model, _) in SYNC_MODELS.items()}
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since - OVERLAP)
+        for model_name, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[names[model_name]].append(object_id)
+
+    payload = {'token': make_token(now), 'reset': reset}
+    for name, (model, serializer_class) in SYNC_MODELS.items():
+        queryset = model.objects.filter(user=user)
+        if model is Task:
+            queryset = queryset.prefetch_related('tags')
+        if not reset:
+            queryset = queryset.filter(updated_at__gte=since - OVERLAP)
+        payload[name] = {
+            'updated': serializer_class(queryset, many=True, context=serializer_context).data,
+            'deleted': deleted[name],
+        }
+    return payload
+
+
+def prune_tombstones():
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,3 +1,1652 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+import uuid
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import clear_user_cache
+from .benchmarks import run_load, seed_users
+from .emails import send_otp_email
+from .importer import _json_array_records
+from .goals import rebuild_goals
+from .jobs import run_pending
+from .leaderboard import rank_leaderboards, rank_open_boards, rebuild_scores, refresh_scores
+from .models import User, Project, Tag, Task, Session, DailyFocus, Goal, LeaderboardEntry, Streak, Tombstone, Job, OTPCounter
+from .otp import OTPError, OTPThrottled, issue_otp, verify_otp
+from .pagination import IdCursorPagination
+from .performance import REGISTRY, PerformanceMiddleware
+from .realtime import InMemoryBroker, PostgresBroker, get_broker
+from .replicas import REPLICA
+from .purge import purge_counts, purge_users
+from .stats import rebuild_rollups
+from .views import ProjectViewSet, TagViewSet, TaskViewSet, SessionViewSet
+
+
+def aware(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_user_cache()
+        self.user = User.objects.create_user(email='focus@example.com', password='pass1234', is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class FocusRollupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(user=self.user, name='Thesis')
+        self.task = Task.objects.create(user=self.user, name='Write', project=self.project)
+
+    def post_session(self, start, duration, task=None):
+        response = self.client.post(reverse('sessions-list'), {
+            'start_time': start.isoformat(),
+            'duration': duration,
+            'task': task.id if task else '',
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_rollup_follows_session_create_update_delete(self):
+        first = self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        self.post_session(aware(2026, 3, 2, 14), 50)
+
+        rollup = DailyFocus.objects.get(user=self.user, date=date(2026, 3, 2))
+        self.assertEqual((rollup.focus_time, rollup.sessions), (75, 2))
+        self.assertEqual(rollup.task_breakdown, {str(self.task.id): {'focus_time': 25, 'sessions': 1}})
+        self.assertEqual(rollup.project_breakdown, {str(self.project.id): {'focus_time': 25, 'sessions': 1}})
+
+        self.client.patch(reverse('sessions-detail', args=[first]), {'start_time': aware(2026, 3, 3, 9).isoformat()})
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.focus_time, rollup.sessions, rollup.task_breakdown), (50, 1, {}))
+        self.assertTrue(DailyFocus.objects.filter(user=self.user, date=date(2026, 3, 3), focus_time=25).exists())
+
+        self.client.delete(reverse('sessions-detail', args=[first]))
+        self.assertFalse(DailyFocus.objects.filter(user=self.user, date=date(2026, 3, 3)).exists())
+
+    def test_moving_a_task_moves_its_minutes_between_projects(self):
+        first = self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        self.post_session(aware(2026, 3, 3, 9), 20, self.task)
+        other = Project.objects.create(user=self.user, name='Teaching')
+        response = self.client.patch(reverse('tasks-detail', args=[self.task.id]), {'project': other.id})
+        self.assertEqual(response.status_code, 200)
+        self.client.patch(reverse('sessions-detail', args=[first]), {'duration': 30})
+        response = self.client.patch(reverse('tasks-bulk'), [{'id': self.task.id, 'project': None}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.patch(reverse('tasks-bulk'), [{'id': self.task.id, 'project': other.id}], format='json')
+
+        fields = ('date', 'focus_time', 'sessions', 'task_breakdown', 'project_breakdown')
+        incremental = list(DailyFocus.objects.order_by('date').values(*fields))
+        self.assertEqual(incremental[0]['project_breakdown'], {str(other.id): {'focus_time': 30, 'sessions': 1}})
+        rebuild_rollups([self.user.id])
+        self.assertEqual(list(DailyFocus.objects.order_by('date').values(*fields)), incremental)
+
+    def test_rebuild_locks_the_users_before_reading_sessions(self):
+        self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        with CaptureQueriesContext(connection) as queries:
+            rebuild_rollups([self.user.id])
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertIn(f'FROM "{User._meta.db_table}"', statements[0])
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', statements[0])
+        self.assertIn(f'FROM "{Session._meta.db_table}"', statements[1])
+
+    def test_admin_session_edits_keep_derived_data_in_sync(self):
+        first = self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        second = self.post_session(aware(2026, 3, 3, 9), 25, self.task)
+        admin = Client()
+        admin.force_login(User.objects.create_superuser(email='admin@example.com', password='pass1234'))
+        response = admin.post(reverse('admin:pomodoro_session_change', args=[first]), {
+            'user': self.user.id, 'task': self.task.id, 'end_time_0': '', 'end_time_1': '', 'duration': 50, 'client_id': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = admin.post(reverse('admin:pomodoro_session_changelist'), {
+            'action': 'delete_selected', '_selected_action': [second], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (50, 1))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.completed_pomodoros, 2)
+        fields = ('date', 'focus_time', 'sessions', 'task_breakdown', 'project_breakdown')
+        incremental = list(DailyFocus.objects.order_by('date').values(*fields))
+        self.assertEqual([row['focus_time'] for row in incremental], [50])
+        rebuild_rollups([self.user.id])
+        self.assertEqual(list(DailyFocus.objects.order_by('date').values(*fields)), incremental)
+
+        response = admin.post(reverse('admin:pomodoro_session_delete', args=[first]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions, self.task.completed_pomodoros), (0, 0, 0))
+        self.assertFalse(DailyFocus.objects.exists())
+
+    def test_stats_series_by_week(self):
+        self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        self.post_session(aware(2026, 3, 8, 9), 30, self.task)
+        self.post_session(aware(2026, 3, 9, 9), 45)
+
+        response = self.client.get(reverse('stats'), {'period': 'week', 'start': '2026-03-01', 'end': '2026-03-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['focus_time'], 100)
+        weeks = [(bucket['start'], bucket['focus_time'], bucket['sessions']) for bucket in response.data['results']]
+        self.assertEqual(weeks, [(date(2026, 3, 2), 55, 2), (date(2026, 3, 9), 45, 1)])
+        self.assertEqual(response.data['results'][0]['tasks'], {str(self.task.id): {'focus_time': 55, 'sessions': 2}})
+
+    def test_stats_default_range_ends_today_in_the_users_time_zone(self):
+        self.user.timezone = 'Pacific/Kiritimati'  # UTC+14
+        self.user.save()
+        self.post_session(aware(2026, 3, 2, 12), 25)  # March 3rd there.
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 2, 12, 30)):
+            response = self.client.get(reverse('stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['focus_time'], 25)
+        self.assertEqual(response.data['results'][-1]['start'], date(2026, 3, 3))
+
+    def test_stats_rejects_unknown_period(self):
+        response = self.client.get(reverse('stats'), {'period': 'decade'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.post_session(aware(2026, 3, 2, 9), 25, self.task)
+        self.post_session(aware(2026, 3, 4, 9), 30)
+        expected = list(DailyFocus.objects.order_by('date').values('date', 'focus_time', 'sessions', 'task_breakdown'))
+
+        Session.objects.create(user=self.user, start_time=aware(2026, 3, 5, 9), duration=10)
+        rebuild_rollups([self.user.id])
+        rebuilt = list(DailyFocus.objects.order_by('date').values('date', 'focus_time', 'sessions', 'task_breakdown'))
+        self.assertEqual(rebuilt[:2], expected)
+        self.assertEqual(rebuilt[2]['focus_time'], 10)
+
+
+class GoalStreakTests(APITestCase):
+    def post_session(self, start, duration, task=None):
+        response = self.client.post(reverse('sessions-list'), {
+            'start_time': start.isoformat(), 'duration': duration, 'task': task.id if task else '',
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def streak(self, goal=None):
+        streak = Streak.objects.get(user=self.user, goal=goal)
+        return streak.run_start, streak.run_end, streak.longest
+
+    def test_streak_follows_local_days_and_backdated_sessions(self):
+        self.user.timezone = 'America/New_York'
+        self.user.save()
+        self.post_session(aware(2026, 3, 2, 14), 25)
+        middle = self.post_session(aware(2026, 3, 4, 3), 25)  # 23:00 on March 3rd in New York
+        self.post_session(aware(2026, 3, 5, 12), 25)
+        self.assertTrue(DailyFocus.objects.filter(user=self.user, date=date(2026, 3, 3)).exists())
+        self.assertEqual(self.streak(), (date(2026, 3, 5), date(2026, 3, 5), 2))
+
+        # A late upload for March 4th joins both runs.
+        self.post_session(aware(2026, 3, 4, 15), 25)
+        self.assertEqual(self.streak(), (date(2026, 3, 2), date(2026, 3, 5), 4))
+        response = self.client.get(reverse('streak'))
+        self.assertEqual((response.data['longest'], response.data['current']), (4, 0))
+        self.assertEqual(Streak.objects.get(user=self.user).current(date(2026, 3, 6)), 4)
+
+        self.client.delete(reverse('sessions-detail', args=[middle]))
+        self.assertEqual(self.streak(), (date(2026, 3, 4), date(2026, 3, 5), 2))
+        incremental = self.streak()
+        rebuild_goals([self.user.id])
+        self.assertEqual(self.streak(), incremental)
+
+    def test_task_goal_progress_and_completed_pomodoros(self):
+        task = Task.objects.create(user=self.user, name='Read')
+        response = self.client.post(reverse('goals-list'), {'task': task.id, 'daily_minutes': 50})
+        self.assertEqual(response.status_code, 201, response.data)
+        goal = Goal.objects.get(pk=response.data['id'])
+
+        now = timezone.now()
+        first = self.post_session(now - timedelta(minutes=5), 25, task)
+        self.post_session(now - timedelta(days=1), 60)  # Not on the task.
+        [data] = self.client.get(reverse('goals-list')).data['results']
+        self.assertEqual(data['today'], {'focus_time': 25, 'met': False})
+        self.assertEqual(data['streak']['current'], 0)
+
+        self.client.patch(reverse('sessions-detail', args=[first]), {'duration': 50})
+        [data] = self.client.get(reverse('goals-list')).data['results']
+        self.assertEqual(data['today'], {'focus_time': 50, 'met': True})
+        self.assertEqual(data['streak']['current'], 1)
+        task.refresh_from_db()
+        self.assertEqual(task.completed_pomodoros, 2)
+        self.assertEqual(self.client.get(reverse('tasks-detail', args=[task.id])).data['completed_pomodoros'], 2)
+
+        self.client.delete(reverse('sessions-detail', args=[first]))
+        task.refresh_from_db()
+        self.assertEqual(task.completed_pomodoros, 0)
+        self.assertEqual(self.streak(goal), (None, None, 0))
+
+    def test_pomodoro_counts_reach_sync_deltas(self):
+        task = Task.objects.create(user=self.user, name='Read')
+        past = timezone.now() - timedelta(hours=1)
+        Task.objects.update(updated_at=past)
+        token = self.client.get(reverse('sync')).data['token']
+        self.post_session(aware(2026, 3, 2, 9), 50, task)
+        [data] = self.client.get(reverse('sync'), {'since': token}).data['tasks']['updated']
+        self.assertEqual((data['id'], data['completed_pomodoros']), (task.id, 2))
+
+        Task.objects.update(updated_at=past)
+        Task.objects.update(completed_pomodoros=0)
+        rebuild_goals([self.user.id])
+        task.refresh_from_db()
+        self.assertEqual(task.completed_pomodoros, 2)
+        self.assertGreater(task.updated_at, past)
+        # Counts that were already right are left alone.
+        Task.objects.update(updated_at=past)
+        rebuild_goals([self.user.id])
+        task.refresh_from_db()
+        self.assertEqual(task.updated_at, past)
+
+    def test_goal_validation(self):
+        project = Project.objects.create(user=self.user, name='Thesis')
+        task = Task.objects.create(user=self.user, name='Write', project=project)
+        response = self.client.post(reverse('goals-list'), {'task': task.id, 'project': project.id})
+        self.assertEqual(response.status_code, 400)
+        other = User.objects.create_user(email='other@example.com', password='x')
+        foreign = Task.objects.create(user=other, name='Theirs')
+        response = self.client.post(reverse('goals-list'), {'task': foreign.id})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sessions_cannot_count_towards_another_users_task(self):
+        other = User.objects.create_user(email='other@example.com', password='x')
+        foreign = Task.objects.create(user=other, name='Theirs')
+        payload = {'start_time': aware(2026, 3, 2, 9).isoformat(), 'duration': 50, 'task': foreign.id}
+        response = self.client.post(reverse('sessions-list'), payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('task', response.data)
+        response = self.client.post(reverse('sessions-bulk'), [payload], format='json')
+        self.assertEqual(response.status_code, 400)
+
+        session = self.post_session(aware(2026, 3, 2, 9), 50)
+        response = self.client.patch(reverse('sessions-bulk'), [{'id': session, 'task': foreign.id}], format='json')
+        self.assertEqual(response.status_code, 400)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.completed_pomodoros, 0)
+        self.assertFalse(Session.objects.filter(task=foreign).exists())
+
+    def test_time_zone_change_rebuilds_local_days(self):
+        self.post_session(aware(2026, 3, 4, 3), 25)
+        self.assertTrue(DailyFocus.objects.filter(user=self.user, date=date(2026, 3, 4)).exists())
+        response = self.client.patch(reverse('profile'), {'timezone': 'Mars/Olympus'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(reverse('profile'), {'timezone': 'America/New_York'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(list(DailyFocus.objects.filter(user=self.user).values_list('date', flat=True)), [date(2026, 3, 3)])
+        self.assertEqual(self.streak(), (date(2026, 3, 3), date(2026, 3, 3), 1))
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.filter(pk=self.user.pk).update(country='NL')
+        self.others = [
+            User.objects.create_user(email=f'rival{i}@example.com', password='x', is_active=True, country=country)
+            for i, country in enumerate(['NL', 'DE', 'NL', 'DE'])
+        ]
+
+    def post_session(self, user, start, duration):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('sessions-list'), {'start_time': start.isoformat(), 'duration': duration})
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def scores(self, period='all', start=date(1970, 1, 1), metric='focus'):
+        entries = LeaderboardEntry.objects.filter(metric=metric, period=period, period_start=start)
+        return dict(entries.values_list('user_id', 'score'))
+
+    def test_session_writes_update_scores_and_ranking_fills_in_ranks(self):
+        day = date(2026, 3, 4)
+        for minutes, user in zip((40, 10, 30, 50, 20), [self.user] + self.others):
+            self.post_session(user, aware(2026, 3, 4, 9), minutes)
+        # A backdated session from the previous week counts for the month and all time only.
+        session = self.post_session(self.user, aware(2026, 3, 1, 9), 25)
+        self.assertEqual(self.scores()[self.user.id], 65)
+        self.assertEqual(self.scores('week', date(2026, 3, 2))[self.user.id], 40)
+        self.assertEqual(self.scores('month', date(2026, 3, 1))[self.user.id], 65)
+        self.assertIsNone(LeaderboardEntry.objects.get(user=self.user, metric='focus', period='all').global_rank)
+
+        rank_leaderboards(day)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('leaderboard'), {'period': 'month', 'date': '2026-03-04', 'limit': 3})
+        self.assertEqual([entry['score'] for entry in response.data['results']], [65, 50, 30])
+        self.assertEqual(response.data['period_start'], date(2026, 3, 1))
+        response = self.client.get(reverse('leaderboard'), {'period': 'week', 'date': '2026-03-04', 'country': 'DE'})
+        self.assertEqual([(entry['score'], entry['country_rank']) for entry in response.data['results']], [(30, 1), (20, 2)])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('leaderboard-me'), {'period': 'week', 'date': '2026-03-04', 'scope': 'country', 'neighbours': 1},
+            )
+        self.assertEqual(response.data['entry']['country_rank'], 2)
+        self.assertEqual(
+            [entry['user'] for entry in response.data['neighbours']], [self.others[2].id, self.user.id, self.others[0].id],
+        )
+
+        # Deleting the backdated session takes it back out of the month board.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('sessions-detail', args=[session]))
+        self.assertEqual(self.scores('month', date(2026, 3, 1))[self.user.id], 40)
+        # Only the two entries that swapped places are rewritten.
+        self.assertEqual(rank_leaderboards(day)['month'], 2)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user, metric='focus', period='month').global_rank, 2)
+
+    def test_user_without_focus_has_no_entry(self):
+        response = self.client.get(reverse('leaderboard-me'), {'period': 'day'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['entry'])
+        self.assertEqual(response.data['neighbours'], [])
+        response = self.client.get(reverse('leaderboard'), {'limit': 1000})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.post_session(self.user, aware(2026, 2, 20, 9), 25)
+        self.post_session(self.user, aware(2026, 3, 4, 9), 30)
+        self.post_session(self.user, aware(2026, 3, 5, 9), 10)
+        self.post_session(self.others[0], aware(2026, 3, 5, 9), 15)
+        expected = list(LeaderboardEntry.objects.order_by('user_id', 'metric', 'period', 'period_start').values_list(
+            'user_id', 'metric', 'period', 'period_start', 'country', 'score',
+        ))
+
+        LeaderboardEntry.objects.all().delete()
+        rebuild_scores()
+        rebuilt = LeaderboardEntry.objects.order_by('user_id', 'metric', 'period', 'period_start').values_list(
+            'user_id', 'metric', 'period', 'period_start', 'country', 'score',
+        )
+        self.assertEqual(list(rebuilt), expected)
+
+        # A partial rebuild starts at the week holding March 1st and leaves earlier boards alone.
+        LeaderboardEntry.objects.filter(period_start=date(2026, 2, 20)).update(score=1)
+        rebuild_scores(since=date(2026, 3, 4))
+        self.assertEqual(LeaderboardEntry.objects.get(period='day', period_start=date(2026, 2, 20)).score, 1)
+        self.assertEqual(list(rebuilt.exclude(period_start=date(2026, 2, 20))), [
+            row for row in expected if row[3] != date(2026, 2, 20)
+        ])
+
+    def test_streak_boards_count_consecutive_days(self):
+        for day in (1, 2, 3, 4):
+            self.post_session(self.user, aware(2026, 3, day, 9), 25)
+        for day in (26, 27, 28):
+            self.post_session(self.user, aware(2026, 2, day, 9), 25)
+        self.post_session(self.user, aware(2026, 3, 6, 9), 25)
+        # Feb 26th to March 4th, across two weeks and two months.
+        self.assertEqual(self.scores(metric='streak')[self.user.id], 7)
+        self.assertEqual(self.scores('week', date(2026, 2, 23), 'streak')[self.user.id], 4)
+        self.assertEqual(self.scores('week', date(2026, 3, 2), 'streak')[self.user.id], 3)
+        self.assertEqual(self.scores('month', date(2026, 3, 1), 'streak')[self.user.id], 4)
+        self.assertFalse(LeaderboardEntry.objects.filter(metric='streak', period='day').exists())
+
+        rank_leaderboards(date(2026, 3, 4), 'streak')
+        response = self.client.get(reverse('leaderboard'), {'metric': 'streak', 'period': 'month', 'date': '2026-03-04'})
+        self.assertEqual(response.data['metric'], 'streak')
+        self.assertEqual([(entry['user'], entry['score']) for entry in response.data['results']], [(self.user.id, 4)])
+        response = self.client.get(reverse('leaderboard'), {'metric': 'streak', 'period': 'day'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_inactive_users_are_left_off_every_board(self):
+        rival = self.others[0]
+        self.post_session(rival, aware(2026, 3, 4, 9), 30)
+        User.objects.filter(pk=rival.pk).update(is_active=False)
+        refresh_scores({(rival.id, date(2026, 3, 4))})
+        self.assertFalse(LeaderboardEntry.objects.filter(user=rival).exists())
+        rebuild_scores()
+        self.assertFalse(LeaderboardEntry.objects.filter(user=rival).exists())
+
+    def test_boards_default_to_the_users_local_date(self):
+        self.user.timezone = 'Pacific/Kiritimati'
+        self.user.save(update_fields=['timezone'])
+        self.client.force_authenticate(self.user)
+        # Still March 4th in UTC, already the 5th at UTC+14.
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 4, 12)):
+            response = self.client.get(reverse('leaderboard-me'), {'period': 'day'})
+        self.assertEqual(response.data['period_start'], date(2026, 3, 5))
+
+    def test_just_closed_boards_get_final_ranks_once(self):
+        self.post_session(self.user, aware(2026, 3, 8, 9), 30)
+        self.post_session(self.others[0], aware(2026, 3, 8, 9), 40)
+        # Monday 13:00 UTC: Sunday March 8th has ended everywhere, Monday is open.
+        now = aware(2026, 3, 9, 13)
+        changed = rank_open_boards(now)
+        self.assertEqual(changed['focus', 'week', date(2026, 3, 2)], 2)
+        self.assertEqual(changed['streak', 'week', date(2026, 3, 2)], 2)
+        self.assertEqual(changed['focus', 'day', date(2026, 3, 8)], 2)
+        self.assertIn(('focus', 'day', date(2026, 3, 10)), changed)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user, metric='focus', period='week').global_rank, 2)
+
+        changed = rank_open_boards(now)
+        self.assertNotIn(('focus', 'week', date(2026, 3, 2)), changed)
+        self.assertNotIn(('focus', 'day', date(2026, 3, 8)), changed)
+        self.assertIn(('focus', 'month', date(2026, 3, 1)), changed)
+
+    def test_country_change_moves_entries(self):
+        self.post_session(self.user, aware(2026, 3, 4, 9), 30)
+        self.client.force_authenticate(self.user)
+        self.client.patch(reverse('profile'), {'country': 'BE'})
+        self.assertEqual(set(LeaderboardEntry.objects.filter(user=self.user).values_list('country', flat=True)), {'BE'})
+
+
+class FocusCounterTests(APITestCase):
+    def test_counters_follow_create_update_delete(self):
+        first = self.client.post(reverse('sessions-list'), {'duration': 25}).data['id']
+        self.client.post(reverse('sessions-list'), {'duration': 35})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions, self.user.average_focus_time), (60, 2, 30.0))
+
+        self.client.patch(reverse('sessions-detail', args=[first]), {'duration': 45})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions, self.user.average_focus_time), (80, 2, 40.0))
+
+        self.client.delete(reverse('sessions-detail', args=[first]))
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions, self.user.average_focus_time), (35, 1, 35.0))
+
+    def test_counter_update_touches_only_stat_columns(self):
+        with self.assertNumQueries(2) as context:
+            self.user.add_focus(25)
+        update_sql = context.captured_queries[0]['sql']
+        self.assertIn('total_focus_time', update_sql)
+        self.assertNotIn('email', update_sql.split('WHERE')[0])
+
+    def test_interleaved_updates_from_stale_copies_both_count(self):
+        # Two requests that loaded the user before either wrote, as on
+        # databases where the threaded test below can't run.
+        first, second = User.objects.get(pk=self.user.pk), User.objects.get(pk=self.user.pk)
+        first.add_focus(25)
+        with CaptureQueriesContext(connection) as queries:
+            second.add_focus(35)
+        # The new totals are computed from the stored row, not the stale copy.
+        column = f'"{User._meta.db_table}"."total_focus_time"'
+        self.assertIn(column, queries[0]['sql'].split('WHERE')[0])
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions, self.user.average_focus_time), (60, 2, 30.0))
+        self.assertEqual((second.total_focus_time, second.total_sessions), (60, 2))
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentFocusCounterTests(TransactionTestCase):
+    def test_parallel_creates_do_not_lose_updates(self):
+        User.objects.create_user(email='parallel@example.com', password='pass1234', is_active=True)
+
+        def post_session(duration):
+            try:
+                client = APIClient()
+                client.force_authenticate(User.objects.get(email='parallel@example.com'))
+                return client.post(reverse('sessions-list'), {'duration': duration}).status_code
+            finally:
+                connection.close()
+
+        durations = [5, 10, 15, 20] * 5
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(post_session, durations))
+
+        self.assertEqual(statuses, [201] * len(durations))
+        user = User.objects.get(email='parallel@example.com')
+        self.assertEqual(user.total_sessions, len(durations))
+        self.assertEqual(user.total_focus_time, sum(durations))
+        self.assertEqual(user.average_focus_time, sum(durations) / len(durations))
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(email=f'plan{i}@example.com', password='!') for i in range(50)
+        )
+        Project.objects.bulk_create(Project(user=user, name=f'Project {i}') for user in users for i in range(5))
+        Tag.objects.bulk_create(Tag(user=user, name=f'Tag {i}') for user in users for i in range(5))
+        Task.objects.bulk_create(
+            Task(user=user, name=f'Task {i}', status='disabled' if i % 4 else 'active')
+            for user in users for i in range(20)
+        )
+        start = aware(2026, 1, 1)
+        Session.objects.bulk_create(
+            Session(user=user, start_time=start + timedelta(hours=i), duration=25)
+            for user in users for i in range(100)
+        )
+        cls.user = users[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def viewset_queryset(self, viewset, **params):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=self.user)
+        view = viewset(action_map={'get': 'list'})
+        view.format_kwarg = None
+        view.request = view.initialize_request(request)
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"Expected {index_name} in plan:\n{plan}")
+
+    def test_session_history_uses_user_start_index(self):
+        self.assertUsesIndex(self.viewset_queryset(SessionViewSet), 'session_user_start_idx')
+
+    def test_task_status_filter_uses_user_status_index(self):
+        self.assertUsesIndex(self.viewset_queryset(TaskViewSet, status='active'), 'task_user_status_idx')
+
+    def test_project_and_tag_lists_use_user_index(self):
+        # Django names foreign key indexes <table>_<column>_<hash>.
+        for viewset, index_prefix in ((ProjectViewSet, 'pomodoro_project_user_id'), (TagViewSet, 'pomodoro_tag_user_id')):
+            with self.subTest(viewset=viewset.__name__):
+                self.assertUsesIndex(self.viewset_queryset(viewset), index_prefix)
+
+
+class CursorPaginationTests(APITestCase):
+    def collect_pages(self, url, **params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_sessions_paginate_newest_first_with_ties(self):
+        start = aware(2026, 3, 2, 9)
+        sessions = Session.objects.bulk_create(
+            Session(user=self.user, start_time=start + timedelta(hours=i // 2), duration=25) for i in range(7)
+        )
+        pages = self.collect_pages(reverse('sessions-list'), page_size=3)
+
+        expected = [s.id for s in sorted(sessions, key=lambda s: (s.start_time, s.id), reverse=True)]
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_tasks_paginate_by_id(self):
+        tasks = Task.objects.bulk_create(Task(user=self.user, name=f'Task {i}') for i in range(5))
+        pages = self.collect_pages(reverse('tasks-list'), page_size=2)
+        self.assertEqual(sum(pages, []), [task.id for task in tasks])
+
+
+class ListQueryCountTests(APITestCase):
+    def seed(self, rows):
+        project = Project.objects.create(user=self.user, name='Project')
+        tags = Tag.objects.bulk_create(Tag(user=self.user, name=f'Tag {i}') for i in range(3))
+        tasks = Task.objects.bulk_create(Task(user=self.user, name=f'Task {i}', project=project) for i in range(rows))
+        Task.tags.through.objects.bulk_create(
+            Task.tags.through(task_id=task.id, tag_id=tag.id) for task in tasks for tag in tags[:2]
+        )
+        Session.objects.bulk_create(
+            Session(user=self.user, task=task, start_time=aware(2026, 3, 2) + timedelta(minutes=i), duration=25)
+            for i, task in enumerate(tasks)
+        )
+
+    def assertListQueries(self, url, num, rows, **params):
+        with self.assertNumQueries(num):
+            response = self.client.get(url, {'page_size': rows, **params})
+        self.assertEqual(len(response.data['results']), rows)
+        return response.data['results']
+
+    def test_lists_use_constant_queries(self):
+        with mock.patch.object(IdCursorPagination, 'max_page_size', 1000):
+            for rows in (1, 100, 1000):
+                with self.subTest(rows=rows):
+                    Session.objects.all().delete()
+                    Task.objects.all().delete()
+                    self.seed(rows)
+                    # One query for the page, one to prefetch tags.
+                    tasks = self.assertListQueries(reverse('tasks-list'), 2, rows)
+                    self.assertEqual(len(tasks[0]['tags']), 2)
+                    tasks = self.assertListQueries(reverse('tasks-list'), 2, rows, expand='true')
+                    self.assertEqual(tasks[0]['project']['name'], 'Project')
+                    self.assertEqual([tag['name'] for tag in tasks[0]['tags']], ['Tag 0', 'Tag 1'])
+                    self.assertListQueries(reverse('sessions-list'), 1, rows)
+                    sessions = self.assertListQueries(reverse('sessions-list'), 2, rows, expand='1')
+                    self.assertEqual(sessions[0]['task']['project']['name'], 'Project')
+
+    def test_tasks_only_take_the_users_own_projects_and_tags(self):
+        other = User.objects.create_user(email='other@example.com', password='x')
+        project = Project.objects.create(user=other, name='Their project')
+        tag = Tag.objects.create(user=other, name='Their tag')
+        response = self.client.post(reverse('tasks-list'), {'name': 'Task', 'project': project.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('project', response.data)
+        response = self.client.post(reverse('tasks-bulk'), [{'name': 'Task', 'tags': [tag.id]}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+        task = Task.objects.create(user=self.user, name='Mine')
+        response = self.client.patch(reverse('tasks-detail', args=[task.id]), {'tags': [tag.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
+        response = self.client.patch(reverse('tasks-bulk'), [{'id': task.id, 'project': project.id}], format='json')
+        self.assertEqual(response.status_code, 400)
+        task.refresh_from_db()
+        self.assertIsNone(task.project_id)
+        self.assertFalse(task.tags.exists())
+
+
+class SessionExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        project = Project.objects.create(user=self.user, name='Thesis')
+        self.task = Task.objects.create(user=self.user, name='Write', project=project)
+        Session.objects.create(user=self.user, task=self.task, start_time=aware(2026, 3, 2, 9), duration=25)
+        Session.objects.create(user=self.user, start_time=aware(2026, 3, 1, 9), duration=50)
+        Session.objects.create(user=self.user, task=self.task, start_time=aware(2026, 3, 4, 9), duration=15)
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        Session.objects.create(user=other, start_time=aware(2026, 3, 2, 10), duration=5)
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse('sessions-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_own_sessions_in_order(self):
+        with self.settings(EXPORT_CHUNK_SIZE=1):
+            rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        self.assertEqual([row['duration'] for row in rows], ['50', '25', '15'])
+        self.assertEqual(rows[1]['task'], 'Write')
+        self.assertEqual(rows[1]['project'], 'Thesis')
+        self.assertEqual(rows[1]['start_time'], '2026-03-02T09:00:00+00:00')
+
+    def test_ndjson_filters(self):
+        lines = self.export('ndjson', start='2026-03-02', end='2026-03-03').splitlines()
+        self.assertEqual([json.loads(line)['duration'] for line in lines], [25])
+        lines = self.export('ndjson', task=self.task.id).splitlines()
+        self.assertEqual([json.loads(line)['duration'] for line in lines], [25, 15])
+
+    def test_command_exports_all_users(self):
+        out = io.StringIO()
+        call_command('export_sessions', '--format=csv', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['user_email'] for row in rows}, {'focus@example.com', 'other@example.com'})
+
+
+class SessionImportTests(APITestCase):
+    def upload(self, content, name='history.csv'):
+        return self.client.post(
+            reverse('sessions-import-file'), {'file': SimpleUploadedFile(name, content.encode())}, format='multipart',
+        )
+
+    def test_csv_import_creates_references_and_stats(self):
+        Project.objects.create(user=self.user, name='Thesis')
+        client_id = uuid.uuid4()
+        response = self.upload(
+            'type,start_time,duration,task,project,tags,client_id,estimated_pomodoros\n'
+            'task,,,Read,Reading,,,4\n'
+            f',2026-03-02T09:00:00Z,25,Write,Thesis,"deep, focus",{client_id},\n'
+            f',2026-03-02T10:00:00Z,25,Write,Thesis,,{client_id},\n'
+            ',2026-03-03T09:00:00Z,50,Read,Reading,,,\n'
+            ',2026-03-03T11:00:00Z,10,,,,,\n'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data, {'sessions': 3, 'duplicates': 1, 'tasks': 2, 'projects': 1, 'tags': 2})
+
+        write = Task.objects.get(name='Write')
+        self.assertEqual(write.project.name, 'Thesis')
+        self.assertEqual(sorted(write.tags.values_list('name', flat=True)), ['deep', 'focus'])
+        self.assertEqual(Task.objects.get(name='Read').estimated_pomodoros, 4)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (85, 3))
+        rollup = DailyFocus.objects.get(user=self.user, date=date(2026, 3, 3))
+        self.assertEqual((rollup.focus_time, rollup.sessions), (60, 2))
+
+    def test_invalid_rows_abort_the_whole_import(self):
+        response = self.upload(json.dumps([
+            {'start_time': '2026-03-02T09:00:00Z', 'duration': 25, 'task': 'Write'},
+            {'start_time': 'yesterday', 'duration': 25},
+            {'duration': -5, 'start_time': '2026-03-02T09:00:00Z'},
+        ]), name='history.json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data['errors']), [2, 3])
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_json_array_is_parsed_across_chunk_boundaries(self):
+        chunks = iter(['  [{"a"', ': "x]"}, {"b"', ': 2}\n', ']'])
+        self.assertEqual(list(_json_array_records(chunks)), [{'a': 'x]'}, {'b': 2}])
+
+    def test_command_imports_ndjson(self):
+        Session.objects.create(user=self.user, start_time=aware(2026, 3, 1, 9), duration=25)
+        export = io.StringIO()
+        call_command('export_sessions', '--format=ndjson', stdout=export)
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        with mock.patch('builtins.open', mock.mock_open(read_data=export.getvalue().encode())):
+            call_command('import_sessions', 'history.ndjson', '--email=other@example.com', stdout=io.StringIO())
+        self.assertEqual(list(Session.objects.filter(user=other).values_list('duration', flat=True)), [25])
+
+
+class PurgeTests(APITestCase):
+    def seed(self, user, rows=3):
+        project = Project.objects.create(user=user, name='Project')
+        tag = Tag.objects.create(user=user, name='Tag')
+        for i in range(rows):
+            task = Task.objects.create(user=user, name=f'Task {i}', project=project)
+            task.tags.add(tag)
+            Session.objects.create(user=user, task=task, start_time=aware(2026, 3, 2, i), duration=25)
+        rebuild_rollups([user.id])
+
+    def test_purge_deletes_everything_a_user_owns_in_chunks(self):
+        spam = [User.objects.create_user(email=f'spam{i}@example.com', password='x') for i in range(3)]
+        for user in spam:
+            self.seed(user)
+        self.seed(self.user)
+        # A reference from a kept account to a purged task is cleared, not followed.
+        Session.objects.create(user=self.user, task=Task.objects.filter(user=spam[0]).first(), duration=5)
+        users = User.objects.filter(email__startswith='spam')
+
+        self.assertEqual(
+            purge_counts(users),
+            {'sessions': 9, 'task_tags': 9, 'daily_focus': 3, 'leaderboard': 0, 'tombstones': 0,
+             'streaks': 0, 'goals': 0, 'tasks': 9, 'projects': 3, 'tags': 3, 'users': 3},
+        )
+        # A SELECT and a DELETE per chunk of 5 rows (plus savepoints), never a query per row.
+        with self.assertNumQueries(67):
+            counts = purge_users(users, chunk_size=5)
+        self.assertEqual(counts['sessions'], 9)
+        self.assertEqual(counts['users'], 3)
+        self.assertEqual(purge_counts(User.objects.filter(email__startswith='spam'))['tasks'], 0)
+        self.assertEqual(Session.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 3)
+
+    def test_command_dry_run_deletes_nothing(self):
+        User.objects.create_user(email='stale@example.com', password='x', date_joined=timezone.now() - timedelta(days=30))
+        out = io.StringIO()
+        call_command('purge_users', '--unverified-days=7', '--dry-run', stdout=out)
+        self.assertIn('users: 1', out.getvalue())
+        self.assertTrue(User.objects.filter(email='stale@example.com').exists())
+
+        call_command('purge_users', '--unverified-days=7', stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(email='stale@example.com').exists())
+        self.assertTrue(User.objects.filter(email='focus@example.com').exists())
+
+
+class AdminChangelistTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='pass1234')
+        self.client.force_login(self.admin)
+
+    def seed(self, users, rows):
+        owners = User.objects.bulk_create(User(email=f'user{len(self.owners) + i}@example.com') for i in range(users))
+        self.owners += owners
+        for user in owners:
+            project = Project.objects.create(user=user, name='Project')
+            tasks = Task.objects.bulk_create(Task(user=user, name=f'Task {i}', project=project) for i in range(rows))
+            Session.objects.bulk_create(
+                Session(user=user, task=task, start_time=aware(2026, 3, 2) + timedelta(hours=i), duration=25)
+                for i, task in enumerate(tasks)
+            )
+
+    def render(self, name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:pomodoro_{name}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_changelist_queries_do_not_grow_with_the_data(self):
+        self.owners = []
+        self.seed(users=5, rows=20)
+        small = {name: self.render(name)[1] for name in ('session', 'task')}
+        self.seed(users=50, rows=40)
+        for name in ('session', 'task'):
+            with self.subTest(name=name):
+                response, num = self.render(name)
+                self.assertEqual(num, small[name])
+                self.assertLessEqual(num, 10)
+                # The filter is a single autocomplete box, not a link per user.
+                self.assertNotContains(response, 'user__id__exact')
+                self.assertContains(response, 'data-field-name="user"')
+                self.assertContains(response, 'admin/js/autocomplete.js')
+
+    def test_user_filter_and_date_hierarchy(self):
+        self.owners = []
+        self.seed(users=3, rows=2)
+        response, num = self.render('session', user=self.owners[1].pk)
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertLessEqual(num, 10)
+        # Only the selected user is loaded into the box.
+        self.assertContains(response, f'<option value="{self.owners[1].pk}" selected>{self.owners[1]}</option>', html=True)
+        response, _ = self.render('task', user=self.owners[2].pk, status__exact='active')
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'pomodoro', 'model_name': 'session', 'field_name': 'user', 'term': 'user2',
+        })
+        self.assertEqual([result['text'] for result in response.json()['results']], [str(self.owners[2])])
+        response, _ = self.render('session', start_time__year='2026', start_time__month='3')
+        self.assertEqual(response.context['cl'].result_count, 6)
+
+    def test_job_admin_hides_the_payload(self):
+        job = Job.objects.create(name='pomodoro.emails.send_otp_email', payload={'email': 'secret@example.com'})
+        response = self.client.get(reverse('admin:pomodoro_job_change', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'secret@example.com')
+
+
+class CachedResponseTests(APITestCase):
+    def test_list_is_cached_until_a_write(self):
+        Project.objects.create(user=self.user, name='Thesis')
+        url = reverse('projects-list')
+        first = self.client.get(url)
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'name': 'Reading'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([project['name'] for project in response.data['results']], ['Thesis', 'Reading'])
+
+    def test_responses_are_per_user_and_errors_are_not_cached(self):
+        task = Task.objects.create(user=self.user, name='Write')
+        self.client.get(reverse('tasks-detail', args=[task.id]))
+        other = User.objects.create_user(email='other@example.com', password='pass1234', is_active=True)
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse('tasks-detail', args=[task.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_admin_and_bulk_writes_bump_the_version(self):
+        url = reverse('tasks-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('tasks-bulk'), [{'name': 'Write'}], format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.data['results']), 1)
+
+        admin = User.objects.create_superuser(email='admin@example.com', password='pass1234')
+        self.client.force_login(admin)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:pomodoro_task_delete', args=[response.data['results'][0]['id']]), {'post': 'yes'})
+        self.client.force_authenticate(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_id_only_views_skip_the_user_lookup(self):
+        Tag.objects.create(user=self.user, name='Deep work')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tags-list'))
+        self.assertEqual(response.data['results'][0]['name'], 'Deep work')
+
+    def test_user_is_loaded_once_per_ttl_and_profile_is_fresh(self):
+        with self.assertNumQueries(2):
+            self.client.post(reverse('projects-list'), {'name': 'Thesis'})
+        with self.assertNumQueries(1):
+            self.client.post(reverse('projects-list'), {'name': 'Reading'})
+
+        User.objects.filter(pk=self.user.pk).update(country='Azerbaijan')
+        self.assertEqual(self.client.get(reverse('profile')).data['country'], 'Azerbaijan')
+
+    def test_inactive_user_is_rejected_when_loaded(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post(reverse('projects-list'), {'name': 'Thesis'})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Project.objects.exists())
+
+
+class BulkEndpointTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(user=self.user, name='Project')
+        self.tags = Tag.objects.bulk_create(Tag(user=self.user, name=f'Tag {i}') for i in range(2))
+        self.task = Task.objects.create(user=self.user, name='Task', project=self.project)
+
+    def test_bulk_create_sessions_updates_counters_once(self):
+        payload = [
+            {'task': self.task.id, 'start_time': aware(2026, 3, 2, 9).isoformat(), 'duration': 25},
+            {'start_time': aware(2026, 3, 2, 10).isoformat(), 'duration': 30},
+            {'start_time': aware(2026, 3, 3, 10).isoformat(), 'duration': 15},
+        ]
+        response = self.client.post(reverse('sessions-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([item['duration'] for item in response.data], [25, 30, 15])
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (70, 3))
+        rollup = DailyFocus.objects.get(user=self.user, date=date(2026, 3, 2))
+        self.assertEqual((rollup.focus_time, rollup.sessions), (55, 2))
+
+    def test_bulk_create_reports_per_item_errors_and_writes_nothing(self):
+        payload = [{'duration': 25}, {'duration': -5}, {'task': 10 ** 9}]
+        response = self.client.post(reverse('sessions-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(set(errors), {1, 2})
+        self.assertIn('duration', errors[1])
+        self.assertIn('task', errors[2])
+        self.assertFalse(Session.objects.exists())
+
+    def test_bulk_create_tasks_with_tags(self):
+        payload = [
+            {'name': 'Read', 'project': self.project.id, 'tags': [tag.id for tag in self.tags]},
+            {'name': 'Write', 'tags': [self.tags[1].id]},
+        ]
+        response = self.client.post(reverse('tasks-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([item['name'] for item in response.data], ['Read', 'Write'])
+        self.assertEqual(response.data[0]['tags'], [tag.id for tag in self.tags])
+        self.assertEqual(response.data[1]['tags'], [self.tags[1].id])
+
+    def test_bulk_update_and_delete_sessions(self):
+        sessions = Session.objects.bulk_create(
+            Session(user=self.user, start_time=aware(2026, 3, 2, 9 + i), duration=25) for i in range(3)
+        )
+        rebuild_rollups([self.user.id])
+        self.user.add_focus(75, sessions=3)
+
+        payload = [{'id': sessions[0].id, 'duration': 50}, {'id': sessions[1].id, 'task': self.task.id}]
+        response = self.client.patch(reverse('sessions-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_focus_time, 100)
+        rollup = DailyFocus.objects.get(user=self.user, date=date(2026, 3, 2))
+        self.assertEqual(rollup.task_breakdown, {str(self.task.id): {'focus_time': 25, 'sessions': 1}})
+
+        response = self.client.delete(reverse('sessions-bulk'), [sessions[0].id, sessions[2].id, 10 ** 9], format='json')
+        self.assertEqual(response.data, {'deleted': sorted([sessions[0].id, sessions[2].id]), 'missing': [10 ** 9]})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (25, 1))
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.focus_time, rollup.sessions), (25, 1))
+
+    def test_bulk_update_rejects_other_users_rows(self):
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        task = Task.objects.create(user=other, name='Theirs')
+        response = self.client.patch(reverse('tasks-bulk'), [{'id': task.id, 'name': 'Mine'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], {0: {'id': ['Not found.']}})
+
+
+class IdempotentSessionTests(APITestCase):
+    def test_replayed_create_is_upserted_without_double_counting(self):
+        payload = {'client_id': str(uuid.uuid4()), 'start_time': aware(2026, 3, 2, 9).isoformat(), 'duration': 25}
+        first = self.client.post(reverse('sessions-list'), payload, format='json')
+        replay = self.client.post(reverse('sessions-list'), payload, format='json')
+        self.assertEqual((first.status_code, replay.status_code), (201, 200))
+        self.assertEqual(first.data['id'], replay.data['id'])
+
+        corrected = self.client.post(reverse('sessions-list'), {**payload, 'duration': 30}, format='json')
+        self.assertEqual(corrected.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (30, 1))
+        self.assertEqual(DailyFocus.objects.get(user=self.user).focus_time, 30)
+
+    def test_client_ids_are_scoped_per_user(self):
+        client_id = uuid.uuid4()
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        Session.objects.create(user=other, client_id=client_id, duration=10)
+        response = self.client.post(reverse('sessions-list'), {'client_id': str(client_id), 'duration': 25}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Session.objects.filter(client_id=client_id).count(), 2)
+
+    def test_bulk_replay_skips_stored_and_duplicate_client_ids(self):
+        replayed, fresh = str(uuid.uuid4()), str(uuid.uuid4())
+        self.client.post(reverse('sessions-list'), {'client_id': replayed, 'duration': 25}, format='json')
+        payload = [
+            {'client_id': replayed, 'duration': 25},
+            {'client_id': fresh, 'duration': 10},
+            {'duration': 5},
+            {'client_id': fresh, 'duration': 10},
+        ]
+        response = self.client.post(reverse('sessions-bulk'), payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([item['duration'] for item in response.data], [25, 10, 5, 10])
+        self.assertEqual(response.data[1]['id'], response.data[3]['id'])
+        self.assertEqual(Session.objects.filter(user=self.user).count(), 3)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_focus_time, self.user.total_sessions), (40, 3))
+
+
+class DeltaSyncTests(APITestCase):
+    def sync(self, token=None):
+        response = self.client.get(reverse('sync'), {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, payload, name):
+        return sorted(item['id'] for item in payload[name]['updated'])
+
+    def age_rows(self):
+        # Push existing rows out of the overlap window re-read on every sync.
+        past = timezone.now() - timedelta(hours=1)
+        for model in (Project, Tag, Task, Session):
+            model.objects.update(updated_at=past)
+        Tombstone.objects.update(deleted_at=past)
+
+    def test_initial_sync_returns_everything(self):
+        project = Project.objects.create(user=self.user, name='Project')
+        Project.objects.create(user=User.objects.create_user(email='x@example.com', password='pass1234'), name='Theirs')
+        payload = self.sync()
+        self.assertTrue(payload['reset'])
+        self.assertEqual(self.ids(payload, 'projects'), [project.id])
+        self.assertEqual(payload['sessions'], {'updated': [], 'deleted': []})
+
+    def test_delta_contains_only_changes_and_deletions(self):
+        project = Project.objects.create(user=self.user, name='Project')
+        tag = Tag.objects.create(user=self.user, name='Tag')
+        task = Task.objects.create(user=self.user, name='Task', project=project)
+        task.tags.add(tag)
+        kept = Task.objects.create(user=self.user, name='Untouched')
+        session = Session.objects.create(user=self.user, task=task, duration=25)
+        token = self.sync()['token']
+        self.age_rows()
+
+        self.client.patch(reverse('tags-detail', args=[tag.id]), {'name': 'Renamed'})
+        self.client.delete(reverse('projects-detail', args=[project.id]))
+        self.client.delete(reverse('tasks-bulk'), [task.id], format='json')
+
+        payload = self.sync(token)
+        self.assertFalse(payload['reset'])
+        self.assertEqual(self.ids(payload, 'tags'), [tag.id])
+        self.assertEqual(payload['projects']['deleted'], [project.id])
+        self.assertEqual(payload['tasks'], {'updated': [], 'deleted': [task.id]})
+        # The session lost its task, so it changed too.
+        self.assertEqual(self.ids(payload, 'sessions'), [session.id])
+        self.assertIsNone(payload['sessions']['updated'][0]['task'])
+        self.assertNotIn(kept.id, self.ids(payload, 'tasks'))
+
+    def test_bulk_update_bumps_updated_at(self):
+        task = Task.objects.create(user=self.user, name='Task')
+        token = self.sync()['token']
+        self.age_rows()
+        self.client.patch(reverse('tasks-bulk'), [{'id': task.id, 'name': 'Renamed'}], format='json')
+        self.assertEqual(self.ids(self.sync(token), 'tasks'), [task.id])
+
+    def test_rejects_tampered_token(self):
+        response = self.client.get(reverse('sync'), {'since': 'not-a-token'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TimerTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.task = Task.objects.create(user=self.user, name='Task')
+
+    def test_active_timer_does_not_touch_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('sessions-active'))
+        self.assertEqual(response.data, {'state': 'idle'})
+
+        self.client.post(reverse('sessions-start'), {'task': self.task.id})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('sessions-active'))
+        self.assertEqual((response.data['state'], response.data['task']), ('running', self.task.id))
+
+    def test_start_pause_resume_stop_persists_one_session(self):
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 2, 9)):
+            self.assertEqual(self.client.post(reverse('sessions-start'), {'task': self.task.id}).status_code, 200)
+            self.assertEqual(self.client.post(reverse('sessions-start')).status_code, 409)
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 2, 9, 10)):
+            self.assertEqual(self.client.post(reverse('sessions-pause')).data['state'], 'paused')
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 2, 9, 15)):
+            self.assertEqual(self.client.post(reverse('sessions-resume')).data['elapsed_seconds'], 600)
+        self.assertFalse(Session.objects.exists())
+        with mock.patch('django.utils.timezone.now', return_value=aware(2026, 3, 2, 9, 30)):
+            response = self.client.post(reverse('sessions-stop'))
+
+        self.assertEqual(response.status_code, 201, response.data)
+        session = Session.objects.get()
+        self.assertEqual((session.task, session.duration), (self.task, 25))
+        self.assertEqual((session.start_time, session.end_time), (aware(2026, 3, 2, 9), aware(2026, 3, 2, 9, 30)))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_focus_time, 25)
+        self.assertEqual(self.client.get(reverse('sessions-active')).data, {'state': 'idle'})
+        self.assertEqual(self.client.post(reverse('sessions-stop')).status_code, 409)
+
+    def test_stopping_keeps_the_timer_until_its_session_is_saved(self):
+        self.client.post(reverse('sessions-start'), {'task': self.task.id})
+        self.task.delete()
+        with mock.patch.object(SessionViewSet, 'perform_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.client.post(reverse('sessions-stop'))
+        self.assertEqual(self.client.get(reverse('sessions-active')).data['state'], 'running')
+
+        # The deleted task is dropped rather than failing validation.
+        response = self.client.post(reverse('sessions-stop'))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIsNone(Session.objects.get().task)
+        self.assertEqual(self.client.get(reverse('sessions-active')).data, {'state': 'idle'})
+
+    def test_cannot_start_timer_on_another_users_task(self):
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        task = Task.objects.create(user=other, name='Theirs')
+        response = self.client.post(reverse('sessions-start'), {'task': task.id})
+        self.assertEqual(response.status_code, 400)
+
+
+class RealtimeTests(APITestCase):
+    def collect_events(self):
+        events = []
+        self.addCleanup(get_broker().subscribe(str(self.user.id), events.append))
+        return events
+
+    def test_task_and_session_writes_publish_events(self):
+        events = self.collect_events()
+        with self.captureOnCommitCallbacks(execute=True):
+            task_id = self.client.post(reverse('tasks-list'), {'name': 'Task'}).data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            session_id = self.client.post(reverse('sessions-list'), {'task': task_id, 'duration': 25}).data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('sessions-detail', args=[session_id]))
+        self.assertEqual(
+            [event['type'] for event in events],
+            ['task.created', 'session.created', 'session.deleted'],
+        )
+        self.assertEqual(events[1]['data']['task'], task_id)
+        self.assertEqual(events[2]['data'], {'id': session_id})
+
+    def test_events_are_not_sent_to_other_users(self):
+        events = self.collect_events()
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        client = APIClient()
+        client.force_authenticate(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('tasks-list'), {'name': 'Theirs'})
+        self.assertEqual(events, [])
+
+    @mock.patch('django.db.backends.postgresql.psycopg_any.is_psycopg3', True)
+    def test_postgres_listener_connects_with_the_backends_driver(self):
+        class Stop(BaseException):
+            pass
+
+        listener = mock.MagicMock()
+        payload = json.dumps({'user': '42', 'event': {'type': 'task.created'}})
+        listener.notifies.return_value = iter([mock.Mock(payload=payload)])
+        # Connects once, delivers, then stops the loop on its reconnect.
+        database = mock.Mock(connect=mock.Mock(side_effect=[listener, Stop]))
+        params = {'dbname': 'pomodoro', 'prepare_threshold': None}
+        fake = mock.Mock(Database=database, get_connection_params=mock.Mock(return_value=params))
+        broker = PostgresBroker()
+        events = []
+        InMemoryBroker.subscribe(broker, '42', events.append)
+        with mock.patch('pomodoro.realtime.connection', fake), self.assertRaises(Stop):
+            broker._listen()
+        database.connect.assert_called_with(**params)
+        listener.cursor.return_value.__enter__.return_value.execute.assert_called_once_with('LISTEN pomodoro_events')
+        self.assertEqual(events, [{'type': 'task.created'}])
+
+
+class WebSocketTests(TestCase):
+    def connect(self, path, token=None):
+        from pomodorocore.asgi import application
+
+        incoming = asyncio.Queue()
+        outgoing = asyncio.Queue()
+        scope = {'type': 'websocket', 'path': path, 'query_string': f'token={token}'.encode() if token else b''}
+        incoming.put_nowait({'type': 'websocket.connect'})
+        task = asyncio.ensure_future(application(scope, incoming.get, outgoing.put))
+        return task, incoming, outgoing
+
+    async def test_pushes_events_for_the_token_user(self):
+        token = AccessToken()
+        token['user_id'] = '42'
+        task, incoming, outgoing = self.connect('/ws/events/', token)
+        self.assertEqual(await outgoing.get(), {'type': 'websocket.accept'})
+
+        get_broker().publish('7', {'type': 'task.created', 'data': {'id': 1}})
+        get_broker().publish('42', {'type': 'timer.started', 'data': {'start_time': aware(2026, 3, 2, 9)}})
+        message = await asyncio.wait_for(outgoing.get(), 1)
+        self.assertEqual(json.loads(message['text']), {
+            'type': 'timer.started',
+            'data': {'start_time': '2026-03-02T09:00:00Z'},
+        })
+
+        incoming.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(task, 1)
+        self.assertTrue(outgoing.empty())
+
+    async def test_closes_when_the_token_expires(self):
+        token = AccessToken()
+        token['user_id'] = '42'
+        with mock.patch('pomodoro.websocket.time') as clock:
+            clock.time.return_value = token['exp'] - 0.05
+            task, _, outgoing = self.connect('/ws/events/', token)
+            self.assertEqual(await outgoing.get(), {'type': 'websocket.accept'})
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(await outgoing.get(), {'type': 'websocket.close', 'code': 4401})
+
+    async def test_rejects_missing_or_invalid_token(self):
+        for token in (None, 'garbage'):
+            task, _, outgoing = self.connect('/ws/events/', token)
+            await asyncio.wait_for(task, 1)
+            self.assertEqual(await outgoing.get(), {'type': 'websocket.close', 'code': 4401})
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authorization = f'Bearer {AccessToken.for_user(self.user)}'
+        self.async_client = AsyncClient()
+        tag = Tag.objects.create(user=self.user, name='Tag')
+        self.task = Task.objects.create(user=self.user, name='Task')
+        self.task.tags.add(tag)
+        start = aware(2026, 3, 2, 9)
+        Session.objects.bulk_create(
+            Session(user=self.user, task=self.task, start_time=start + timedelta(hours=i // 2), duration=25)
+            for i in range(5)
+        )
+        rebuild_rollups([self.user.id])
+
+    async def collect(self, url):
+        ids, params = [], {'page_size': 2}
+        while url:
+            response = await self.async_client.get(url, params, headers={'Authorization': self.authorization})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(item['id'] for item in data['results'])
+            url, params = data['next'], {}
+        return ids
+
+    async def test_session_pages_match_the_sync_endpoint(self):
+        expected = [item['id'] async for item in Session.objects.filter(user=self.user).values('id')]
+        self.assertEqual(await self.collect(reverse('async-sessions')), expected)
+
+    async def test_session_pages_keep_sub_millisecond_ties(self):
+        await Session.objects.filter(user=self.user).adelete()
+        start = aware(2026, 3, 2, 9, 0, 0, 123456)
+        await Session.objects.abulk_create(
+            Session(user=self.user, start_time=start, duration=25) for _ in range(4)
+        )
+        # A page boundary falls inside the tie.
+        expected = [item['id'] async for item in Session.objects.filter(user=self.user).values('id')]
+        self.assertEqual(len(expected), 4)
+        self.assertEqual(await self.collect(reverse('async-sessions')), expected)
+
+    async def test_task_list_and_profile(self):
+        response = await self.async_client.get(reverse('async-tasks'), headers={'Authorization': self.authorization})
+        self.assertEqual(response.json()['results'][0]['tags'], [await self.task.tags.values_list('id', flat=True).aget()])
+        response = await self.async_client.get(reverse('async-profile'), headers={'Authorization': self.authorization})
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_stats_match_the_sync_endpoint(self):
+        params = {'period': 'week', 'start': '2026-03-01', 'end': '2026-03-31'}
+        sync_data = json.loads(self.client.get(reverse('stats'), params).content)
+        async_data = self.client.get(reverse('async-stats'), params, HTTP_AUTHORIZATION=self.authorization).json()
+        self.assertEqual(async_data, sync_data)
+
+    def test_only_the_profile_loads_the_user(self):
+        headers = {'HTTP_AUTHORIZATION': self.authorization}
+        with self.assertNumQueries(1):
+            self.client.get(reverse('async-sessions'), **headers)
+        with self.assertNumQueries(2):  # Tasks and their tags.
+            self.client.get(reverse('async-tasks'), **headers)
+        with self.assertNumQueries(2):  # The time zone and the rollups.
+            self.client.get(reverse('async-stats'), **headers)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('async-profile'), **headers)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('async-profile'), **headers).status_code, 401)
+
+    @override_settings(DEBUG=True)
+    def test_middleware_stack_stays_async(self):
+        # Django logs each sync-only middleware it has to adapt for ASGI.
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    async def test_requires_a_valid_token(self):
+        response = await AsyncClient().get(reverse('async-sessions'))
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(reverse('async-tasks'), headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_seed_users_builds_a_consistent_dataset(self):
+        user_ids = seed_users(3, projects=2, tags=3, tasks=4, sessions=10, days=7)
+        users = User.objects.filter(pk__in=user_ids)
+        self.assertEqual(len(user_ids), 3)
+        self.assertEqual(Session.objects.filter(user__in=users).count(), 30)
+        self.assertEqual(Task.objects.filter(user__in=users).count(), 12)
+        for user in users:
+            self.assertEqual(user.total_sessions, 10)
+            rollups = DailyFocus.objects.filter(user=user).values_list('focus_time', flat=True)
+            self.assertEqual(sum(rollups), user.total_focus_time)
+
+    def test_run_load_sends_every_request_once(self):
+        sent = []
+
+        def send(index):
+            sent.append(index)
+            return (500 if index % 5 == 0 else 200), index % 3
+
+        result = run_load(send, 20, concurrency=4)
+        self.assertEqual(sorted(sent), list(range(20)))
+        self.assertEqual((result['requests'], result['errors']), (20, 4))
+        self.assertEqual(result['queries_per_request']['max'], 2)
+
+    def test_command_reports_scenarios_as_json(self):
+        out = io.StringIO()
+        call_command(
+            'benchmark', '--users=2', '--sessions=5', '--requests=4', '--warmup=0',
+            '--scenario=list_sessions', '--scenario=create_session', '--scenario=profile', stdout=out,
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results['client']), {'list_sessions', 'create_session', 'profile'})
+        for name, result in results['client'].items():
+            with self.subTest(name=name):
+                self.assertEqual((result['requests'], result['errors']), (4, 0))
+                self.assertGreater(result['queries_per_request']['max'], 0)
+                self.assertIsNotNone(result['latency_ms']['p99'])
+        # The synthetic users are purged afterwards.
+        self.assertFalse(User.objects.filter(email__endswith='@bench.invalid').exists())
+
+    def test_connection_benchmark_restores_the_connection_settings(self):
+        settings_dict = dict(connection.settings_dict)
+        out = io.StringIO()
+        call_command('bench_connections', '--requests=5', stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(set(results['modes']), {'per_request', 'persistent', 'persistent_health_checks', 'configured'})
+        for name, result in results['modes'].items():
+            with self.subTest(name=name):
+                self.assertEqual((result['requests'], result['errors']), (5, 0))
+        self.assertEqual(connection.settings_dict, settings_dict)
+
+
+@override_settings(PERF_SAMPLE_RATE=1, PERF_METRICS_TOKEN='scrape-token')
+class PerformanceMiddlewareTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        REGISTRY.reset()
+
+    def test_metrics_are_exposed_per_view(self):
+        Project.objects.create(user=self.user, name='Thesis')
+        self.client.get(reverse('projects-list'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('pomodoro_requests_total{view="projects-list",method="GET",status="200"} 1', body)
+        self.assertIn('pomodoro_request_duration_seconds_count{view="projects-list"} 1', body)
+        self.assertIn('pomodoro_request_duration_seconds_bucket{view="projects-list",le="+Inf"} 1', body)
+        self.assertIn('pomodoro_response_size_bytes_count{view="projects-list"} 1', body)
+        queries = re.search(r'pomodoro_db_queries_sum\{view="projects-list"\} (\d+)', body)
+        self.assertGreater(int(queries.group(1)), 0)
+
+    @override_settings(PERF_SERVER_TIMING=True, PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_sql_and_duplicates(self):
+        def view(request):
+            for _ in range(3):
+                User.objects.filter(email='focus@example.com').exists()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/anything')
+        with self.assertLogs('pomodoro.performance', 'WARNING') as logs:
+            response = PerformanceMiddleware(view)(request)
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="3 queries"$')
+        self.assertIn('3 queries', logs.output[0])
+        self.assertIn('2 duplicates', logs.output[0])
+        self.assertIn('pomodoro_user', logs.output[0])
+        self.assertIn('pomodoro_duplicate_queries_total{view="unresolved"} 2', REGISTRY.render())
+
+    @override_settings(PERF_SAMPLE_RATE=0, PERF_SERVER_TIMING=True)
+    def test_unsampled_requests_are_only_timed(self):
+        response = self.client.get(reverse('projects-list'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+$')
+        body = REGISTRY.render()
+        self.assertIn('pomodoro_request_duration_seconds_count{view="projects-list"} 1', body)
+        self.assertNotIn('pomodoro_db_queries', body)
+
+
+@override_settings(REPLICA_DATABASE_URL='sqlite://:memory:')
+class ReplicaRoutingTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A separate in-memory SQLite database rather than a test mirror, so the
+        # tests control what the "replica" has seen. The alias only exists while
+        # this class runs: the connection handler doesn't follow DATABASES
+        # overrides, so it gets the alias too, and the runner checks every
+        # class's databases before any class is set up, so they're set here.
+        replica = {
+            **connections.settings['default'],
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:', 'OPTIONS': {},
+            'TEST': {**connections.settings['default']['TEST'], 'NAME': None, 'MIRROR': None},
+        }
+        cls.enterClassContext(override_settings(DATABASES={**connections.settings, REPLICA: replica}))
+        cls.enterClassContext(mock.patch.dict(connections.settings, {REPLICA: replica}))
+        cls.addClassCleanup(connections.__delitem__, REPLICA)
+        connections[REPLICA].creation.create_test_db(verbosity=0, serialize=False)
+        cls.addClassCleanup(connections[REPLICA].creation.destroy_test_db, ':memory:', verbosity=0)
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    def replicate(self):
+        """Copy the primary's rows over, as replication would."""
+        for model in (User, Project):
+            model.objects.using(REPLICA).all().delete()
+            model.objects.using(REPLICA).bulk_create(model.objects.using('default').all())
+
+    def project_names(self):
+        response = self.client.get(reverse('projects-list'))
+        return [project['name'] for project in response.data['results']]
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        Project.objects.create(user=self.user, name='Thesis')
+        self.replicate()
+        Project.objects.update(name='Renamed without a cache bump')
+        self.assertEqual(self.project_names(), ['Thesis'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('projects-list'), {'name': 'Reading'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Project.objects.using('default').filter(name='Reading').exists())
+        self.assertFalse(Project.objects.using(REPLICA).filter(name='Reading').exists())
+
+    def test_users_read_their_own_writes_until_the_pin_expires(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('projects-list'), {'name': 'Reading'})
+        self.replicate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('projects-list'), {'name': 'Writing'})
+        self.assertEqual(self.project_names(), ['Reading', 'Writing'])
+
+        # Once the pin expires (and the cached response with it) the replica's
+        # view is back, however far behind it is; other users' writes don't
+        # pin this user.
+        cache.clear()
+        other = User.objects.create_user(email='other@example.com', password='pass1234', is_active=True)
+        self.client.force_authenticate(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('projects-list'), {'name': 'Theirs'})
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.project_names(), ['Reading'])
+
+    def test_timer_actions_skip_replica_routing(self):
+        with mock.patch('pomodoro.replicas.use_replica') as use_replica, \
+                mock.patch('pomodoro.replicas.pin_to_primary') as pin_to_primary:
+            with self.assertNumQueries(0, using='default'), self.assertNumQueries(0, using=REPLICA):
+                self.client.get(reverse('sessions-active'))
+                self.client.post(reverse('sessions-start'))
+                self.client.post(reverse('sessions-pause'))
+        use_replica.assert_not_called()
+        pin_to_primary.assert_not_called()
+
+    def test_an_unreachable_replica_falls_back_to_the_primary(self):
+        Project.objects.create(user=self.user, name='Thesis')
+        unreachable = mock.patch.object(connections[REPLICA], 'ensure_connection', side_effect=OperationalError)
+        with mock.patch('pomodoro.replicas._down_until', 0), unreachable as ensure_connection:
+            with self.assertLogs('pomodoro.replicas', 'WARNING'):
+                self.assertEqual(self.project_names(), ['Thesis'])
+            self.client.get(reverse('stats'), {'period': 'day'})
+        self.assertEqual(ensure_connection.call_count, 1)
+
+
+class JobQueueTests(TestCase):
+    def test_otp_mail_is_sent_by_the_worker_not_the_request(self):
+        response = APIClient().post(reverse('register'), {'email': 'new@example.com', 'password': 'pass1234'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.get().name, 'pomodoro.emails.send_otp_email')
+
+        # Only made when the mail is sent, so never stored with the job.
+        self.assertEqual(Job.objects.get().payload, {'email': 'new@example.com', 'purpose': 'verify'})
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertRegex(mail.outbox[0].body, r'\b\d{4}\b')
+        self.assertFalse(Job.objects.exists())
+
+    def test_otp_mail_states_the_configured_lifetime(self):
+        for ttl, lifetime in ((300, '5 minutes'), (60, '1 minute'), (90, '90 seconds')):
+            with self.subTest(ttl=ttl), self.settings(OTP_TTL=ttl):
+                send_otp_email(email='new@example.com', purpose='verify')
+                self.assertIn(f'It expires in {lifetime}.', mail.outbox[-1].body)
+
+    def test_failed_jobs_are_retried_with_backoff_then_given_up(self):
+        with self.settings(JOB_RETRY_DELAY=10):
+            job = Job.objects.create(
+                name='pomodoro.emails.send_otp_email', max_attempts=2,
+                payload={'email': 'a@example.com', 'purpose': 'reset'},
+            )
+            with mock.patch('pomodoro.emails.send_mail', side_effect=OSError('SMTP down')):
+                self.assertEqual(run_pending(), (0, 1))
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+                self.assertIn('SMTP down', job.last_error)
+                self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+                self.assertEqual(run_pending(), (0, 0))
+
+                Job.objects.update(run_at=timezone.now())
+                with self.assertLogs('pomodoro.jobs', 'ERROR'):
+                    self.assertEqual(run_pending(), (0, 1))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_jobs_are_not_imported(self):
+        Job.objects.create(name='os.system', payload={'command': 'true'}, max_attempts=1)
+        with self.assertLogs('pomodoro.jobs', 'ERROR'):
+            self.assertEqual(run_pending(), (0, 1))
+        self.assertIn('is not a job', Job.objects.get().last_error)
+
+
+class OTPTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='focus@example.com', password='pass1234')
+
+    def request_code(self, url='forgot-password'):
+        response = self.client.post(reverse(url), {'email': 'focus@example.com'})
+        self.assertEqual(response.status_code, 200, response.data)
+        run_pending()
+        return re.search(r'\b(\d{4})\b', mail.outbox[-1].body).group(1)
+
+    def test_reset_and_verify_do_not_read_the_user_row(self):
+        code = self.request_code()
+        self.assertEqual(len(cache.get('pomodoro:otp:code:reset:focus@example.com')), 64)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('reset-password'), {
+                'email': 'focus@example.com', 'otp': code, 'new_password': 'new-pass-5678',
+            })
+        self.assertEqual(response.status_code, 200, response.data)
+        # Only the password update; the rest is the attempt counter.
+        user_queries = [query['sql'] for query in queries if User._meta.db_table in query['sql']]
+        self.assertEqual(len(user_queries), 1, user_queries)
+        self.assertTrue(user_queries[0].startswith('UPDATE'))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass-5678'))
+
+        # Codes are single-use.
+        response = self.client.post(reverse('reset-password'), {
+            'email': 'focus@example.com', 'otp': code, 'new_password': 'other-pass',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_wrong_guesses_burn_the_code(self):
+        code = self.request_code()
+        wrong = f'{(int(code) + 1) % 10000:04d}'
+        for _ in range(5):
+            response = self.client.post(reverse('reset-password'), {
+                'email': 'focus@example.com', 'otp': wrong, 'new_password': 'new-pass-5678',
+            })
+            self.assertEqual(response.data['non_field_errors'], ['Invalid OTP.'])
+        response = self.client.post(reverse('reset-password'), {
+            'email': 'focus@example.com', 'otp': code, 'new_password': 'new-pass-5678',
+        })
+        self.assertEqual(response.data['non_field_errors'], ['Too many attempts. Please request a new OTP.'])
+        self.assertTrue(User.objects.get().check_password('pass1234'))
+
+    def test_verify_activates_account(self):
+        code = issue_otp('focus@example.com', 'verify')
+        response = self.client.post(reverse('verify-otp'), {'email': 'focus@example.com', 'otp': code})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(User.objects.get().is_active)
+
+    def test_code_requests_are_throttled(self):
+        self.request_code()
+        response = self.client.post(reverse('forgot-password'), {'email': 'focus@example.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Job.objects.count(), 0)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'pomodoro_test_cache'},
+})
+class DatabaseCacheOTPTests(TestCase):
+    # The database cache's incr() is a get and a set that resets the TTL.
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+
+    def test_hourly_limit_outlasts_the_cache_timeout(self):
+        start = timezone.now()
+        with mock.patch('pomodoro.otp.timezone.now') as now:
+            for i in range(5):
+                now.return_value = start + timedelta(seconds=61 * i)
+                issue_otp('focus@example.com', 'reset')
+            now.return_value = start + timedelta(minutes=10)
+            with self.assertRaises(OTPThrottled) as raised:
+                issue_otp('focus@example.com', 'reset')
+            self.assertEqual(raised.exception.wait, 3600)
+            now.return_value = start + timedelta(hours=1, seconds=1)
+            issue_otp('focus@example.com', 'reset')
+
+    def test_attempt_limit(self):
+        code = issue_otp('focus@example.com', 'reset')
+        wrong = f'{(int(code) + 1) % 10000:04d}'
+        for _ in range(5):
+            with self.assertRaisesMessage(OTPError, "Invalid OTP."):
+                verify_otp('focus@example.com', 'reset', wrong)
+        with self.assertRaisesMessage(OTPError, "Too many attempts."):
+            verify_otp('focus@example.com', 'reset', code)
+        self.assertEqual(OTPCounter.objects.get(key='pomodoro:otp:attempts:reset:focus@example.com').count, 6)
 
-# Create your tests here.
@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+
+# A forgotten timer is dropped after a day rather than lingering forever.
+TIMER_TIMEOUT = 60 * 60 * 24
+
+
+class TimerError(Exception):
+    pass
+
+
+def _key(user_id):
+    return f'pomodoro:timer:{user_id}'
+
+
+def _focus_seconds(state, now):
+    paused = state['paused_seconds']
+    if state['paused_at'] is not None:
+        paused += (now - state['paused_at']).total_seconds()
+    return max((now - state['start_time']).total_seconds() - paused, 0)
+
+
+def describe(state, now=None):
+    if state is None:
+        return {'state': 'idle'}
+    now = now or timezone.now()
+    return {**state, 'elapsed_seconds': int(_focus_seconds(state, now))}
+
+
+def get_timer(user_id):
+    return cache.get(_key(user_id))
+
+
+def start_timer(user_id, task=None, client_id=None):
+    state = {
+        'state': 'running',
+        'task': task,
+        'client_id': client_id,
+        'start_time': timezone.now(),
+        'paused_at': None,
+        'paused_seconds': 0,
+    }
+    # add() only succeeds if no timer exists, so two devices can't both start one.
+    if not cache.add(_key(user_id), state, TIMER_TIMEOUT):
+        raise TimerError("A timer is already running.")
+    return state
+
+
+def _transition(user_id, expected, change):
+    state = get_timer(user_id)
+    if state is None:
+        raise TimerError("No timer is running.")
+    if state['state'] != expected:
+        raise TimerError(f"The timer is already {state['state']}.")
+    change(state, timezone.now())
+    cache.set(_key(user_id), state, TIMER_TIMEOUT)
+    return state
+
+
+def pause_timer(user_id):
+    def pause(state, now):
+        state['state'] = 'paused'
+        state['paused_at'] = now
+    return _transition(user_id, 'running', pause)
+
+
+def resume_timer(user_id):
+    def resume(state, now):
+        state['paused_seconds'] += (now - state['paused_at']).total_seconds()
+        state['state'] = 'running'
+        state['paused_at'] = None
+    return _transition(user_id, 'paused', resume)
+
+
+def _stopping_key(user_id):
+    return f'pomodoro:timer-stopping:{user_id}'
+
+
+def stop_timer(user_id):
+    """Claim the running timer for saving and return the session it describes.
+
+    The timer stays in the cache until clear_timer() is called once the
+    session is saved; release_timer() gives it back if saving fails.
+    ``duration`` counts whole minutes of focus, excluding paused time.
+    """
+    state = get_timer(user_id)
+    if state is None:
+        raise TimerError("No timer is running.")
+    # Only one stop request at a time may save the session.
+    if not cache.add(_stopping_key(user_id), True, 60):
+        raise TimerError("The timer is already being stopped.")
+    end_time = timezone.now()
+    return {
+        'task': state['task'],
+        'client_id': state['client_id'],
+        'start_time': state['start_time'],
+        'end_time': end_time,
+        'duration': int(_focus_seconds(state, end_time) // 60),
+    }
+
+
+def release_timer(user_id):
+    cache.delete(_stopping_key(user_id))
+
+
+def clear_timer(user_id):
+    cache.delete_many([_key(user_id), _stopping_key(user_id)])
@@ -1,16 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     ProjectViewSet,
     TagViewSet,
     TaskViewSet,
     SessionViewSet,
+    GoalViewSet,
     RegisterView,
     UserProfileView,
     VerifyOTPView,
     CompleteProfileView,
     ForgotPasswordRequestView,
-    ForgotPasswordVerifyView
+    ForgotPasswordVerifyView,
+    StatsView,
+    SyncView,
+    LeaderboardView,
+    LeaderboardRankView,
+    StreakView
 )
 
 router = DefaultRouter()
@@ -18,6 +25,7 @@ router.register('projects', ProjectViewSet, basename='projects')
 router.register('tags', TagViewSet, basename='tags')
 router.register('tasks', TaskViewSet, basename='tasks')
 router.register('sessions', SessionViewSet, basename='sessions')
+router.register('goals', GoalViewSet, basename='goals')
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -26,5 +34,14 @@ urlpatterns = [
     path('complete-profile/', CompleteProfileView.as_view(), name='complete-profile'),
     path('forgot-password/', ForgotPasswordRequestView.as_view(), name='forgot-password'),
     path('reset-password/', ForgotPasswordVerifyView.as_view(), name='reset-password'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('streak/', StreakView.as_view(), name='streak'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/me/', LeaderboardRankView.as_view(), name='leaderboard-me'),
+    path('async/sessions/', async_views.session_list, name='async-sessions'),
+    path('async/tasks/', async_views.task_list, name='async-tasks'),
+    path('async/me/', async_views.profile, name='async-profile'),
+    path('async/stats/', async_views.stats, name='async-stats'),
     path('', include(router.urls)),
 ]
@@ -1,19 +1,50 @@
 from rest_framework import viewsets, permissions
-from .models import Project, Tag, Task, Session
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from .models import DailyFocus, Goal, Project, Tag, Task, Session
 from .serializers import (
     ProjectSerializer,
     TagSerializer,
     TaskSerializer,
     SessionSerializer,
+    TaskExpandedSerializer,
+    SessionExpandedSerializer,
     UserSerializer,
-    RegisterSerializer
+    RegisterSerializer,
+    StatsQuerySerializer,
+    SessionExportQuerySerializer,
+    TimerStartSerializer,
+    GoalSerializer,
+    StreakSerializer,
+    LeaderboardEntrySerializer,
+    LeaderboardQuerySerializer,
+    LeaderboardRankQuerySerializer
 )
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, router, transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .serializers import RegisterSerializer, VerifyOTPSerializer, CompleteProfileSerializer, ForgotPasswordRequestSerializer, ForgotPasswordVerifySerializer
+from .authentication import forget_user
+from .caching import CachedResponseMixin
+from .export import FORMATS, session_export_queryset, stream_export
+from .goals import EMPTY_DAY, day_state, rebuild_goal_streak, user_streak
+from .importer import ImportFailed, import_sessions
+from .leaderboard import around, board_starts, set_country, top
+from .pagination import SessionCursorPagination
+from .stats import apply_focus_changes, focus_entry, focus_series, move_task_focus, rebuild_user_stats, summarize
+from .sync import InvalidToken, changes_since, delete_tracked, read_token
+from .realtime import publish
+from .replicas import ReplicaReadMixin
+from .timer import (
+    TimerError, clear_timer, describe, get_timer, pause_timer, release_timer, resume_timer, start_timer, stop_timer,
+)
 
 User = get_user_model()
 
@@ -24,9 +55,12 @@ class CompleteProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def put(self, request):
-        serializer = CompleteProfileSerializer(instance=request.user, data=request.data, partial=True)
+        user = get_object_or_404(User, pk=request.user.id, is_active=True)
+        serializer = CompleteProfileSerializer(instance=user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            forget_user(user.pk)
+            set_country(user.pk, user.country)
             return Response({'message': 'Profile completed successfully.'})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -72,53 +106,542 @@ class UserProfileView(RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
-
-
-class ProjectViewSet(viewsets.ModelViewSet):
+        # Read the profile from the database rather than the authentication cache.
+        return get_object_or_404(User, pk=self.request.user.id, is_active=True)
+
+    def perform_update(self, serializer):
+        previous_timezone = serializer.instance.timezone
+        super().perform_update(serializer)
+        forget_user(serializer.instance.pk)
+        set_country(serializer.instance.pk, serializer.instance.country)
+        if serializer.instance.timezone != previous_timezone:
+            rebuild_user_stats.delay(user_id=serializer.instance.pk)
+
+
+class ExpandMixin:
+    """Serve ``expanded_serializer_class`` for reads with ``?expand=true``."""
+    expanded_serializer_class = None
+
+    def is_expanded(self):
+        return self.request.method == 'GET' and self.request.query_params.get('expand', '').lower() in ('1', 'true')
+
+    def get_serializer_class(self):
+        if self.is_expanded():
+            return self.expanded_serializer_class
+        return super().get_serializer_class()
+
+
+class EventMixin:
+    """Publishes ``<event_prefix>.<action>`` events to the owner's realtime stream."""
+    event_prefix = None
+
+    def publish_event(self, action, data):
+        if self.event_prefix:
+            publish(self.request.user.id, f'{self.event_prefix}.{action}', data)
+
+
+class BulkMixin(EventMixin):
+    """Adds ``<prefix>/bulk/`` to create (POST), update (PATCH) or delete (DELETE) a list of rows.
+
+    Batches are all-or-nothing: if any item is invalid nothing is written
+    and ``errors`` maps the index of each invalid item to its errors.
+    """
+
+    def get_bulk_queryset(self):
+        return self.get_queryset()
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.API_MAX_BULK_SIZE:
+            return Response(
+                {'detail': f'At most {settings.API_MAX_BULK_SIZE} items per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        if request.method == 'PATCH':
+            return self._bulk_update(items)
+        return self._bulk_destroy(items)
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                # Older DRF releases report list errors positionally.
+                errors = {index: error for index, error in enumerate(errors) if error}
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                instances = self.perform_bulk_create(serializer.validated_data)
+        except IntegrityError:
+            return Response(
+                {'detail': 'The batch conflicts with a concurrent write, retry the request.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        data = self._bulk_representation(instances)
+        for item in data:
+            self.publish_event('created', item)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items):
+        ids = [_item_id(item.get('id')) if isinstance(item, dict) else None for item in items]
+        instances = self.get_bulk_queryset().in_bulk([pk for pk in ids if pk is not None])
+        errors, changes = {}, []
+        for index, (item, pk) in enumerate(zip(items, ids)):
+            if pk not in instances:
+                errors[index] = {'id': ['Not found.']}
+                continue
+            serializer = self.get_serializer(instances[pk], data=item, partial=True)
+            if serializer.is_valid():
+                changes.append((instances[pk], serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            updated = self.perform_bulk_update(changes)
+        data = self._bulk_representation(updated)
+        for item in data:
+            self.publish_event('updated', item)
+        return Response(data)
+
+    def _bulk_destroy(self, items):
+        ids = [_item_id(item) for item in items]
+        if None in ids:
+            errors = {index: {'id': ['A valid integer is required.']} for index, pk in enumerate(ids) if pk is None}
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            instances = list(self.get_bulk_queryset().filter(pk__in=ids).select_for_update(of=('self',)))
+            self.perform_bulk_destroy(instances)
+        deleted = {instance.pk for instance in instances}
+        for pk in sorted(deleted):
+            self.publish_event('deleted', {'id': pk})
+        # Already-deleted ids are reported rather than failing, so replays are harmless.
+        return Response({
+            'deleted': sorted(deleted),
+            'missing': sorted(set(ids) - deleted),
+        })
+
+    def _bulk_representation(self, instances):
+        refreshed = self.get_queryset().in_bulk([instance.pk for instance in instances])
+        return self.get_serializer([refreshed[instance.pk] for instance in instances], many=True).data
+
+    def _m2m_fields(self, model):
+        return {field.name: field for field in model._meta.many_to_many}
+
+    def _bulk_set_m2m(self, model, changes):
+        for name, field in self._m2m_fields(model).items():
+            through = field.remote_field.through
+            source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+            touched = [(instance, attrs[name]) for instance, attrs in changes if name in attrs]
+            if not touched:
+                continue
+            through.objects.filter(**{f'{source}__in': [instance.pk for instance, _ in touched]}).delete()
+            through.objects.bulk_create(
+                through(**{source: instance.pk, target: related.pk})
+                for instance, related_objects in touched for related in related_objects
+            )
+
+    def perform_bulk_create(self, validated_data):
+        model = self.get_queryset().model
+        m2m = self._m2m_fields(model)
+        instances = [model(**{k: v for k, v in attrs.items() if k not in m2m}) for attrs in validated_data]
+        model.objects.bulk_create(instances)
+        self._bulk_set_m2m(model, list(zip(instances, validated_data)))
+        return instances
+
+    def perform_bulk_update(self, changes):
+        model = self.get_queryset().model
+        m2m = self._m2m_fields(model)
+        fields = set()
+        for instance, attrs in changes:
+            for name, value in attrs.items():
+                if name not in m2m:
+                    setattr(instance, name, value)
+                    fields.add(name)
+        instances = [instance for instance, _ in changes]
+        # bulk_update() bypasses save(), so auto_now fields are stamped here.
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for instance in instances:
+                    setattr(instance, field.attname, now)
+                fields.add(field.name)
+        model.objects.bulk_update(instances, sorted(fields))
+        self._bulk_set_m2m(model, changes)
+        return instances
+
+    def perform_bulk_destroy(self, instances):
+        delete_tracked(self.get_queryset().model.objects.filter(pk__in=[instance.pk for instance in instances]))
+
+
+def _item_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProjectViewSet(ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Project.objects.filter(user=self.request.user)
+        return Project.objects.filter(user_id=self.request.user.id)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_tracked(Project.objects.filter(pk=instance.pk))
 
-class TagViewSet(viewsets.ModelViewSet):
+
+class TagViewSet(ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Tag.objects.filter(user=self.request.user)
+        return Tag.objects.filter(user_id=self.request.user.id)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_tracked(Tag.objects.filter(pk=instance.pk))
+
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ReplicaReadMixin, CachedResponseMixin, ExpandMixin, BulkMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    expanded_serializer_class = TaskExpandedSerializer
     permission_classes = [permissions.IsAuthenticated]
+    event_prefix = 'task'
 
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user)
+        queryset = Task.objects.filter(user_id=self.request.user.id).prefetch_related('tags')
+        if self.is_expanded():
+            queryset = queryset.select_related('project')
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self.publish_event('created', serializer.data)
 
+    def perform_update(self, serializer):
+        old_project_id = serializer.instance.project_id
+        with transaction.atomic():
+            task = serializer.save()
+            move_task_focus({task.pk: (task.user_id, old_project_id, task.project_id)})
+        self.publish_event('updated', serializer.data)
 
-class SessionViewSet(viewsets.ModelViewSet):
+    def perform_bulk_update(self, changes):
+        old_project_ids = {task.pk: task.project_id for task, _ in changes}
+        tasks = super().perform_bulk_update(changes)
+        move_task_focus({task.pk: (task.user_id, old_project_ids[task.pk], task.project_id) for task in tasks})
+        return tasks
+
+    def perform_destroy(self, instance):
+        delete_tracked(Task.objects.filter(pk=instance.pk))
+        self.publish_event('deleted', {'id': instance.pk})
+
+
+class SessionViewSet(ReplicaReadMixin, ExpandMixin, BulkMixin, viewsets.ModelViewSet):
     serializer_class = SessionSerializer
+    expanded_serializer_class = SessionExpandedSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SessionCursorPagination
+    event_prefix = 'session'
+    # The timer lives in the cache; stop saves a session, so it still pins.
+    replica_exempt_actions = ('active', 'start', 'pause', 'resume')
+
+    def focus_entry(self, session):
+        return focus_entry(session, self.request.user.zone)
+
+    def get_queryset(self):
+        queryset = Session.objects.filter(user_id=self.request.user.id)
+        if self.is_expanded():
+            queryset = queryset.select_related('task__project').prefetch_related('task__tags')
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            headers=headers,
+        )
+
+    def _replayed_session(self, client_id):
+        if client_id is None:
+            return None
+        return (
+            self.get_bulk_queryset().select_for_update(of=('self',))
+            .filter(client_id=client_id).first()
+        )
+
+    def perform_create(self, serializer):
+        """Insert the session, or upsert it if its client_id was already uploaded.
+
+        Returns whether a new row was inserted.
+        """
+        client_id = serializer.validated_data.get('client_id')
+        with transaction.atomic():
+            existing = self._replayed_session(client_id)
+            if existing is None:
+                try:
+                    with transaction.atomic():
+                        session = serializer.save(user=self.request.user)
+                except IntegrityError:
+                    # A concurrent upload of the same client_id committed first.
+                    existing = self._replayed_session(client_id)
+                    if existing is None:
+                        raise
+                else:
+                    apply_focus_changes(added=[self.focus_entry(session)])
+                    self.request.user.add_focus(session.duration)
+                    self.publish_event('created', serializer.data)
+                    return True
+            serializer.instance = existing
+            self.perform_update(serializer)
+            return False
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            previous = self.focus_entry(serializer.instance)
+            session = serializer.save()
+            apply_focus_changes(added=[self.focus_entry(session)], removed=[previous])
+            self.request.user.add_focus(session.duration - previous.duration, sessions=0)
+            self.publish_event('updated', serializer.data)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            apply_focus_changes(removed=[self.focus_entry(instance)])
+            delete_tracked(Session.objects.filter(pk=instance.pk))
+            self.request.user.add_focus(-instance.duration, sessions=-1)
+            self.publish_event('deleted', {'id': instance.pk})
+
+    # Not "format": DRF reserves that name for renderer selection.
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|ndjson)')
+    def export(self, request, export_format):
+        query = SessionExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        # The rows are read while streaming, after the view has returned, so
+        # the database is picked now.
+        queryset = session_export_queryset(
+            user_ids=[request.user.id], using=router.db_for_read(Session), **query.validated_data,
+        )
+        response = StreamingHttpResponse(stream_export(queryset, export_format), content_type=FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="sessions.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            summary = import_sessions(request.user, upload)
+        except ImportFailed as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    # The running timer lives in the cache and is keyed by user id, so
+    # these actions only use the id from the token and never load the user.
+    @action(detail=False, methods=['get'])
+    def active(self, request):
+        return Response(describe(get_timer(request.user.id)))
+
+    @action(detail=False, methods=['post'])
+    def start(self, request):
+        serializer = TimerStartSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return self._timer_response('started', start_timer, request.user.id, **serializer.validated_data)
+
+    @action(detail=False, methods=['post'])
+    def pause(self, request):
+        return self._timer_response('paused', pause_timer, request.user.id)
+
+    @action(detail=False, methods=['post'])
+    def resume(self, request):
+        return self._timer_response('resumed', resume_timer, request.user.id)
+
+    @action(detail=False, methods=['post'])
+    def stop(self, request):
+        try:
+            completed = stop_timer(request.user.id)
+        except TimerError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        # The timer is only cleared once its session is saved, so a failed
+        # stop can be retried.
+        try:
+            if completed['task'] and not Task.objects.filter(pk=completed['task'], user_id=request.user.id).exists():
+                completed['task'] = None  # Deleted while the timer ran; keep the focus time.
+            serializer = self.get_serializer(data=completed)
+            serializer.is_valid(raise_exception=True)
+            created = self.perform_create(serializer)
+        except Exception:
+            release_timer(request.user.id)
+            raise
+        clear_timer(request.user.id)
+        publish(request.user.id, 'timer.stopped', completed)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def _timer_response(self, event, transition, *args, **kwargs):
+        try:
+            state = transition(*args, **kwargs)
+        except TimerError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        data = describe(state)
+        publish(self.request.user.id, f'timer.{event}', data)
+        return Response(data)
+
+    def get_bulk_queryset(self):
+        return self.get_queryset().select_related('task')
+
+    def perform_bulk_create(self, validated_data):
+        # Replayed client_ids are returned as already stored rather than inserted again.
+        client_ids = {attrs['client_id'] for attrs in validated_data if attrs.get('client_id')}
+        stored = {session.client_id: session for session in self.get_queryset().filter(client_id__in=client_ids)}
+        fresh, pending = [], {}
+        for attrs in validated_data:
+            client_id = attrs.get('client_id')
+            if client_id is None:
+                fresh.append(attrs)
+            elif client_id not in stored and client_id not in pending:
+                pending[client_id] = attrs
+                fresh.append(attrs)
+
+        sessions = super().perform_bulk_create(fresh)
+        apply_focus_changes(added=[self.focus_entry(session) for session in sessions])
+        self.request.user.add_focus(sum(session.duration for session in sessions), sessions=len(sessions))
+
+        stored.update((session.client_id, session) for session in sessions if session.client_id)
+        anonymous = iter([session for session in sessions if session.client_id is None])
+        return [
+            stored[attrs['client_id']] if attrs.get('client_id') else next(anonymous)
+            for attrs in validated_data
+        ]
+
+    def perform_bulk_update(self, changes):
+        previous = [self.focus_entry(session) for session, _ in changes]
+        sessions = super().perform_bulk_update(changes)
+        current = [self.focus_entry(session) for session in sessions]
+        apply_focus_changes(added=current, removed=previous)
+        minutes = sum(entry.duration for entry in current) - sum(entry.duration for entry in previous)
+        self.request.user.add_focus(minutes, sessions=0)
+        return sessions
+
+    def perform_bulk_destroy(self, instances):
+        removed = [self.focus_entry(session) for session in instances]
+        super().perform_bulk_destroy(instances)
+        self.request.user.add_focus(-sum(entry.duration for entry in removed), sessions=-len(removed))
+        apply_focus_changes(removed=removed)
+
+
+class GoalViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    serializer_class = GoalSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Session.objects.filter(user=self.request.user)
+        return Goal.objects.filter(user_id=self.request.user.id).select_related('streak')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'swagger_fake_view', False):
+            return context
+        today = timezone.localdate(timezone=self.request.user.zone)
+        rollup = DailyFocus.objects.filter(user_id=self.request.user.id, date=today).first()
+        context.update(today=today, today_focus=day_state(rollup) if rollup else EMPTY_DAY)
+        return context
 
     def perform_create(self, serializer):
-        session = serializer.save(user=self.request.user)
-        user = self.request.user
-        user.total_focus_time += session.duration
-        user.total_sessions += 1
-        user.average_focus_time = user.total_focus_time / user.total_sessions
-        user.save()
\ No newline at end of file
+        with transaction.atomic():
+            serializer.save()
+            rebuild_goal_streak(serializer.instance)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            rebuild_goal_streak(serializer.instance)
+
+
+# Stays on the primary: the first read stores the user's streak.
+class StreakView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        today = timezone.localdate(timezone=request.user.zone)
+        return Response(StreakSerializer(user_streak(request.user.id), context={'today': today}).data)
+
+
+class StatsView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = StatsQuerySerializer(data=request.query_params, context={'zone': request.user.zone})
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = focus_series(request.user.id, params['period'], params['start'], params['end'])
+        return Response(summarize(params['period'], params['start'], params['end'], series))
+
+
+# Stays on the primary: a token issued from a lagging replica would skip changes.
+class SyncView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        since = None
+        token = request.query_params.get('since')
+        if token:
+            try:
+                since = read_token(token)
+            except InvalidToken as exc:
+                return Response({'since': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(changes_since(request.user.id, since, {'request': request}))
+
+
+class LeaderboardView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = LeaderboardQuerySerializer(data=request.query_params, context={'zone': request.user.zone})
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        entries = top(params['period'], params['date'], params.get('country'), params['limit'], metric=params['metric'])
+        return Response({
+            'metric': params['metric'],
+            'period': params['period'],
+            'period_start': board_starts(params['date'], params['metric'])[params['period']],
+            'country': params.get('country'),
+            'results': LeaderboardEntrySerializer(entries, many=True).data,
+        })
+
+
+class LeaderboardRankView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = LeaderboardRankQuerySerializer(data=request.query_params, context={'zone': request.user.zone})
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        entry, neighbours = around(
+            request.user.id, params['period'], params['date'],
+            by_country=params['scope'] == 'country', neighbours=params['neighbours'], metric=params['metric'],
+        )
+        return Response({
+            'metric': params['metric'],
+            'period': params['period'],
+            'period_start': board_starts(params['date'], params['metric'])[params['period']],
+            'scope': params['scope'],
+            'entry': LeaderboardEntrySerializer(entry).data if entry else None,
+            'neighbours': LeaderboardEntrySerializer(neighbours, many=True).data,
+        })
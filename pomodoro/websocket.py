@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .realtime import get_broker
+
+
+EVENTS_PATH = '/ws/events/'
+
+# Close codes in the 4000-4999 range are reserved for applications.
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+
+
+def _claims_from_scope(scope):
+    """Read the access token from ``?token=`` and return its user id and expiry, or None."""
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = (query.get('token') or [None])[0]
+    if not token:
+        return None
+    try:
+        token = AccessToken(token)
+        return token[jwt_settings.USER_ID_CLAIM], token['exp']
+    except (TokenError, KeyError):
+        return None
+
+
+async def events_application(scope, receive, send):
+    """Push the authenticated user's events over a WebSocket.
+
+    Clients connect to ``/ws/events/?token=<access token>``; the token is
+    verified without a database lookup, and the socket is closed with
+    CLOSE_UNAUTHORIZED when it expires so clients reconnect with a fresh
+    one. Messages from the client are ignored.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if scope['path'] != EVENTS_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    claims = _claims_from_scope(scope)
+    if claims is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+    user_id, expires = claims
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + expires - time.time()
+    queue = asyncio.Queue()
+    unsubscribe = get_broker().subscribe(str(user_id), lambda event: loop.call_soon_threadsafe(queue.put_nowait, event))
+    await send({'type': 'websocket.accept'})
+    receiving = asyncio.ensure_future(receive())
+    delivering = asyncio.ensure_future(queue.get())
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+                break
+            done, _ = await asyncio.wait(
+                {receiving, delivering}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if delivering in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(delivering.result(), cls=DjangoJSONEncoder)})
+                delivering = asyncio.ensure_future(queue.get())
+            if receiving in done:
+                if receiving.result()['type'] == 'websocket.disconnect':
+                    break
+                receiving = asyncio.ensure_future(receive())
+    finally:
+        unsubscribe()
+        receiving.cancel()
+        delivering.cancel()
@@ -1,5 +1,6 @@
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
 import dj_database_url
 
@@ -30,7 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'pomodoro.middleware.AsyncWhiteNoiseMiddleware',
+    'pomodoro.performance.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,14 +44,47 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'pomodoro.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'pomodoro.pagination.IdCursorPagination',
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=50, cast=int),
 }
+# Minutes of focus that make up one completed pomodoro.
+POMODORO_LENGTH = config('POMODORO_LENGTH', default=25, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=500, cast=int)
+API_MAX_BULK_SIZE = config('API_MAX_BULK_SIZE', default=500, cast=int)
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+# How long each process trusts a loaded user before re-reading the row.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=30, cast=int)
+# Rows fetched per database round trip (and per streamed chunk) by exports.
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+# Rows validated and inserted together by imports; an import stops after
+# IMPORT_MAX_ERRORS invalid rows.
+IMPORT_CHUNK_SIZE = config('IMPORT_CHUNK_SIZE', default=1000, cast=int)
+IMPORT_MAX_ERRORS = config('IMPORT_MAX_ERRORS', default=100, cast=int)
+# Rows deleted per statement (and transaction) when purging accounts.
+PURGE_CHUNK_SIZE = config('PURGE_CHUNK_SIZE', default=5000, cast=int)
+# Admin changelists over larger tables show PostgreSQL's row estimate
+# instead of an exact count.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+# Sync tokens older than this get a full snapshot instead of a delta.
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+# Request metrics, served at /metrics in the Prometheus text format. Every
+# request is timed; PERF_SAMPLE_RATE of them also get their queries timed.
+PERF_METRICS_ENABLED = config('PERF_METRICS_ENABLED', default=True, cast=bool)
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=0.1, cast=float)
+# Bearer token for scraping /metrics; staff users can always read it.
+PERF_METRICS_TOKEN = config('PERF_METRICS_TOKEN', default='')
+PERF_SERVER_TIMING = config('PERF_SERVER_TIMING', default=False, cast=bool)
+# Requests slower than this are logged to 'pomodoro.performance', with up
+# to PERF_SLOW_LOG_MAX_QUERIES of their statements when sampled.
+PERF_SLOW_REQUEST_MS = config('PERF_SLOW_REQUEST_MS', default=500, cast=int)
+PERF_SLOW_LOG_MAX_QUERIES = config('PERF_SLOW_LOG_MAX_QUERIES', default=50, cast=int)
 ROOT_URLCONF = 'pomodorocore.urls'
 
 TEMPLATES = [
@@ -73,9 +108,88 @@ WSGI_APPLICATION = 'pomodorocore.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds (0 closes
+# them after every request) and checked before reuse in a new request.
+# Every gunicorn thread holds its own connection.
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
 DATABASES = {
-    'default': dj_database_url.config(default=config('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=config('DATABASE_URL'),
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
 }
+# An optional read replica for the API's read endpoints; see pomodoro.replicas.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+        test_options={'MIRROR': 'default'},
+    )
+DATABASE_ROUTERS = ['pomodoro.replicas.ReplicaRouter']
+# How long a user's reads stay on the primary after their data changes,
+# and how long an unreachable replica is skipped.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+REPLICA_RETRY_SECONDS = config('REPLICA_RETRY_SECONDS', default=30, cast=int)
+# A psycopg connection pool per worker process instead of a connection per
+# thread; PostgreSQL only, and needs psycopg 3 with its pool extra
+# (`pip install "psycopg[binary,pool]"`).
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0  # Pooled connections can't also be persistent.
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DATABASE_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+# Timers, OTP codes, response cache versions and replica pins live in the
+# cache, so more than one process needs a shared backend (Redis, Memcached
+# or the database cache). WEB_CONCURRENCY is the gunicorn worker count,
+# which gunicorn.conf.py exports.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+if WEB_CONCURRENCY > 1 and CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    raise ImproperlyConfigured(
+        f"WEB_CONCURRENCY is {WEB_CONCURRENCY}, but the local-memory cache isn't shared between "
+        "worker processes. Set CACHE_BACKEND to a shared backend or run one worker."
+    )
+
+# Fans realtime events out to WebSocket clients; use
+# pomodoro.realtime.PostgresBroker when running more than one worker process.
+REALTIME_BROKER = config('REALTIME_BROKER', default='pomodoro.realtime.InMemoryBroker')
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Pomodoro <no-reply@pomodoro.local>')
+
+OTP_DIGITS = config('OTP_DIGITS', default=4, cast=int)
+OTP_TTL = config('OTP_TTL', default=300, cast=int)
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+OTP_RESEND_INTERVAL = config('OTP_RESEND_INTERVAL', default=60, cast=int)
+OTP_HOURLY_LIMIT = config('OTP_HOURLY_LIMIT', default=5, cast=int)
+
+# Background jobs (OTP mail, ...). 'database' needs `manage.py run_jobs`
+# running; 'thread' runs them inside the web process after commit.
+JOB_QUEUE_BACKEND = config('JOB_QUEUE_BACKEND', default='database')
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+JOB_TIMEOUT = config('JOB_TIMEOUT', default=600, cast=int)
+JOB_THREAD_WORKERS = config('JOB_THREAD_WORKERS', default=2, cast=int)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators